@@ -1,10 +1,22 @@
 import os
+import sys
+import json
+import time
 import asyncio
+import argparse
 import logging
-logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+from .config import LOG_DEBUG_SAMPLE_RATE, LOG_FORMAT, LOG_LEVEL
+from .helpers.logs import setup_logging
+setup_logging(LOG_LEVEL, json_format=LOG_FORMAT == "json", debug_sample_rate=LOG_DEBUG_SAMPLE_RATE)
 logger = logging.getLogger(__name__)
 
 from .services.agent import get_agent
+from .config import WFS_CATALOG_PATH, WFS_CATALOG_URL
+from .services.catalog import build_catalog, write_catalog
+from .services.checkpoint_stats import analyze_checkpoints, format_report
+from .services.db import get_database
+from .services.export import export_threads_ndjson, parse_datetime
+from .services.static_assets import precompress_directory
 
 async def stream_graph_updates(graph, user_input: str):
     """Process user message by printing the result"""
@@ -14,15 +26,279 @@ async def stream_graph_updates(graph, user_input: str):
     async for event in graph.astream({"messages": [{"role": "user", "content": user_input}]}, config=config):
         # Traiter les différents types d'événements
         for node_name, node_data in event.items():
-            if "messages" in node_data:
+            if node_data and "messages" in node_data:
                 messages = node_data["messages"]
                 if messages:
                     last_message = messages[-1] if isinstance(messages, list) else messages
                     print(last_message.pretty_print())
                     print("")
 
-async def main():
+
+def read_prompts(path: str) -> list[dict]:
+    """Read batch prompts from a JSONL file (``{"id": ..., "prompt": ...}`` per line).
+
+    ``id`` defaults to the line number. Blank lines are ignored.
+    """
+    prompts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if "prompt" not in item:
+                raise ValueError(f"{path}:{line_number}: missing 'prompt'")
+            item.setdefault("id", str(line_number))
+            item["id"] = str(item["id"])
+            prompts.append(item)
+    return prompts
+
+
+def _read_results(path: str):
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                # last line may be truncated if the run was killed while writing
+                continue
+            if "id" in result:
+                yield result
+
+
+def read_completed_ids(path: str) -> set[str]:
+    """Ids of prompts successfully answered in a previous (interrupted) batch run."""
+    return {str(result["id"]) for result in _read_results(path) if result.get("error") is None}
+
+
+def read_failed_attempts(path: str) -> dict[str, int]:
+    """Number of failed attempts of each prompt in the previous batch runs."""
+    attempts: dict[str, int] = {}
+    for result in _read_results(path):
+        if result.get("error") is not None:
+            attempts[str(result["id"])] = attempts.get(str(result["id"]), 0) + 1
+    return attempts
+
+
+def batch_thread_id(item: dict, thread_prefix: str, attempt: int) -> str:
+    thread_id = item.get("thread_id") or f"{thread_prefix}-{item['id']}"
+    return f"{thread_id}-attempt{attempt}" if attempt > 1 else thread_id
+
+
+async def unused_attempt(graph, item: dict, thread_prefix: str, attempt: int) -> int:
+    """First attempt number from ``attempt`` whose thread has no checkpoint yet.
+
+    A batch killed in the middle of a prompt leaves a thread without result
+    line: its attempt is not counted by ``read_failed_attempts``.
+    """
+    while True:
+        config = {"configurable": {"thread_id": batch_thread_id(item, thread_prefix, attempt)}}
+        state = await graph.aget_state(config)
+        if not state.values.get("messages"):
+            return attempt
+        attempt += 1
+
+
+async def run_prompt(graph, item: dict, thread_prefix: str) -> dict:
+    """Run one batch prompt on its own thread and collect answer, tool calls and timings.
+
+    A retried prompt (``attempt`` > 1) runs on a new thread: the thread of the
+    failed attempt holds its partial turn (e.g. a tool call without result).
+    A resumed prompt (``resume``) skips the threads left by interrupted attempts.
+    """
+
+    attempt = item.get("attempt", 1)
+    if item.get("resume"):
+        attempt = await unused_attempt(graph, item, thread_prefix, attempt)
+    thread_id = batch_thread_id(item, thread_prefix, attempt)
+    config = {"configurable": {"thread_id": thread_id}}
+    result = {
+        "id": item["id"],
+        "thread_id": thread_id,
+        "attempt": attempt,
+        "prompt": item["prompt"],
+        "answer": None,
+        "tool_calls": [],
+        "timings": [],
+        "duration": None,
+        "error": None,
+    }
+
+    start = time.perf_counter()
+    last = start
+    try:
+        async for event in graph.astream({"messages": [{"role": "user", "content": item["prompt"]}]}, config=config):
+            for node_name, node_data in event.items():
+                now = time.perf_counter()
+                result["timings"].append({"node": node_name, "seconds": round(now - last, 3)})
+                last = now
+                if not node_data or "messages" not in node_data:
+                    continue
+                messages = node_data["messages"]
+                messages = messages if isinstance(messages, list) else [messages]
+                for message in messages:
+                    if message.type != "ai":
+                        continue
+                    for tool_call in message.tool_calls:
+                        result["tool_calls"].append({"name": tool_call["name"], "args": tool_call["args"]})
+                    if message.text.strip():
+                        result["answer"] = message.text
+    except Exception as e:
+        logger.error("batch prompt %s (%s) failed: %s", item["id"], thread_id, e)
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    result["duration"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+async def run_batch(graph, prompts: list[dict], output, *, concurrency: int = 4, thread_prefix: str = "batch") -> int:
+    """Run prompts concurrently on a shared graph, writing one JSON line per result as soon as it is available.
+
+    Returns the number of failed prompts.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def worker(item: dict):
+        nonlocal failures
+        async with semaphore:
+            result = await run_prompt(graph, item, thread_prefix)
+        if result["error"] is not None:
+            failures += 1
+        output.write(json.dumps(result, ensure_ascii=False, default=str) + "\n")
+        output.flush()
+
+    await asyncio.gather(*(worker(item) for item in prompts))
+    return failures
+
+
+async def batch(args) -> int:
+    prompts = read_prompts(args.input)
+    if args.resume:
+        if args.output == "-":
+            raise ValueError("--resume requires --output")
+        completed = read_completed_ids(args.output)
+        failed = read_failed_attempts(args.output)
+        prompts = [
+            {**item, "attempt": failed.get(item["id"], 0) + 1, "resume": True}
+            for item in prompts if item["id"] not in completed
+        ]
+        logger.info("resume: %s prompt(s) already completed", len(completed))
+
+    logger.info("batch: %s prompt(s) to run (concurrency=%s)", len(prompts), args.concurrency)
+    async with get_agent() as graph:
+        if args.output == "-":
+            failures = await run_batch(graph, prompts, sys.stdout, concurrency=args.concurrency, thread_prefix=args.thread_prefix)
+        else:
+            mode = "a" if args.resume else "w"
+            with open(args.output, mode, encoding="utf-8") as output:
+                failures = await run_batch(graph, prompts, output, concurrency=args.concurrency, thread_prefix=args.thread_prefix)
+    logger.info("batch: done (%s failure(s))", failures)
+    return 1 if failures else 0
+
+
+async def export(args) -> int:
+    """Export the latest messages of every thread as NDJSON (gzip if the output ends with .gz)."""
+    compress = args.output.endswith(".gz")
+    async with get_database() as db:
+        output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+        try:
+            async for chunk in export_threads_ndjson(
+                db,
+                since=parse_datetime(args.since),
+                until=parse_datetime(args.until),
+                after=args.after,
+                batch_size=args.batch_size,
+                compress=compress,
+            ):
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+    logger.info("export: done")
+    return 0
+
+
+async def sizes(args) -> int:
+    """Report the checkpoint sizes per thread, message type and tool, with the estimated savings."""
+    async with get_database() as db:
+        report = await analyze_checkpoints(db, top=args.top, batch_size=args.batch_size)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(report))
+    return 0
+
+
+def assets(args) -> int:
+    """Write the brotli / gzip variants of the static files (served by HashedStaticFiles)."""
+    for directory in args.directories:
+        written = precompress_directory(directory)
+        logger.info("assets: %s precompressed file(s) written in %s", written, directory)
+    return 0
+
+
+async def catalog(args) -> int:
+    """Snapshot the WFS feature types and their schemas (loaded by the server at startup)."""
+    snapshot = await build_catalog(args.url, batch_size=args.batch_size, concurrency=args.concurrency)
+    write_catalog(snapshot, args.output)
+    described = sum(1 for feature_type in snapshot["feature_types"] if feature_type["properties"])
+    logger.info(
+        "catalog: %s feature types (%s with their properties) written to %s",
+        len(snapshot["feature_types"]), described, args.output,
+    )
+    return 0
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="demo-geocontext CLI")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch_parser = subparsers.add_parser("batch", help="run prompts from a JSONL file")
+    batch_parser.add_argument("input", help='JSONL file with one {"id": ..., "prompt": ...} per line')
+    batch_parser.add_argument("-o", "--output", default="-", help="JSONL results file (default: stdout)")
+    batch_parser.add_argument("-c", "--concurrency", type=int, default=4, help="number of prompts run in parallel")
+    batch_parser.add_argument("--resume", action="store_true", help="skip prompts already answered in --output, retry the failed ones on a new thread and append to it")
+    batch_parser.add_argument("--thread-prefix", default="batch", help="thread id prefix (thread id is <prefix>-<id>)")
+
+    export_parser = subparsers.add_parser("export", help="export conversations as NDJSON")
+    export_parser.add_argument("-o", "--output", default="-", help="NDJSON file, gzip compressed if it ends with .gz (default: stdout)")
+    export_parser.add_argument("--since", help="only threads updated at or after this ISO date")
+    export_parser.add_argument("--until", help="only threads updated before this ISO date")
+    export_parser.add_argument("--after", help="resume after this thread id (\"cursor\" of the last exported line)")
+    export_parser.add_argument("--batch-size", type=int, default=100, help="rows fetched per round-trip")
+
+    sizes_parser = subparsers.add_parser("sizes", help="analyze the size of the stored checkpoints")
+    sizes_parser.add_argument("--top", type=int, default=10, help="number of heaviest threads listed")
+    sizes_parser.add_argument("--batch-size", type=int, default=100, help="threads fetched per round-trip")
+    sizes_parser.add_argument("--json", action="store_true", help="print the report as JSON")
+
+    assets_parser = subparsers.add_parser("assets", help="precompress the static files (brotli / gzip)")
+    assets_parser.add_argument("directories", nargs="*", default=["front/dist", "assets"], help="directories to precompress")
+
+    catalog_parser = subparsers.add_parser("catalog", help="snapshot the WFS feature types catalog")
+    catalog_parser.add_argument("--url", default=WFS_CATALOG_URL, help="WFS service URL")
+    catalog_parser.add_argument("--output", default=WFS_CATALOG_PATH, help="snapshot path (gzipped if it ends with .gz)")
+    catalog_parser.add_argument("--batch-size", type=int, default=20, help="feature types per DescribeFeatureType request")
+    catalog_parser.add_argument("--concurrency", type=int, default=4, help="concurrent DescribeFeatureType requests")
+    return parser.parse_args(argv)
+
+
+async def main(argv: list[str] | None = None):
+    args = parse_args(argv)
     try:
+        if args.command == "batch":
+            return await batch(args)
+        if args.command == "export":
+            return await export(args)
+        if args.command == "sizes":
+            return await sizes(args)
+        if args.command == "assets":
+            return assets(args)
+        if args.command == "catalog":
+            return await catalog(args)
+
         print("Loading graph, please wait...")
         async with get_agent() as graph:
             print("Welcome to the demo-geocontext CLI! Type a message and press Enter to send it. Use 'quit', 'exit', or 'q' to exit.")
@@ -36,6 +312,4 @@ async def main():
         return 1
 
 if __name__ == "__main__":
-    asyncio.run(main())
-
-
+    sys.exit(asyncio.run(main()))
@@ -1,15 +1,164 @@
+import importlib.util
 import json
 import os
 from typing import Any
 
+
+def _env_bool(name: str, default: bool) -> bool:
+    """Boolean environment variable ("yes", "true", "t" or "1" for true, ``default`` if not set)"""
+    value = os.getenv(name)
+    return default if value is None else value.lower() in ("yes", "true", "t", "1")
+
+
 MODEL_NAME = os.getenv("MODEL_NAME", "anthropic:claude-sonnet-4-6")
 TEMPERATURE = float(os.getenv("TEMPERATURE", 0.0))
 if TEMPERATURE < 0 or TEMPERATURE > 1:
     raise ValueError("TEMPERATURE must be between 0 and 1")
 
+# Routage optionnel par tour entre un modèle rapide et MODEL_NAME ("heuristic" ou "model", vide pour désactiver)
+MODEL_ROUTER = os.getenv("MODEL_ROUTER", "")
+if MODEL_ROUTER not in ("", "heuristic", "model"):
+    raise ValueError("MODEL_ROUTER must be 'heuristic', 'model' or empty")
+FAST_MODEL_NAME = os.getenv("FAST_MODEL_NAME", "anthropic:claude-haiku-4-5")
+# Petit modèle utilisé comme classifieur avec MODEL_ROUTER=model (FAST_MODEL_NAME par défaut)
+ROUTER_MODEL_NAME = os.getenv("ROUTER_MODEL_NAME", "") or FAST_MODEL_NAME
+# Avec MODEL_ROUTER=heuristic, longueur maximale d'une question confiée au modèle rapide
+ROUTER_MAX_FAST_CHARS = int(os.getenv("ROUTER_MAX_FAST_CHARS", 200))
+
+# Nombre de tours de l'agent exécutés simultanément (chatbot et API, 1 comme la file Gradio par défaut)
+AGENT_CONCURRENCY_LIMIT = int(os.getenv("AGENT_CONCURRENCY_LIMIT", 1))
+if AGENT_CONCURRENCY_LIMIT < 1:
+    raise ValueError("AGENT_CONCURRENCY_LIMIT must be at least 1")
+
+# Nouvelle question sur un thread dont la réponse est en cours : "cancel" (annule la réponse en cours) ou "queue" (attend sa fin)
+RUN_CONFLICT_POLICY = os.getenv("RUN_CONFLICT_POLICY", "cancel")
+if RUN_CONFLICT_POLICY not in ("cancel", "queue"):
+    raise ValueError("RUN_CONFLICT_POLICY must be 'cancel' or 'queue'")
+# Délai (en secondes) pendant lequel une réponse en cours continue sans client connecté (rechargement de la page)
+RUN_DETACH_GRACE_SECONDS = float(os.getenv("RUN_DETACH_GRACE_SECONDS", 60))
+
 # 
 DB_URI = os.getenv("DB_URI", None)
 
+# Limites du checkpointer en mémoire (sans DB_URI) : nombre de threads et taille estimée (0 pour ne pas limiter,
+# sans MEMORY_SPILL_DIR les threads évincés sont perdus)
+MEMORY_MAX_THREADS = int(os.getenv("MEMORY_MAX_THREADS", 0))
+MEMORY_MAX_BYTES = int(os.getenv("MEMORY_MAX_BYTES", 0))
+# Délai (en secondes) après lequel seul le dernier checkpoint d'un thread inactif est conservé
+MEMORY_IDLE_SECONDS = float(os.getenv("MEMORY_IDLE_SECONDS", 300))
+# Dossier où écrire les threads évincés de la mémoire (sinon ils sont perdus)
+MEMORY_SPILL_DIR = os.getenv("MEMORY_SPILL_DIR", "")
+
+# Compression des checkpoints ("none", "zlib" ou "zstd") au-delà d'une taille en octets
+# (zstd : extra optionnel "zstd" du projet)
+CHECKPOINT_COMPRESSION = os.getenv("CHECKPOINT_COMPRESSION", "none")
+if CHECKPOINT_COMPRESSION not in ("none", "zlib", "zstd"):
+    raise ValueError("CHECKPOINT_COMPRESSION must be one of none, zlib, zstd")
+if CHECKPOINT_COMPRESSION == "zstd" and importlib.util.find_spec("zstandard") is None:
+    raise ValueError("CHECKPOINT_COMPRESSION=zstd requires the zstd extra (uv sync --extra zstd)")
+CHECKPOINT_COMPRESSION_THRESHOLD = int(os.getenv("CHECKPOINT_COMPRESSION_THRESHOLD", 1024))
+
+# Mise à jour en direct des discussions partagées (/discussion) avec PostgreSQL : chaque checkpoint
+# est publié par NOTIFY, une connexion LISTEN par processus transmet les nouveaux messages aux lecteurs
+LIVE_UPDATES = _env_bool("LIVE_UPDATES", False)
+# délai maximal entre deux tentatives de reconnexion (secondes)
+LIVE_UPDATES_RECONNECT_MAX = float(os.getenv("LIVE_UPDATES_RECONNECT_MAX", 30))
+
+# Nombre de discussions par page dans le panneau « Mes discussions »
+USER_THREADS_PAGE_SIZE = int(os.getenv("USER_THREADS_PAGE_SIZE", 10))
+if USER_THREADS_PAGE_SIZE < 1:
+    raise ValueError("USER_THREADS_PAGE_SIZE must be at least 1")
+
+# Groupe (X-Forwarded-Groups) requis pour les endpoints /admin/*
+ADMIN_GROUP = os.getenv("ADMIN_GROUP", "admin")
+
+# Délai maximal (en secondes) d'un appel d'outil MCP (0 pour désactiver)
+MCP_TOOL_TIMEOUT = float(os.getenv("MCP_TOOL_TIMEOUT", 120))
+if MCP_TOOL_TIMEOUT < 0:
+    raise ValueError("MCP_TOOL_TIMEOUT must be positive (or 0 to disable)")
+
+# Supervision des serveurs MCP (sessions persistantes, health-checks, redémarrage)
+# désactivée : une nouvelle session (un nouveau processus stdio) par appel d'outil
+MCP_SUPERVISOR = _env_bool("MCP_SUPERVISOR", False)
+# processus de secours démarré à l'avance pour chaque serveur
+MCP_WARM_SPARE = _env_bool("MCP_WARM_SPARE", False)
+# recyclage après N appels ou au-delà d'une mémoire résidente en Mo (0 : désactivé)
+MCP_MAX_CALLS = int(os.getenv("MCP_MAX_CALLS", 0))
+MCP_MAX_RSS_MB = float(os.getenv("MCP_MAX_RSS_MB", 0))
+if MCP_MAX_CALLS < 0 or MCP_MAX_RSS_MB < 0:
+    raise ValueError("MCP_MAX_CALLS and MCP_MAX_RSS_MB must be positive (or 0 to disable)")
+# intervalle des health-checks et délai maximal entre deux tentatives de redémarrage (secondes)
+MCP_HEALTH_INTERVAL = float(os.getenv("MCP_HEALTH_INTERVAL", 30))
+MCP_RESTART_BACKOFF_MAX = float(os.getenv("MCP_RESTART_BACKOFF_MAX", 60))
+if MCP_HEALTH_INTERVAL < 0 or MCP_RESTART_BACKOFF_MAX <= 0:
+    raise ValueError("MCP_HEALTH_INTERVAL must be positive (or 0 to disable) and MCP_RESTART_BACKOFF_MAX strictly positive")
+
+# Réduction des FeatureCollection renvoyées au modèle (le résultat complet reste affiché)
+TOOL_OUTPUT_TRIM = _env_bool("TOOL_OUTPUT_TRIM", False)
+TOOL_OUTPUT_TRIM_TOOLS = [name.strip() for name in os.getenv("TOOL_OUTPUT_TRIM_TOOLS", "gpf_wfs_get_features").split(",") if name.strip()]
+TOOL_OUTPUT_MAX_FEATURES = int(os.getenv("TOOL_OUTPUT_MAX_FEATURES", 20))
+# propriétés conservées (toutes si vide)
+TOOL_OUTPUT_PROPERTIES = [name.strip() for name in os.getenv("TOOL_OUTPUT_PROPERTIES", "").split(",") if name.strip()]
+# nombre de décimales des coordonnées (5 : environ 1 m en WGS84)
+TOOL_OUTPUT_PRECISION = int(os.getenv("TOOL_OUTPUT_PRECISION", 5))
+# géométries complètes plutôt que leur résumé (type, bbox, centroïde)
+TOOL_OUTPUT_KEEP_GEOMETRY = _env_bool("TOOL_OUTPUT_KEEP_GEOMETRY", False)
+if TOOL_OUTPUT_MAX_FEATURES < 0 or TOOL_OUTPUT_PRECISION < 0:
+    raise ValueError("TOOL_OUTPUT_MAX_FEATURES and TOOL_OUTPUT_PRECISION must be positive")
+
+# Sélection par tour des outils exposés au modèle (recherche locale sur les descriptions)
+TOOL_SELECTION = _env_bool("TOOL_SELECTION", False)
+TOOL_SELECTION_TOP_K = int(os.getenv("TOOL_SELECTION_TOP_K", 5))
+# outils toujours exposés
+TOOL_SELECTION_CORE_TOOLS = [name.strip() for name in os.getenv("TOOL_SELECTION_CORE_TOOLS", "create_map").split(",") if name.strip()]
+if TOOL_SELECTION_TOP_K < 1:
+    raise ValueError("TOOL_SELECTION_TOP_K must be at least 1")
+
+# Écriture au démarrage des variantes .br / .gz manquantes des fichiers statiques
+# (sinon : python -m app.cli assets, exécuté lors de la construction de l'image docker)
+STATIC_PRECOMPRESS = _env_bool("STATIC_PRECOMPRESS", False)
+
+# Instantané local du catalogue WFS de la Géoplateforme, exposé par l'outil search_feature_types ;
+# construit en tâche de fond par le serveur s'il manque ou a plus de WFS_CATALOG_MAX_AGE_DAYS jours
+# (l'agent utilise les outils MCP en attendant)
+WFS_CATALOG = _env_bool("WFS_CATALOG", False)
+WFS_CATALOG_PATH = os.getenv("WFS_CATALOG_PATH", "wfs-catalog.json.gz")
+WFS_CATALOG_URL = os.getenv("WFS_CATALOG_URL", "https://data.geopf.fr/wfs/ows")
+WFS_CATALOG_MAX_AGE_DAYS = float(os.getenv("WFS_CATALOG_MAX_AGE_DAYS", 7))
+if WFS_CATALOG_MAX_AGE_DAYS <= 0:
+    raise ValueError("WFS_CATALOG_MAX_AGE_DAYS must be strictly positive")
+
+# Emprise des données de create_map lue dans le catalogue WFS (WFS_CATALOG) pour les requêtes non filtrées
+# de la Géoplateforme : la carte s'affiche directement centrée sans attendre le téléchargement du GeoJSON
+MAP_EXTENT = _env_bool("MAP_EXTENT", False)
+
+# Client HTTP partagé par les modèles (keep-alive, HTTP/2 si le paquet h2 est installé, proxy)
+HTTP_CLIENT_SHARED = _env_bool("HTTP_CLIENT_SHARED", True)
+HTTP2 = _env_bool("HTTP2", True)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 20))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", 10))
+# durée de conservation d'une connexion inactive (secondes)
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", 60))
+if HTTP_MAX_CONNECTIONS < 1 or HTTP_MAX_KEEPALIVE_CONNECTIONS < 0 or HTTP_KEEPALIVE_EXPIRY < 0:
+    raise ValueError("HTTP_MAX_CONNECTIONS must be at least 1, HTTP_MAX_KEEPALIVE_CONNECTIONS and HTTP_KEEPALIVE_EXPIRY positive")
+
+# Journalisation : niveau, format ("json" : une ligne JSON par message, "text") et
+# échantillonnage des messages de debug (1 sur N par appel, 1 pour tout conserver)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+if LOG_FORMAT not in ("json", "text"):
+    raise ValueError("LOG_FORMAT must be 'json' or 'text'")
+LOG_DEBUG_SAMPLE_RATE = int(os.getenv("LOG_DEBUG_SAMPLE_RATE", 1))
+if LOG_DEBUG_SAMPLE_RATE < 1:
+    raise ValueError("LOG_DEBUG_SAMPLE_RATE must be at least 1")
+
+# Enregistrement ("record") ou rejeu ("replay") des appels d'outils MCP
+MCP_CASSETTE_MODE = os.getenv("MCP_CASSETTE_MODE", "")
+if MCP_CASSETTE_MODE not in ("", "record", "replay"):
+    raise ValueError("MCP_CASSETTE_MODE must be 'record', 'replay' or empty")
+MCP_CASSETTE_PATH = os.getenv("MCP_CASSETTE_PATH", "mcp-cassette.jsonl")
+MCP_CASSETTE_SIMULATE_LATENCY = _env_bool("MCP_CASSETTE_SIMULATE_LATENCY", False)
+
 
 def check_api_key(*, model_name: str | None = None) -> None:
     """Raise if the model requires an API key that is missing from the environment."""
@@ -51,3 +200,47 @@ def get_mcp_servers_config() -> dict[str, dict[str, Any]]:
             "env": proxy if proxy else None,
         },
     }
+
+
+def get_tool_timeouts_config() -> dict[str, Any]:
+    """Timeouts (in seconds) and hedging options for MCP tool calls.
+
+    If MCP_TOOL_TIMEOUTS_CONFIG_PATH is set, the JSON file at that path is
+    merged over the defaults. Expected shape::
+
+        {
+            "default": 120,
+            "servers": {"geocontext": 60},
+            "tools": {"gpf_wfs_get_features": 90},
+            "hedging": {
+                "enabled": true,
+                "tools": ["gpf_wfs_get_features"],
+                "percentile": 95,
+                "min_samples": 20
+            }
+        }
+
+    When ``hedging.tools`` is omitted, tools annotated by their MCP server as
+    both read-only and idempotent are hedged.
+    """
+    config: dict[str, Any] = {
+        "default": MCP_TOOL_TIMEOUT or None,
+        "servers": {},
+        "tools": {},
+        "hedging": {
+            "enabled": _env_bool("MCP_TOOL_HEDGING", False),
+            "tools": None,
+            "percentile": 95.0,
+            "min_samples": 20,
+        },
+    }
+
+    config_path = os.environ.get("MCP_TOOL_TIMEOUTS_CONFIG_PATH", None)
+    if config_path is not None:
+        with open(config_path, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+        hedging = {**config["hedging"], **overrides.pop("hedging", {})}
+        config.update(overrides)
+        config["hedging"] = hedging
+
+    return config
@@ -4,6 +4,8 @@ import re
 
 import gradio as gr
 
+from ..services.tool_output import untrimmed_content
+
 logger = logging.getLogger(__name__)
 
 # ``create_map`` map markup: the Chatbot escapes ``<ol-simple-map>`` in Markdown,
@@ -47,10 +49,9 @@ def _ai_content_for_gradio_chatbot(text: str) -> str | list:
 def to_gradio_message(message):
     """Convert a message to a dict shape compatible with the Gradio Chatbot."""
 
-    logger.debug(f"to_gradio_message({type(message)} - {message.type})")
+    logger.debug("to_gradio_message(%s - %s)", type(message).__name__, message.type)
     if not hasattr(message, "content") or not message.content:
-        logger.warning(f"to_gradio_message({type(message)}) - no content")
-        logger.warning(f"last_message: {message.pretty_print()}")
+        logger.warning("to_gradio_message(%s) - no content (id=%s)", type(message).__name__, getattr(message, "id", None))
         return None
 
     # Extract textual content
@@ -70,8 +71,10 @@ def to_gradio_message(message):
                 text_parts.append(f"🔧 Appel outil: {tool_name}({tool_args})")
         text_content = "\n".join(text_parts)
     else:
-        logger.warning(f"to_gradio_message({type(message)}) - unknown content type")
-        logger.warning(f"message: {message.pretty_print()}")
+        logger.warning(
+            "to_gradio_message(%s) - unknown content type %s (id=%s)",
+            type(message).__name__, type(message.content).__name__, getattr(message, "id", None),
+        )
         return None
 
     # One chat bubble per LangChain message type
@@ -92,6 +95,8 @@ def to_gradio_message(message):
         # Map tool: no separate bubble — the LLM pastes the fragment into the next reply.
         if "<ol-simple-map" in text_content:
             return None
+        # Full output, the model may have received a trimmed version (GeoJsonTrimMiddleware)
+        text_content = untrimmed_content(message) or text_content
 
         tool_title = "📊 Résultat outil"
         # Pretty-print valid JSON for syntax highlighting in the UI
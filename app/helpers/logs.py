@@ -0,0 +1,136 @@
+"""Journalisation non bloquante : file d'attente vers un thread d'écriture, lignes JSON, échantillonnage du debug."""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+# conversation and user of the current request / agent run (inherited by the tasks it creates)
+log_thread_id: ContextVar[str | None] = ContextVar("log_thread_id", default=None)
+log_user: ContextVar[str | None] = ContextVar("log_user", default=None)
+
+# attributes of a bare LogRecord (the others come from ``extra=`` and are added to the JSON line)
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "thread_id", "user"}
+
+# running listener (see setup_logging)
+_listener: logging.handlers.QueueListener | None = None
+
+
+def set_log_context(*, thread_id: str | None = None, user: str | None = None) -> None:
+    """Tag the following log records of the current task with a thread id and a user."""
+    if thread_id is not None:
+        log_thread_id.set(thread_id)
+    if user is not None:
+        log_user.set(user)
+
+
+class ContextFilter(logging.Filter):
+    """Copy the thread id and user of the emitting task to the record (before it leaves the task)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.thread_id = log_thread_id.get()
+        record.user = log_user.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keep one DEBUG record out of ``rate`` per call site (logger, file and line: a bounded set of keys)."""
+
+    def __init__(self, rate: int):
+        super().__init__()
+        self.rate = rate
+        self.counts: Counter = Counter()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate <= 1:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        self.counts[key] += 1
+        return self.counts[key] % self.rate == 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, thread id, user and ``extra=`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("thread_id", "user"):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """``LEVEL:logger:[thread_id] message`` (the ``basicConfig`` format with the thread id)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        thread_id = getattr(record, "thread_id", None)
+        if thread_id is not None:
+            record = logging.makeLogRecord({**vars(record), "msg": f"[{thread_id}] {record.getMessage()}", "args": None})
+        return super().format(record)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """``QueueHandler`` leaving the formatting (JSON, tracebacks) to the listener thread.
+
+    The standard ``prepare()`` formats the whole record in the emitting thread;
+    here only the message is merged with its arguments (they may change once
+    the call returns).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging(level: str = "INFO", *, json_format: bool = True, debug_sample_rate: int = 1) -> None:
+    """Route the root logger through a queue to a stderr handler running in a background thread.
+
+    Idempotent (the server and the CLI both call it); the listener is flushed at exit.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if json_format else TextFormatter(logging.BASIC_FORMAT))
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(records)
+    queue_handler.addFilter(ContextFilter())
+    if debug_sample_rate > 1:
+        queue_handler.addFilter(DebugSamplingFilter(debug_sample_rate))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Write the queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -6,3 +6,7 @@ class User(BaseModel):
     username: str
     email: str
     groups: list[str]
+
+
+class ChatRequest(BaseModel):
+    content: str
@@ -1,21 +1,37 @@
+import asyncio
 import os
 import uuid
 import logging
-logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+from datetime import datetime, timezone
+from .config import LOG_DEBUG_SAMPLE_RATE, LOG_FORMAT, LOG_LEVEL
+from .helpers.logs import setup_logging
+setup_logging(LOG_LEVEL, json_format=LOG_FORMAT == "json", debug_sample_rate=LOG_DEBUG_SAMPLE_RATE)
 logger = logging.getLogger(__name__)
 
 import uvicorn
-from fastapi import FastAPI,Request,Depends
-from fastapi.responses import JSONResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
-from .models import User
-from .services.auth import get_current_user
-from .services.db import is_database_healthy
+from fastapi import FastAPI,Request,Depends,HTTPException,Query
+from fastapi.responses import JSONResponse, RedirectResponse, StreamingResponse
+from .config import DB_URI, LIVE_UPDATES, LIVE_UPDATES_RECONNECT_MAX
+from .config import WFS_CATALOG, WFS_CATALOG_MAX_AGE_DAYS, WFS_CATALOG_PATH, WFS_CATALOG_URL
+from .config import RUN_CONFLICT_POLICY, RUN_DETACH_GRACE_SECONDS, STATIC_PRECOMPRESS, USER_THREADS_PAGE_SIZE
+from .models import ChatRequest, User
+from .services.catalog import maintain_catalog
+from .services.auth import get_admin_user, get_current_user, is_anonymous
+from .services.db import get_current_database, get_database_stats, is_database_healthy, thread_title
+from .services.export import export_threads_ndjson, parse_datetime
+from .services.http_client import get_http_stats, warmup_http_pool
+from .services.live_updates import ThreadUpdates, get_thread_updates
+from .services.mcp_supervisor import get_mcp_status
+from .services.tool_selector import get_tool_selection_stats
+from .services.static_assets import HashedStaticFiles
 from urllib.parse import quote as urlib_quote
 
 import gradio as gr
 from .services.agent import get_agent, get_messages
+from .services.chat import agent_events, agent_stream, format_sse, get_history_page
+from .services.runs import Run, RunRegistry, repair_dangling_tool_calls
 from .helpers.gradio import to_gradio_message
+from .helpers.logs import set_log_context
 
 def str2bool(v: str) -> bool :
   return str(v).lower() in ("yes", "true", "t", "1")
@@ -23,16 +39,68 @@ def str2bool(v: str) -> bool :
 
 # the graph instance
 graph = None
+# agent runs detached from the clients, at most one per thread (cancelled on reset, new message
+# or when no client follows them anymore)
+run_registry = RunRegistry(policy=RUN_CONFLICT_POLICY, detach_grace_seconds=RUN_DETACH_GRACE_SECONDS)
 
-from contextlib import asynccontextmanager
+
+async def repair_thread(thread_id: str):
+    """Keep the checkpoint of a cancelled run usable for the next message"""
+    await repair_dangling_tool_calls(graph, thread_id)
+
+
+async def record_user_turn(user: str | None, thread_id: str, message: str):
+    """Add the thread to the discussions of the user (or update its last activity)"""
+    db = get_current_database()
+    # no "Mes discussions" for the anonymous default user: it would list the threads of every visitor
+    if db is None or is_anonymous(user):
+        return
+    try:
+        await db.touch_user_thread(user, thread_id, thread_title(message))
+    except Exception as e:
+        # the answer matters more than the "Mes discussions" panel
+        logger.warning("record_user_turn(thread_id=%s, user=%s) failed: %s", thread_id, user, e)
+
+async def check_thread_access(user: User, thread_id: str, *, new: bool = False):
+    """404 unless the user has recorded a turn on the thread (with ``new``: or the thread has no message yet)"""
+    db = get_current_database()
+    if db is None:
+        raise HTTPException(status_code=503, detail="database is not ready")
+    users = await db.get_thread_users(thread_id)
+    if user.email in users:
+        return
+    # the turns of anonymous visitors are not recorded: they share the threads of no user
+    if is_anonymous(user.email) and not users:
+        return
+    if new and not users and not await load_thread_messages(thread_id):
+        return
+    raise HTTPException(status_code=404, detail="thread not found")
+
+async def load_thread_messages(thread_id: str) -> list:
+    """Messages of a thread (latest checkpoint)"""
+    return [message async for message in get_messages(graph, thread_id)]
+
+from contextlib import AsyncExitStack, asynccontextmanager
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     global graph
 
     logger.info("Starting up...")
-    async with get_agent() as g:
+    async with get_agent() as g, AsyncExitStack() as stack:
         graph = g
+        if LIVE_UPDATES and DB_URI and DB_URI.startswith("postgresql://"):
+            # one LISTEN connection per process for the /discussion viewers
+            await stack.enter_async_context(
+                ThreadUpdates(DB_URI, load_thread_messages, reconnect_max=LIVE_UPDATES_RECONNECT_MAX)
+            )
+        if WFS_CATALOG:
+            # built or reloaded in the background: the startup does not wait for the WFS
+            catalog_task = asyncio.create_task(maintain_catalog(
+                WFS_CATALOG_PATH, WFS_CATALOG_URL, max_age_seconds=WFS_CATALOG_MAX_AGE_DAYS * 86400
+            ))
+            stack.callback(catalog_task.cancel)
+        await warmup_http_pool()
         yield
     graph = None
     logger.info("Shutting down...")
@@ -60,21 +128,163 @@ async def health_db():
         )
 
     if healthy:
-        return {"status": "ok", "message": "connected"} 
+        return {"status": "ok", "message": "connected", "stats": await get_database_stats()}
     else:
         return JSONResponse(
             status_code=500,
             content={"status": "error", "message": "database is disconnected"},
         )
 
-# ol-simple-map
-app.mount("/front", StaticFiles(directory="front/dist"), name="front")
+@app.get('/health/runs')
+async def health_runs():
+    """Agent runs in progress, completed, failed and cancelled (by reason)"""
+    return {"status": "ok", "runs": run_registry.stats()}
+
+@app.get('/health/tools')
+async def health_tools():
+    """Number of tools exposed to the model and prompt sizes with and without the tool selection"""
+    stats = get_tool_selection_stats()
+    if stats is None:
+        return {"status": "ok", "message": "tool selection is disabled"}
+    return {"status": "ok", "selection": stats}
+
+@app.get('/health/mcp')
+async def health_mcp():
+    """Status of the supervised MCP servers (503 if one of them is not ready)"""
+    servers = get_mcp_status()
+    if servers is None:
+        return {"status": "ok", "message": "MCP servers are not supervised"}
+    if all(server["status"] == "ready" for server in servers.values()):
+        return {"status": "ok", "servers": servers}
+    return JSONResponse(status_code=503, content={"status": "error", "servers": servers})
+
+@app.get('/health/http')
+async def health_http():
+    """Connection reuse of the HTTP client shared by the model providers"""
+    stats = get_http_stats()
+    if stats is None:
+        return {"status": "ok", "message": "HTTP client is not shared"}
+    return {"status": "ok", "stats": stats}
+
+@app.get('/health/live')
+async def health_live():
+    """Live updates of the shared discussions (LISTEN connection, followed threads)"""
+    updates = get_thread_updates()
+    if updates is None:
+        return {"status": "ok", "message": "live updates are disabled"}
+    if not updates.connected:
+        return JSONResponse(status_code=503, content={"status": "error", "stats": updates.stats()})
+    return {"status": "ok", "stats": updates.stats()}
+
+@app.get('/admin/export')
+async def admin_export(
+    since: str | None = None,
+    until: str | None = None,
+    after: str | None = None,
+    batch_size: int = 100,
+    gzip: bool = False,
+    user: User = Depends(get_admin_user),
+):
+    """Stream the latest messages of every thread as NDJSON (resume with ``after=<last cursor>``)"""
+    logger.info("admin_export(user=%s, since=%s, until=%s, after=%s, gzip=%s)", user.email, since, until, after, gzip)
+    since_dt, until_dt = parse_datetime(since), parse_datetime(until)
+    # the database opened at startup (no new connection pool per export)
+    db = get_current_database()
+    if db is None:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "error", "message": "database is not ready"},
+        )
+
+    async def content():
+        async for chunk in export_threads_ndjson(
+            db, since=since_dt, until=until_dt, after=after,
+            batch_size=batch_size, compress=gzip,
+        ):
+            yield chunk
+
+    if gzip:
+        return StreamingResponse(
+            content(),
+            media_type="application/gzip",
+            headers={"Content-Disposition": 'attachment; filename="conversations.ndjson.gz"'},
+        )
+    return StreamingResponse(content(), media_type="application/x-ndjson")
+
+@app.post('/api/threads/{thread_id}/messages')
+async def post_thread_message(
+    thread_id: str,
+    body: ChatRequest,
+    user: User = Depends(get_current_user),
+):
+    """Send a message and stream the agent events (token, tool_call, tool_result, message, done, error, cancelled) as SSE"""
+    message = body.content.strip()
+    if message == "":
+        raise HTTPException(status_code=422, detail="content is empty")
+    set_log_context(thread_id=thread_id, user=user.email)
+    logger.info("post_thread_message(thread_id=%s, user=%s)", thread_id, user.email)
+    await check_thread_access(user, thread_id, new=True)
+
+    await record_user_turn(user.email, thread_id, message)
+    message_id = str(uuid.uuid4())
+    run = await run_registry.start(
+        thread_id,
+        agent_stream(graph, thread_id, message, message_id),
+        on_cancel=repair_thread,
+        metadata={"user_message": message, "message_id": message_id},
+    )
+    return sse_response(run)
+
+@app.get('/api/threads/{thread_id}/events')
+async def get_thread_events(
+    thread_id: str,
+    user: User = Depends(get_current_user),
+):
+    """Attach to the run in progress on a thread: its events from the start of the run, then the remaining ones (SSE)"""
+    await check_thread_access(user, thread_id)
+    run = run_registry.attach(thread_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail="no run in progress")
+    set_log_context(thread_id=thread_id, user=user.email)
+    logger.info("get_thread_events(thread_id=%s, user=%s)", thread_id, user.email)
+    return sse_response(run)
+
+def sse_response(run: Run) -> StreamingResponse:
+    """Stream the items of a run as SSE events"""
+    async def content():
+        async for event in agent_events(run_registry.subscribe(run), run.thread_id):
+            if event["event"] == "done" and run.cancel_reason is not None:
+                # cancelled by a reset or a newer message on the same thread
+                event = {"event": "cancelled", "data": {"thread_id": run.thread_id, "reason": run.cancel_reason}}
+            yield format_sse(event)
+
+    return StreamingResponse(
+        content(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get('/api/threads/{thread_id}/messages')
+async def get_thread_messages(
+    thread_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+    user: User = Depends(get_current_user),
+):
+    """Paginated history of a thread (oldest first, continue with ``offset=next_offset``)"""
+    await check_thread_access(user, thread_id)
+    return await get_history_page(graph, thread_id, offset=offset, limit=limit)
+
+# ol-simple-map (content-hashed URLs, see HTML_HEAD)
+front_files = HashedStaticFiles(directory="front/dist", prefix="/front", precompress=STATIC_PRECOMPRESS)
+app.mount("/front", front_files, name="front")
 # logos
-app.mount("/assets", StaticFiles(directory="assets"), name="assets")
+assets_files = HashedStaticFiles(directory="assets", prefix="/assets", precompress=STATIC_PRECOMPRESS)
+app.mount("/assets", assets_files, name="assets")
 
 
-async def load_conversation_history(thread_id: str):
-    """Charge l'historique de la conversation pour un thread_id donné à partir du graph"""
+async def load_conversation_history(thread_id: str, until_message_id: str | None = None):
+    """Charge l'historique de la conversation pour un thread_id donné à partir du graph (jusqu'au message until_message_id exclu)"""
     global graph
     
     if not graph or not thread_id:
@@ -83,24 +293,73 @@ async def load_conversation_history(thread_id: str):
     history = []
     try:
         async for message in get_messages(graph, thread_id):
-            logger.debug(f"Traitement message: type={getattr(message, 'type', 'unknown')}, content={getattr(message, 'content', 'no content')}")
+            if until_message_id is not None and message.id == until_message_id:
+                break
+            logger.debug("Traitement message: type=%s, id=%s", getattr(message, 'type', 'unknown'), getattr(message, 'id', None))
             gradio_message = to_gradio_message(message)
             if gradio_message:
                 history.append(gradio_message)
     except Exception as e:
-        logger.error(f"Erreur lors du chargement de l'historique pour {thread_id}: {e}")
+        logger.error("Erreur lors du chargement de l'historique pour %s: %s", thread_id, e)
         raise
     
-    logger.info(f"Historique chargé: {len(history)} messages pour thread_id={thread_id}")
+    logger.info("Historique chargé: %s messages pour thread_id=%s", len(history), thread_id)
     return history
 
 
+async def load_run_history(thread_id: str) -> tuple[list, Run | None]:
+    """Historique du thread et exécution en cours à laquelle se rattacher (après un rechargement de la page)"""
+    run = run_registry.attach(thread_id)
+    if run is None:
+        return await load_conversation_history(thread_id), None
+
+    # messages before the question of the run, the run events are replayed from its start
+    history = await load_conversation_history(thread_id, until_message_id=run.metadata["message_id"])
+    history.append({"role": "user", "content": run.metadata["user_message"]})
+    logger.info("load_run_history(thread_id=%s) : attached to the run in progress", thread_id)
+    return history, run
+
+
+async def stream_run_history(history: list, items):
+    """Ajoute à l'historique Gradio les messages produits par une exécution de l'agent"""
+    async for mode, event in items:
+        if mode != "updates":
+            continue
+        logger.debug("event: %s", list(event))
+
+        # Traiter les différents types d'événements
+        for node_name, node_data in event.items():
+            if node_data and "messages" in node_data:
+                messages = node_data["messages"]
+                if messages:
+                    last_message = messages[-1] if isinstance(messages, list) else messages
+                    gradio_message = to_gradio_message(last_message)
+                    if gradio_message is not None:
+                        history.append(gradio_message)
+                        yield history
+
+    # Remove metadata for the final message
+    history[-1]["metadata"] = None
+    yield history
+
+
+async def stream_live_history(updates: ThreadUpdates, thread_id: str, session_id: str | None):
+    """Historique Gradio d'un thread, complété à chaque checkpoint écrit (par n'importe quelle instance)"""
+    history = []
+    async for messages in updates.follow(thread_id, session_id=session_id):
+        for message in messages:
+            gradio_message = to_gradio_message(message)
+            if gradio_message is not None:
+                history.append(gradio_message)
+        yield history
+
+
 # Web component <ol-simple-map> (voir front)
-FRONT_VERSION="20260430"  # à incrémenter pour forcer le rechargement du front
+# (URL with the hash of the content: a new version is reloaded, the others are cached)
 HTML_HEAD = f"""
-<script src="/front/demo-geocontext.min.js?v={FRONT_VERSION}"></script>
-<link rel="stylesheet" href="/front/demo-geocontext.css?v={FRONT_VERSION}" />
-<link rel="stylesheet" href="/assets/gradio.css?v={FRONT_VERSION}" />
+<script src="{front_files.url('demo-geocontext.min.js')}"></script>
+<link rel="stylesheet" href="{front_files.url('demo-geocontext.css')}" />
+<link rel="stylesheet" href="{assets_files.url('gradio.css')}" />
 """
 
 CONTACT_EMAIL=os.getenv("CONTACT_EMAIL", "dev@localhost")
@@ -178,6 +437,19 @@ with gr.Blocks(title="demo-geocontext") as demo:
     share_output = gr.Markdown(value="", visible=True)
     # Button for new discussion
     new_discussion_btn = gr.Button("🆕 Nouvelle discussion", variant="secondary")
+    # Discussions of the user (most recent first, USER_THREADS_PAGE_SIZE per page)
+    with gr.Accordion("📚 Mes discussions", open=False, visible=False) as my_threads_panel:
+        my_threads = gr.Dataframe(
+            headers=["Discussion", "Dernière activité (UTC)"],
+            datatype=["str", "str"],
+            interactive=False,
+            wrap=True,
+        )
+        with gr.Row():
+            newer_threads_btn = gr.Button("◀ Plus récentes", size="sm", interactive=False)
+            older_threads_btn = gr.Button("Plus anciennes ▶", size="sm", interactive=False)
+    # page shown: thread ids of its rows, cursors of the previous pages and of the next one
+    my_threads_state = gr.State(None)
     # Footer with legal mentions link
     footer = gr.Markdown(value=HTML_FOOTER)
 
@@ -191,24 +463,27 @@ with gr.Blocks(title="demo-geocontext") as demo:
         # if thread_id is empty and not provided, create a new thread
         if thread_id is None or thread_id.strip() == "":
             thread_id = f"thread-{uuid.uuid4().hex}"
-            logger.info(f"initialize_chat(thread_id={thread_id}, username={username}) : new thread created")
+            logger.info("initialize_chat(thread_id=%s, username=%s) : new thread created", thread_id, username)
             share_link = create_share_link(thread_id)
-            return history, username, thread_id, share_link
+            yield history, username, thread_id, share_link
+            return
 
-        logger.info(f"initialize_chat(thread_id={thread_id}, username={username}) : thread_id provided, loading history...")
+        set_log_context(thread_id=thread_id, user=username)
+        logger.info("initialize_chat(thread_id=%s, username=%s) : thread_id provided, loading history...", thread_id, username)
         share_link = create_share_link(thread_id)
         try:
-            history = await load_conversation_history(thread_id)
-            logger.info(f"initialize_chat(thread_id={thread_id}, username={username}) : history loaded with {len(history)} message(s)")
-            return history, username, thread_id, share_link
+            history, run = await load_run_history(thread_id)
+            logger.info("initialize_chat(thread_id=%s, username=%s) : history loaded with %s message(s)", thread_id, username, len(history))
         except Exception as e:
-            logger.error(f"initialize_chat(thread_id={thread_id}, username={username}) : error loading history for thread_id : {e}")
-            return [], username, thread_id, share_link
+            logger.error("initialize_chat(thread_id=%s, username=%s) : error loading history for thread_id : %s", thread_id, username, e)
+            yield [], username, thread_id, share_link
+            return
 
+        yield history, username, thread_id, share_link
+        if run is not None:
+            async for history in stream_run_history(history, run_registry.subscribe(run, session_id=request.session_hash)):
+                yield history, username, thread_id, share_link
 
-    demo.load(initialize_chat, inputs=[thread_state], outputs=[
-        chatbot, username_state, thread_state, share_output
-    ])
 
     def user(user_message: str, thread_id: str, username: str, history: list):
         """handle user message and append it to history"""
@@ -217,10 +492,13 @@ with gr.Blocks(title="demo-geocontext") as demo:
             return "", history
 
         message_content = user_message.strip()
-        logger.info(f"user({thread_id}, {username}): {message_content}")
+        set_log_context(thread_id=thread_id, user=username)
+        # the prompt itself only at debug level
+        logger.info("user(%s, %s): %s chars", thread_id, username, len(message_content))
+        logger.debug("user(%s, %s): %s", thread_id, username, message_content)
         return "", history + [{"role": "user", "content": message_content}]
 
-    async def bot(history: list, thread_id: str):
+    async def bot(history: list, thread_id: str, request: gr.Request):
         """answer the last user message in history by invoking the agent"""
 
         global graph
@@ -250,30 +528,91 @@ with gr.Blocks(title="demo-geocontext") as demo:
             yield history
             return
 
-        # required to invoke the graph with short term memory
-        config = {"configurable": {"thread_id": thread_id}}
-        logger.debug(f"bot({thread_id} - {user_message})")
-        async for event in graph.astream({"messages": [{"role": "user", "content": user_message}]}, config=config):
-            logger.debug("Event:", event)
-            
-            # Traiter les différents types d'événements
-            for node_name, node_data in event.items():
-                if "messages" in node_data:
-                    messages = node_data["messages"]
-                    if messages:
-                        last_message = messages[-1] if isinstance(messages, list) else messages
-                        gradio_message = to_gradio_message(last_message)
-                        if gradio_message is not None:
-                            history.append(gradio_message)
-                            yield history
-
-        # Remove metadata for the final message
-        history[-1]["metadata"] = None
-        yield history
+        set_log_context(thread_id=thread_id, user=request.username)
+        logger.debug("bot(%s - %s)", thread_id, user_message)
+        await record_user_turn(request.username, thread_id, user_message)
+        # detached run: a reloaded page attaches to it instead of sending the question again
+        message_id = str(uuid.uuid4())
+        run = await run_registry.start(
+            thread_id,
+            agent_stream(graph, thread_id, user_message, message_id),
+            session_id=request.session_hash,
+            on_cancel=repair_thread,
+            metadata={"user_message": user_message, "message_id": message_id},
+        )
+        async for history in stream_run_history(history, run_registry.subscribe(run, session_id=request.session_hash)):
+            yield history
+
+    async def list_my_threads(username: str | None, cursors: list):
+        """One page of the discussions of the user (after the ``(updated_at, thread_id)`` cursor ``cursors[-1]``)"""
+        db = get_current_database()
+        threads = []
+        if db is not None and not is_anonymous(username):
+            # one more row tells if there is a next page
+            threads = await db.list_user_threads(username, before=cursors[-1], limit=USER_THREADS_PAGE_SIZE + 1)
+        has_next = len(threads) > USER_THREADS_PAGE_SIZE
+        threads = threads[:USER_THREADS_PAGE_SIZE]
+        rows = [
+            [thread["title"] or thread["thread_id"], datetime.fromisoformat(thread["updated_at"]).astimezone(timezone.utc).strftime("%d/%m/%Y %H:%M")]
+            for thread in threads
+        ]
+        page = {
+            "cursors": cursors,
+            "thread_ids": [thread["thread_id"] for thread in threads],
+            "next": [threads[-1]["updated_at"], threads[-1]["thread_id"]] if has_next else None,
+        }
+        return rows, page, gr.update(interactive=len(cursors) > 1), gr.update(interactive=has_next)
+
+    my_threads_outputs = [my_threads, my_threads_state, newer_threads_btn, older_threads_btn]
+
+    async def show_my_threads(username: str | None):
+        """First page of the discussions of the user"""
+        return await list_my_threads(username, [None])
+
+    async def load_my_threads(request: gr.Request):
+        """Panel of the discussions, only shown to an identified user (X-Forwarded-Email)"""
+        panel = gr.update(visible=not is_anonymous(request.username))
+        return panel, *await show_my_threads(request.username)
+
+    demo.load(initialize_chat, inputs=[thread_state], outputs=[
+        chatbot, username_state, thread_state, share_output
+    ])
+    # own event: initialize_chat follows the answer in progress on the thread until its end
+    demo.load(load_my_threads, outputs=[my_threads_panel, *my_threads_outputs])
+
+    @gr.on(older_threads_btn.click, inputs=[username_state, my_threads_state], outputs=my_threads_outputs)
+    async def show_older_threads(username: str | None, page: dict | None):
+        if page is None or page["next"] is None:
+            return await show_my_threads(username)
+        return await list_my_threads(username, page["cursors"] + [page["next"]])
+
+    @gr.on(newer_threads_btn.click, inputs=[username_state, my_threads_state], outputs=my_threads_outputs)
+    async def show_newer_threads(username: str | None, page: dict | None):
+        if page is None or len(page["cursors"]) < 2:
+            return await show_my_threads(username)
+        return await list_my_threads(username, page["cursors"][:-1])
 
     msg.submit(user, [msg, thread_state, username_state, chatbot], [msg, chatbot], queue=False).then(
-        bot, inputs=[chatbot,thread_state], outputs=[chatbot]
-    )
+        # AGENT_CONCURRENCY_LIMIT is enforced by run_registry, after cancelling a previous run of the thread
+        bot, inputs=[chatbot,thread_state], outputs=[chatbot], concurrency_limit=None
+    ).then(show_my_threads, inputs=[username_state], outputs=my_threads_outputs)
+
+    @gr.on(my_threads.select, inputs=[my_threads_state], outputs=[chatbot, thread_state, share_output])
+    async def open_my_thread(page: dict | None, evt: gr.SelectData, request: gr.Request):
+        """Resume a discussion of the user (the answer in progress on the current one continues)"""
+        row = evt.index[0] if isinstance(evt.index, (list, tuple)) else evt.index
+        if page is None or is_anonymous(request.username) or row >= len(page["thread_ids"]):
+            yield gr.skip(), gr.skip(), gr.skip()
+            return
+        thread_id = page["thread_ids"][row]
+        set_log_context(thread_id=thread_id, user=request.username)
+        logger.info("open_my_thread(thread_id=%s, username=%s)", thread_id, request.username)
+        share_link = create_share_link(thread_id)
+        history, run = await load_run_history(thread_id)
+        yield history, thread_id, share_link
+        if run is not None:
+            async for history in stream_run_history(history, run_registry.subscribe(run, session_id=request.session_hash)):
+                yield history, thread_id, share_link
 
     @gr.on(thread_state.change, inputs=[thread_state], outputs=[share_output])
     def create_share_link(thread_id: str):
@@ -282,15 +621,23 @@ with gr.Blocks(title="demo-geocontext") as demo:
             return f"**Lien de partage :** [/discussion?thread_id={thread_id}](/discussion?thread_id={thread_id})"
         return ""
 
-    @gr.on(new_discussion_btn.click, inputs=[username_state], outputs=[chatbot, thread_state, share_output])
-    def reset_thread_id(username: str):
+    @gr.on(new_discussion_btn.click, inputs=[username_state, thread_state], outputs=[chatbot, thread_state, share_output])
+    async def reset_thread_id(username: str, thread_id: str | None):
         """Reset thread_id to start a new conversation"""
 
+        if thread_id:
+            await run_registry.cancel(thread_id, "reset")
         new_thread_id = f"thread-{uuid.uuid4().hex}"
-        logger.info(f"reset_thread_id(username={username}, new_thread_id={new_thread_id})")
+        logger.info("reset_thread_id(username=%s, new_thread_id=%s)", username, new_thread_id)
         share_link = create_share_link(new_thread_id)
         return [], new_thread_id, share_link
 
+    async def detach_session(request: gr.Request):
+        """Detach a closed tab from its runs (cancelled after RUN_DETACH_GRACE_SECONDS without client)"""
+        await run_registry.detach_session(request.session_hash)
+
+    demo.unload(detach_session)
+
 
 # Chatbot in readonly mode
 
@@ -328,15 +675,44 @@ with gr.Blocks(title="demo-geocontext (lecture seule)") as demo_share:
         if thread_id is None:
             raise ValueError("thread_id is required")
 
+        updates = get_thread_updates()
+        if updates is not None:
+            # pushed by NOTIFY after each checkpoint instead of following the runs of this instance only
+            history = None
+            try:
+                async for history in stream_live_history(updates, thread_id, request.session_hash):
+                    yield history, thread_id
+            except Exception as e:
+                logger.error("Erreur lors du suivi de la discussion %s: %s", thread_id, e)
+                if history is None:
+                    yield [], thread_id
+            return
+
         try:
-            history = await load_conversation_history(thread_id)
-            logger.info(f"Historique chargé pour thread_id={thread_id}: {len(history)} messages")
-            return history, thread_id
+            history, run = await load_run_history(thread_id)
+            logger.info("Historique chargé pour thread_id=%s: %s messages", thread_id, len(history))
         except Exception as e:
-            logger.error(f"Erreur lors du chargement de l'historique pour {thread_id}: {e}")
-            return [], thread_id
+            logger.error("Erreur lors du chargement de l'historique pour %s: %s", thread_id, e)
+            yield [], thread_id
+            return
+
+        yield history, thread_id
+        if run is not None:
+            # follow the answer in progress
+            async for history in stream_run_history(history, run_registry.subscribe(run, session_id=request.session_hash)):
+                yield history, thread_id
+
+    # the viewers stay subscribed as long as their page is open (no concurrency limit)
+    demo_share.load(initialize_chat, inputs=[], outputs=[chatbot, thread_state], concurrency_limit=None)
+
+    async def detach_session(request: gr.Request):
+        """Detach a closed tab from the runs and the live updates it follows"""
+        await run_registry.detach_session(request.session_hash)
+        updates = get_thread_updates()
+        if updates is not None:
+            updates.detach_session(request.session_hash)
 
-    demo_share.load(initialize_chat, inputs=[], outputs=[chatbot, thread_state])
+    demo_share.unload(detach_session)
 
 
 # Yes... This is an abusive reuse of Gradio to serve a static markdown page :)
@@ -403,4 +779,6 @@ if __name__ == "__main__":
         # Configuration pour un arrêt plus rapide
         timeout_keep_alive=5,  # Ferme les connexions keep-alive après 5 secondes
         timeout_graceful_shutdown=10,  # Timeout gracieux de 10 secondes
+        # logs uvicorn transmis au logger racine (file d'attente, voir setup_logging)
+        log_config=None,
     )
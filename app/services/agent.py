@@ -1,20 +1,36 @@
+import asyncio
 import logging
-from contextlib import asynccontextmanager
+from contextlib import AsyncExitStack, asynccontextmanager
 from typing import Any, AsyncIterator
 
 from langchain.agents.middleware import ToolRetryMiddleware
+from langchain_core.language_models import BaseChatModel
 from langchain_core.tools import ToolException
 from langchain_mcp_adapters.client import MultiServerMCPClient
 
-from ..config import get_mcp_servers_config
+from ..config import get_mcp_servers_config, get_tool_timeouts_config
 
 from langchain.chat_models import init_chat_model
 from langgraph.graph.state import CompiledStateGraph
 from langchain.agents import create_agent
 
 from ..config import MODEL_NAME, TEMPERATURE, check_api_key
-from ..tools import create_map
-from .db import get_database
+from ..config import FAST_MODEL_NAME, MODEL_ROUTER, ROUTER_MAX_FAST_CHARS, ROUTER_MODEL_NAME
+from ..config import MCP_CASSETTE_MODE, MCP_CASSETTE_PATH, MCP_CASSETTE_SIMULATE_LATENCY
+from ..config import TOOL_OUTPUT_KEEP_GEOMETRY, TOOL_OUTPUT_MAX_FEATURES, TOOL_OUTPUT_PRECISION, TOOL_OUTPUT_PROPERTIES, TOOL_OUTPUT_TRIM, TOOL_OUTPUT_TRIM_TOOLS
+from ..config import TOOL_SELECTION, TOOL_SELECTION_CORE_TOOLS, TOOL_SELECTION_TOP_K
+from ..config import HTTP2, HTTP_CLIENT_SHARED, HTTP_KEEPALIVE_EXPIRY, HTTP_MAX_CONNECTIONS, HTTP_MAX_KEEPALIVE_CONNECTIONS
+from ..config import MCP_HEALTH_INTERVAL, MCP_MAX_CALLS, MCP_MAX_RSS_MB, MCP_RESTART_BACKOFF_MAX, MCP_SUPERVISOR, MCP_WARM_SPARE
+from ..config import WFS_CATALOG
+from ..tools import create_map, search_feature_types
+from .cassette import Cassette, CassetteMiddleware
+from .db import get_database, use_database
+from .http_client import HttpClientPool, get_http_pool
+from .mcp_supervisor import McpSupervisor
+from .model_router import HeuristicClassifier, ModelClassifier, ModelRouterMiddleware
+from .tool_output import GeoJsonTrimMiddleware
+from .tool_selector import ToolSelectorMiddleware
+from .tool_timeout import ToolTimeoutMiddleware
 
 logger = logging.getLogger(__name__)
 
@@ -34,36 +50,138 @@ def format_tool_error(exc: Exception) -> str:
     )
 
 
+def create_chat_model(model_name: str, **kwargs) -> BaseChatModel:
+    """``init_chat_model`` using the shared HTTP client pool when it is started."""
+    pool = get_http_pool()
+    if pool is None:
+        return init_chat_model(model_name, **kwargs)
+    return pool.bind(init_chat_model(model_name, **pool.model_kwargs(model_name), **kwargs))
+
+
+def get_model_router() -> ModelRouterMiddleware:
+    """Routage entre FAST_MODEL_NAME et MODEL_NAME selon MODEL_ROUTER ("heuristic" ou "model")."""
+    check_api_key(model_name=FAST_MODEL_NAME)
+    logger.info("Create fast model: %s (router: %s)", FAST_MODEL_NAME, MODEL_ROUTER)
+    fast_model = create_chat_model(FAST_MODEL_NAME, temperature=TEMPERATURE)
+    if MODEL_ROUTER == "model":
+        check_api_key(model_name=ROUTER_MODEL_NAME)
+        classifier = ModelClassifier(create_chat_model(ROUTER_MODEL_NAME, temperature=0))
+    else:
+        classifier = HeuristicClassifier(max_chars=ROUTER_MAX_FAST_CHARS)
+    return ModelRouterMiddleware(fast_model, classifier)
+
+
 @asynccontextmanager
 async def get_agent() -> AsyncIterator[CompiledStateGraph]:
     """Ouvre la base (``database_lifecycle``) et compile le graphe avec son checkpointer (mémoire si pas de BDD)."""
-    async with get_database() as db:
-        # TODO : improve session management to avoid creation of a session
-        # for each tool call
-        logger.info("Loading tools from MCP servers...")
-        mcp_client = MultiServerMCPClient(get_mcp_servers_config())
-        tools = await mcp_client.get_tools()
+    async with get_database() as db, AsyncExitStack() as stack:
+        # tables of the application, created once at startup (not by each get_database() context)
+        await db.setup()
+        # the request handlers (e.g. the threads of each user) share the database of the checkpointer
+        stack.enter_context(use_database(db))
+        if HTTP_CLIENT_SHARED:
+            # one keep-alive connection pool for the model providers (closed after the graph)
+            await stack.enter_async_context(HttpClientPool(
+                http2=HTTP2,
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+            ))
+        if MCP_CASSETTE_MODE == "replay":
+            logger.info("Loading tools from cassette %s (replay)...", MCP_CASSETTE_PATH)
+            cassette = Cassette.load(MCP_CASSETTE_PATH)
+            tools_by_server = cassette.replay_tools()
+        else:
+            logger.info("Loading tools from MCP servers...")
+            mcp_servers_config = get_mcp_servers_config()
+            if MCP_SUPERVISOR:
+                # one persistent session per server instead of one per tool call
+                supervisor = await stack.enter_async_context(
+                    McpSupervisor(
+                        mcp_servers_config,
+                        warm_spare=MCP_WARM_SPARE,
+                        max_calls=MCP_MAX_CALLS,
+                        max_rss_mb=MCP_MAX_RSS_MB,
+                        health_interval=MCP_HEALTH_INTERVAL,
+                        backoff_max=MCP_RESTART_BACKOFF_MAX,
+                    )
+                )
+                tools_by_server = await supervisor.get_tools()
+            else:
+                mcp_client = MultiServerMCPClient(mcp_servers_config)
+                # load per server to know which server backs each tool (per-server timeouts)
+                server_names = list(mcp_servers_config)
+                server_tools = await asyncio.gather(
+                    *(mcp_client.get_tools(server_name=name) for name in server_names)
+                )
+                tools_by_server = dict(zip(server_names, server_tools))
+            if MCP_CASSETTE_MODE == "record":
+                logger.info("Recording tool calls to cassette %s...", MCP_CASSETTE_PATH)
+                cassette = Cassette(MCP_CASSETTE_PATH)
+                cassette.start_recording(tools_by_server)
+        tools = [tool for server_tools in tools_by_server.values() for tool in server_tools]
         logger.info("Loaded %s tools", len(tools))
 
         logger.info("Add demo specific tools...")
         tools.append(create_map)
+        if WFS_CATALOG:
+            # local search over the WFS feature types, loaded in the background by the server
+            # (the tool defers to the MCP tools until the snapshot is available)
+            tools.append(search_feature_types)
 
         check_api_key()
         logger.info("Create chat model: %s (temperature=%s)", MODEL_NAME, TEMPERATURE)
-        model = init_chat_model(MODEL_NAME, temperature=TEMPERATURE)
+        model = create_chat_model(MODEL_NAME, temperature=TEMPERATURE)
+
+        tool_timeouts_config = get_tool_timeouts_config()
+        supervised = MCP_SUPERVISOR and MCP_CASSETTE_MODE != "replay"
+        if supervised and not MCP_WARM_SPARE and tool_timeouts_config["hedging"]["enabled"]:
+            # the duplicate request is sent to the warm spare, not to the session already running the call
+            logger.warning("Hedging disabled: MCP_SUPERVISOR sends the hedged requests to the warm spare (MCP_WARM_SPARE=false)")
+            tool_timeouts_config["hedging"]["enabled"] = False
 
         logger.info("Create agent (checkpointer: %s)", type(db.checkpointer))
+        middleware = [
+            ToolRetryMiddleware(
+                max_retries=0,
+                retry_on=(ToolException,),
+                on_failure=format_tool_error,
+            ),
+            # inner middleware: timeouts are converted by format_tool_error above
+            ToolTimeoutMiddleware.from_config(
+                tool_timeouts_config, tools_by_server
+            ),
+        ]
+        if TOOL_OUTPUT_TRIM:
+            # outside the timeouts and the cassette: the raw outputs are recorded
+            middleware.insert(1, GeoJsonTrimMiddleware(
+                set(TOOL_OUTPUT_TRIM_TOOLS),
+                max_features=TOOL_OUTPUT_MAX_FEATURES,
+                properties=TOOL_OUTPUT_PROPERTIES,
+                precision=TOOL_OUTPUT_PRECISION,
+                keep_geometry=TOOL_OUTPUT_KEEP_GEOMETRY,
+            ))
+        if TOOL_SELECTION:
+            # index built once, before the router (the fast model gets the same subset)
+            middleware.append(ToolSelectorMiddleware(
+                tools, top_k=TOOL_SELECTION_TOP_K, core_tools=set(TOOL_SELECTION_CORE_TOOLS)
+            ))
+        if MODEL_ROUTER:
+            middleware.append(get_model_router())
+        if MCP_CASSETTE_MODE:
+            middleware.append(
+                CassetteMiddleware(
+                    cassette,
+                    MCP_CASSETTE_MODE,
+                    simulate_latency=MCP_CASSETTE_SIMULATE_LATENCY,
+                )
+            )
+
         agent = create_agent(
             model=model,
             tools=tools,
             checkpointer=db.checkpointer,
-            middleware=[
-                ToolRetryMiddleware(
-                    max_retries=0,
-                    retry_on=(ToolException,),
-                    on_failure=format_tool_error,
-                )
-            ],
+            middleware=middleware,
         )
 
         logger.info(f"Agent created successfully")
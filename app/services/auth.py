@@ -1,14 +1,23 @@
-from fastapi import Request
+from fastapi import Depends, HTTPException, Request
 
+from ..config import ADMIN_GROUP
 from ..models import User
 
+# email of the requests without X-Forwarded-Email (shared by every unauthenticated visitor)
+ANONYMOUS_EMAIL = "anonymous@gpf.fr"
+
+
+def is_anonymous(email: str | None) -> bool:
+    """True if ``email`` doesn't identify a user (no forwarded user)."""
+    return not email or email == ANONYMOUS_EMAIL
+
 
 def get_current_user(request: Request) -> User:
     """Retrieve current user from forwarded headers in request."""
     # X-Forwarded-User, X-Forwarded-Email, X-Forwarded-Preferred-Username and X-Forwarded-Groups
     user_id = request.headers.get("X-Forwarded-User", "anonymous")
     username = request.headers.get("X-Forwarded-Preferred-Username", "anonymous")
-    email = request.headers.get("X-Forwarded-Email", "anonymous@gpf.fr")
+    email = request.headers.get("X-Forwarded-Email", ANONYMOUS_EMAIL)
 
     groups_str = request.headers.get("X-Forwarded-Groups")
     if groups_str is None:
@@ -17,3 +26,10 @@ def get_current_user(request: Request) -> User:
         groups = [g.strip() for g in groups_str.split(",") if g.strip()]
 
     return User(id=user_id, username=username, email=email, groups=groups)
+
+
+def get_admin_user(user: User = Depends(get_current_user)) -> User:
+    """Require the current user to be a member of ADMIN_GROUP."""
+    if ADMIN_GROUP not in user.groups:
+        raise HTTPException(status_code=403, detail="admin access required")
+    return user
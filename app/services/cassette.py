@@ -0,0 +1,190 @@
+"""Enregistrement et rejeu (« cassette ») des appels d'outils MCP.
+
+In ``record`` mode, the tool definitions loaded from the MCP servers and every
+tool call (name, arguments, result or error, latency) are appended to a JSONL
+file. In ``replay`` mode, the tools are rebuilt from that file and the recorded
+results are served locally, without starting the MCP servers.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable
+
+from langchain.agents.middleware import AgentMiddleware, ToolCallRequest
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import BaseTool, StructuredTool, ToolException
+from langgraph.types import Command
+
+logger = logging.getLogger(__name__)
+
+CASSETTE_MODES = ("record", "replay")
+
+
+def _call_key(tool_name: str, args: dict[str, Any]) -> str:
+    return tool_name + ":" + json.dumps(args, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def _args_schema(tool: BaseTool) -> dict[str, Any]:
+    # MCP tools keep the server inputSchema as a dict
+    if isinstance(tool.args_schema, dict):
+        return tool.args_schema
+    return tool.get_input_schema().model_json_schema()
+
+
+class Cassette:
+    """Tool definitions and recorded tool calls backed by a JSONL file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tools: list[dict[str, Any]] = []
+        self._calls: dict[str, deque[dict[str, Any]]] = defaultdict(deque)
+        # the appends run in a worker thread, one at a time (lines are not interleaved)
+        self._write_lock = asyncio.Lock()
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        cassette = cls(path)
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry["type"] == "tool":
+                    cassette.tools.append(entry)
+                elif entry["type"] == "call":
+                    cassette._calls[_call_key(entry["name"], entry["args"])].append(entry)
+        logger.info("Cassette %s loaded: %s tools, %s calls", path, len(cassette.tools), cassette.call_count)
+        return cassette
+
+    @property
+    def call_count(self) -> int:
+        return sum(len(calls) for calls in self._calls.values())
+
+    def _append(self, entry: dict[str, Any]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+
+    def start_recording(self, tools_by_server: dict[str, list[BaseTool]]) -> None:
+        """Truncate the cassette and write the tool definitions."""
+        open(self.path, "w", encoding="utf-8").close()
+        for server_name, tools in tools_by_server.items():
+            for tool in tools:
+                entry = {
+                    "type": "tool",
+                    "server": server_name,
+                    "name": tool.name,
+                    "description": tool.description,
+                    "args_schema": _args_schema(tool),
+                    "metadata": tool.metadata,
+                }
+                self.tools.append(entry)
+                self._append(entry)
+
+    async def record(
+        self, tool_name: str, args: dict[str, Any], result: ToolMessage | Exception, latency: float
+    ) -> None:
+        """Record a tool result, or the exception raised by the tool as an error result."""
+        entry = {
+            "type": "call",
+            "name": tool_name,
+            "args": args,
+            "latency": round(latency, 3),
+        }
+        if isinstance(result, Exception):
+            entry.update(content=str(result), status="error", exception=type(result).__name__)
+        else:
+            entry.update(content=result.content, status=result.status)
+        self._calls[_call_key(tool_name, args)].append(entry)
+        async with self._write_lock:
+            await asyncio.to_thread(self._append, entry)
+
+    def lookup(self, tool_name: str, args: dict[str, Any]) -> dict[str, Any] | None:
+        """Recorded call for these arguments (repeated calls are served in order, the last one is kept)."""
+        calls = self._calls.get(_call_key(tool_name, args))
+        if not calls:
+            return None
+        return calls.popleft() if len(calls) > 1 else calls[0]
+
+    def replay_tools(self) -> dict[str, list[BaseTool]]:
+        """Tools rebuilt from the recorded definitions, grouped by server.
+
+        These tools only expose the schemas to the model: calls are answered by
+        ``CassetteMiddleware`` in replay mode.
+        """
+
+        def make_tool(definition: dict[str, Any]) -> BaseTool:
+            async def not_recorded(**_kwargs: Any) -> str:
+                raise ToolException(f"L'outil '{definition['name']}' n'est disponible qu'en rejeu")
+
+            return StructuredTool(
+                name=definition["name"],
+                description=definition["description"] or "",
+                args_schema=definition["args_schema"],
+                coroutine=not_recorded,
+                metadata=definition["metadata"],
+            )
+
+        tools_by_server: dict[str, list[BaseTool]] = defaultdict(list)
+        for definition in self.tools:
+            tools_by_server[definition["server"]].append(make_tool(definition))
+        return dict(tools_by_server)
+
+
+class CassetteMiddleware(AgentMiddleware):
+    """Record MCP tool calls to a cassette or answer them from it.
+
+    Only the tools defined in the cassette are recorded / replayed (local tools
+    such as ``create_map`` always run for real). With ``simulate_latency``, the
+    replay waits for the recorded duration before answering.
+
+    A tool call that raised is recorded with its error message and replayed as
+    a ``ToolException`` with the same message, so the outer middleware (retry,
+    ``format_tool_error``) turns it into the same error result as when recorded.
+    """
+
+    def __init__(self, cassette: Cassette, mode: str, *, simulate_latency: bool = False):
+        super().__init__()
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Invalid cassette mode: {mode} (expected one of {CASSETTE_MODES})")
+        self.cassette = cassette
+        self.mode = mode
+        self.simulate_latency = simulate_latency
+        self._tool_names = {definition["name"] for definition in cassette.tools}
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: Callable[[ToolCallRequest], Awaitable[ToolMessage | Command[Any]]],
+    ) -> ToolMessage | Command[Any]:
+        tool_call = request.tool_call
+        if tool_call["name"] not in self._tool_names:
+            return await handler(request)
+
+        if self.mode == "replay":
+            entry = self.cassette.lookup(tool_call["name"], tool_call["args"])
+            if entry is None:
+                raise ToolException(
+                    f"Aucun résultat enregistré pour l'appel {tool_call['name']}({tool_call['args']})"
+                )
+            if self.simulate_latency:
+                await asyncio.sleep(entry["latency"])
+            if "exception" in entry:
+                raise ToolException(entry["content"])
+            return ToolMessage(
+                content=entry["content"],
+                tool_call_id=tool_call["id"],
+                name=tool_call["name"],
+                status=entry["status"],
+            )
+
+        start = time.perf_counter()
+        try:
+            result = await handler(request)
+        except Exception as e:
+            await self.cassette.record(tool_call["name"], tool_call["args"], e, time.perf_counter() - start)
+            raise
+        if isinstance(result, ToolMessage):
+            await self.cassette.record(tool_call["name"], tool_call["args"], result, time.perf_counter() - start)
+        return result
@@ -0,0 +1,265 @@
+"""Index local du catalogue des types d'objets WFS de la Géoplateforme (instantané et recherche)."""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import xml.etree.ElementTree as ET
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Any
+
+import httpx
+
+from .tool_selector import TextIndex
+
+logger = logging.getLogger(__name__)
+
+WFS_URL = "https://data.geopf.fr/wfs/ows"
+WFS_NAMESPACES = {"wfs": "http://www.opengis.net/wfs/2.0", "ows": "http://www.opengis.net/ows/1.1"}
+# maximum length of an abstract in the search results
+MAX_ABSTRACT_CHARS = 300
+# delay between two checks of the snapshot file by maintain_catalog
+CHECK_INTERVAL_SECONDS = 3600
+
+# loaded snapshot (see refresh_catalog)
+_catalog: "FeatureCatalog | None" = None
+# (path, mtime) of the last file that could not be loaded, not read again until it is replaced
+_failed: tuple[str, float] | None = None
+
+
+def _wgs84_bbox(element: ET.Element) -> list[float] | None:
+    """``[min lon, min lat, max lon, max lat]`` of a feature type (None if missing or invalid)."""
+    box = element.find("ows:WGS84BoundingBox", WFS_NAMESPACES)
+    if box is None:
+        return None
+    try:
+        min_x, min_y = (float(value) for value in box.findtext("ows:LowerCorner", "", WFS_NAMESPACES).split())
+        max_x, max_y = (float(value) for value in box.findtext("ows:UpperCorner", "", WFS_NAMESPACES).split())
+    except ValueError:
+        return None
+    if not (-180 <= min_x <= max_x <= 180 and -90 <= min_y <= max_y <= 90):
+        return None
+    return [min_x, min_y, max_x, max_y]
+
+
+def parse_capabilities(xml: bytes) -> list[dict[str, Any]]:
+    """Feature types (name, title, abstract, keywords, extent) of a WFS 2.0 GetCapabilities document."""
+    root = ET.fromstring(xml)
+    feature_types = []
+    for element in root.iterfind(".//wfs:FeatureTypeList/wfs:FeatureType", WFS_NAMESPACES):
+        name = element.findtext("wfs:Name", "", WFS_NAMESPACES).strip()
+        if not name:
+            continue
+        feature_types.append({
+            "name": name,
+            "title": element.findtext("wfs:Title", "", WFS_NAMESPACES).strip(),
+            "abstract": element.findtext("wfs:Abstract", "", WFS_NAMESPACES).strip(),
+            "keywords": [
+                keyword.text.strip()
+                for keyword in element.iterfind("ows:Keywords/ows:Keyword", WFS_NAMESPACES)
+                if keyword.text and keyword.text.strip()
+            ],
+            "bbox": _wgs84_bbox(element),
+            "properties": [],
+        })
+    return feature_types
+
+
+def parse_describe_feature_type(data: dict[str, Any]) -> dict[str, list[dict[str, str]]]:
+    """``prefix:name`` -> properties (name, type) of a GeoServer JSON DescribeFeatureType response."""
+    prefix = data.get("targetPrefix")
+    schemas = {}
+    for feature_type in data.get("featureTypes", []):
+        name = feature_type.get("typeName", "")
+        if prefix and ":" not in name:
+            name = f"{prefix}:{name}"
+        schemas[name] = [
+            {"name": prop["name"], "type": prop.get("localType") or prop.get("type", "")}
+            for prop in feature_type.get("properties", [])
+            if prop.get("name")
+        ]
+    return schemas
+
+
+async def build_catalog(
+    url: str = WFS_URL,
+    *,
+    batch_size: int = 20,
+    concurrency: int = 4,
+    client: httpx.AsyncClient | None = None,
+) -> dict[str, Any]:
+    """Snapshot of the feature types of a WFS service with their schemas.
+
+    The schemas are requested by batches of types sharing the same namespace
+    (a failed batch leaves its types without properties).
+    """
+    own_client = client is None
+    client = client or httpx.AsyncClient(timeout=60, follow_redirects=True)
+    try:
+        response = await client.get(url, params={"service": "WFS", "version": "2.0.0", "request": "GetCapabilities"})
+        response.raise_for_status()
+        feature_types = parse_capabilities(response.content)
+        logger.info("catalog: %s feature types in %s", len(feature_types), url)
+
+        by_prefix = defaultdict(list)
+        for feature_type in feature_types:
+            by_prefix[feature_type["name"].partition(":")[0]].append(feature_type["name"])
+        batches = [names[i:i + batch_size] for names in by_prefix.values() for i in range(0, len(names), batch_size)]
+
+        semaphore = asyncio.Semaphore(concurrency)
+        schemas: dict[str, list[dict[str, str]]] = {}
+
+        async def describe(names: list[str]) -> None:
+            async with semaphore:
+                try:
+                    response = await client.get(url, params={
+                        "service": "WFS",
+                        "version": "2.0.0",
+                        "request": "DescribeFeatureType",
+                        "typeNames": ",".join(names),
+                        "outputFormat": "application/json",
+                    })
+                    response.raise_for_status()
+                    schemas.update(parse_describe_feature_type(response.json()))
+                except (httpx.HTTPError, ValueError) as e:
+                    logger.warning("catalog: DescribeFeatureType failed for %s (%s)", names[0], e)
+
+        await asyncio.gather(*(describe(names) for names in batches))
+    finally:
+        if own_client:
+            await client.aclose()
+
+    for feature_type in feature_types:
+        feature_type["properties"] = schemas.get(feature_type["name"], [])
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "source": url,
+        "feature_types": feature_types,
+    }
+
+
+def write_catalog(catalog: dict[str, Any], path: str) -> None:
+    """Write a snapshot (gzipped if ``path`` ends with ``.gz``), atomically."""
+    data = json.dumps(catalog, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    if path.endswith(".gz"):
+        data = gzip.compress(data, mtime=0)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _type_text(feature_type: dict[str, Any]) -> str:
+    # the name (namespace and type) twice, it is the most specific
+    name = feature_type["name"].replace(":", " ")
+    return " ".join([
+        name, name,
+        feature_type.get("title", ""),
+        feature_type.get("abstract", ""),
+        " ".join(feature_type.get("keywords", [])),
+        " ".join(prop["name"] for prop in feature_type.get("properties", [])),
+    ])
+
+
+class FeatureCatalog:
+    """In-process search index over a snapshot of the WFS feature types."""
+
+    def __init__(self, catalog: dict[str, Any], *, path: str | None = None, mtime: float | None = None):
+        self.path = path
+        self.mtime = mtime
+        self.source = catalog.get("source")
+        self.created_at = datetime.fromisoformat(catalog["created_at"])
+        self.feature_types = {feature_type["name"]: feature_type for feature_type in catalog["feature_types"]}
+        self.index = TextIndex(list(self.feature_types), [_type_text(t) for t in self.feature_types.values()])
+
+    @classmethod
+    def load(cls, path: str) -> "FeatureCatalog":
+        mtime = os.stat(path).st_mtime
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            catalog = json.loads(f.read())
+        return cls(catalog, path=path, mtime=mtime)
+
+    def age_seconds(self) -> float:
+        return (datetime.now(timezone.utc) - self.created_at).total_seconds()
+
+    def is_stale(self, max_age_seconds: float) -> bool:
+        return self.age_seconds() > max_age_seconds
+
+    def search(self, query: str, limit: int = 5) -> list[dict[str, Any]]:
+        """Best matching feature types with their properties (abstract shortened)."""
+        results = []
+        for name in self.index.search(query, limit):
+            feature_type = self.feature_types[name]
+            abstract = feature_type.get("abstract", "")
+            if len(abstract) > MAX_ABSTRACT_CHARS:
+                abstract = abstract[:MAX_ABSTRACT_CHARS] + "…"
+            results.append({
+                "typename": name,
+                "title": feature_type.get("title", ""),
+                "abstract": abstract,
+                "properties": {prop["name"]: prop["type"] for prop in feature_type.get("properties", [])},
+            })
+        return results
+
+
+def get_catalog() -> FeatureCatalog | None:
+    """Loaded snapshot (kept up to date by ``refresh_catalog``), without any I/O."""
+    return _catalog
+
+
+async def refresh_catalog(path: str) -> FeatureCatalog | None:
+    """Load the snapshot at ``path`` off the event loop if the file changed since the last load.
+
+    A file that can't be read is remembered and skipped until it is replaced,
+    the previous snapshot is kept meanwhile.
+    """
+    global _catalog, _failed
+    try:
+        mtime = (await asyncio.to_thread(os.stat, path)).st_mtime
+    except OSError:
+        return _catalog
+    if _catalog is not None and (_catalog.path, _catalog.mtime) == (path, mtime):
+        return _catalog
+    if _failed == (path, mtime):
+        return _catalog
+    try:
+        catalog = await asyncio.to_thread(FeatureCatalog.load, path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning("catalog: %s could not be loaded (%s)", path, e)
+        _failed = (path, mtime)
+        return _catalog
+    _catalog, _failed = catalog, None
+    logger.info(
+        "catalog: %s feature types loaded from %s (created at %s)",
+        len(catalog.feature_types), path, catalog.created_at.isoformat(),
+    )
+    return _catalog
+
+
+async def maintain_catalog(
+    path: str,
+    url: str = WFS_URL,
+    *,
+    max_age_seconds: float,
+    interval: float = CHECK_INTERVAL_SECONDS,
+) -> None:
+    """Keep the snapshot at ``path`` loaded, (re)built from ``url`` when it is missing or stale.
+
+    Runs until cancelled (background task of the server). The file is checked
+    every ``interval`` seconds: a snapshot replaced by a scheduled
+    ``app.cli catalog`` is reloaded, a failed build is retried at the next check.
+    """
+    while True:
+        catalog = await refresh_catalog(path)
+        if catalog is None or catalog.is_stale(max_age_seconds):
+            logger.info("catalog: building the snapshot of %s", url)
+            try:
+                snapshot = await build_catalog(url)
+                await asyncio.to_thread(write_catalog, snapshot, path)
+            except (httpx.HTTPError, ET.ParseError, OSError) as e:
+                logger.warning("catalog: snapshot of %s failed (%s), next attempt in %s s", url, e, interval)
+            else:
+                await refresh_catalog(path)
+        await asyncio.sleep(interval)
@@ -0,0 +1,105 @@
+"""Exécution d'un tour de l'agent sous forme d'événements (API SSE) et limite de concurrence partagée."""
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage, message_to_dict
+from langgraph.graph.state import CompiledStateGraph
+
+from ..config import AGENT_CONCURRENCY_LIMIT
+from .tool_output import untrimmed_content
+
+logger = logging.getLogger(__name__)
+
+# shared by the Gradio chatbot and the HTTP API
+_run_slots: asyncio.Semaphore | None = None
+
+
+@asynccontextmanager
+async def run_slot() -> AsyncIterator[None]:
+    """Wait for one of the AGENT_CONCURRENCY_LIMIT agent run slots."""
+    global _run_slots
+    if _run_slots is None:
+        _run_slots = asyncio.Semaphore(AGENT_CONCURRENCY_LIMIT)
+    async with _run_slots:
+        yield
+
+
+def events_from_update(update: dict[str, Any]) -> list[dict[str, Any]]:
+    """Events for the messages added by a graph node ("updates" stream mode)."""
+    events = []
+    for node_data in update.values():
+        if not isinstance(node_data, dict) or not node_data.get("messages"):
+            continue
+        messages = node_data["messages"]
+        for message in messages if isinstance(messages, list) else [messages]:
+            if isinstance(message, ToolMessage):
+                events.append({
+                    "event": "tool_result",
+                    "data": {
+                        "tool_call_id": message.tool_call_id,
+                        "name": message.name,
+                        "status": message.status,
+                        # full output (the model may have received a trimmed version)
+                        "content": untrimmed_content(message) or message.text,
+                    },
+                })
+            elif isinstance(message, AIMessage) and message.tool_calls:
+                for tool_call in message.tool_calls:
+                    events.append({
+                        "event": "tool_call",
+                        "data": {"id": tool_call["id"], "name": tool_call["name"], "args": tool_call["args"]},
+                    })
+            elif isinstance(message, AIMessage):
+                events.append({"event": "message", "data": message_to_dict(message)})
+    return events
+
+
+def agent_stream(graph: CompiledStateGraph, thread_id: str, user_message: str, message_id: str | None = None) -> AsyncIterator[tuple[str, Any]]:
+    """Raw ``(mode, chunk)`` items of one turn ("messages" and "updates" stream modes)."""
+    config = {"configurable": {"thread_id": thread_id}}
+    inputs = {"messages": [HumanMessage(content=user_message, id=message_id)]}
+    return graph.astream(inputs, config=config, stream_mode=["messages", "updates"])
+
+
+async def agent_events(items: AsyncIterator[tuple[str, Any]], thread_id: str) -> AsyncIterator[dict[str, Any]]:
+    """Convert ``agent_stream()`` items to ``{"event", "data"}`` dicts: token, tool_call, tool_result, message, done or error."""
+    try:
+        async for mode, chunk in items:
+            if mode == "messages":
+                # chunks of streaming models, whole message otherwise
+                message, _metadata = chunk
+                if isinstance(message, AIMessage) and message.text:
+                    yield {"event": "token", "data": {"content": message.text}}
+            else:
+                for event in events_from_update(chunk):
+                    yield event
+    except Exception as e:
+        logger.exception("agent_events(%s) failed", thread_id)
+        yield {"event": "error", "data": {"message": str(e)}}
+        return
+    yield {"event": "done", "data": {"thread_id": thread_id}}
+
+
+def format_sse(event: dict[str, Any]) -> str:
+    """Server-Sent Event frame (one JSON ``data:`` line)."""
+    data = json.dumps(event["data"], ensure_ascii=False, default=str)
+    return f"event: {event['event']}\ndata: {data}\n\n"
+
+
+async def get_history_page(graph: CompiledStateGraph, thread_id: str, *, offset: int = 0, limit: int = 50) -> dict[str, Any]:
+    """Page of the messages of a thread (oldest first)."""
+    state = await graph.aget_state({"configurable": {"thread_id": thread_id}})
+    messages = state.values.get("messages", [])
+    offset = min(offset, len(messages))
+    page = messages[offset:offset + limit]
+    next_offset = offset + len(page)
+    return {
+        "thread_id": thread_id,
+        "total": len(messages),
+        "offset": offset,
+        "next_offset": next_offset if next_offset < len(messages) else None,
+        "messages": [message_to_dict(message) for message in page],
+    }
@@ -0,0 +1,222 @@
+"""Analyse de la taille des checkpoints (par thread, par type de message, par outil) en mémoire bornée."""
+import heapq
+import math
+import zlib
+from typing import Any, AsyncIterator
+
+from langchain_core.messages import BaseMessage, ToolMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from .db import BaseDatabase
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+
+class SizeDistribution:
+    """Count, total, max and approximate percentiles of sizes in constant memory.
+
+    Sizes are counted in power of two buckets: percentiles are upper bounds
+    (at most twice the exact value).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self._buckets: dict[int, int] = {}
+
+    def add(self, size: int) -> None:
+        self.count += 1
+        self.total += size
+        self.max = max(self.max, size)
+        bucket = max(0, math.ceil(math.log2(size))) if size > 0 else 0
+        self._buckets[bucket] = self._buckets.get(bucket, 0) + 1
+
+    def percentile(self, q: float) -> int:
+        if not self.count:
+            return 0
+        rank = max(1, math.ceil(q / 100 * self.count))
+        seen = 0
+        for bucket in sorted(self._buckets):
+            seen += self._buckets[bucket]
+            if seen >= rank:
+                return min(2 ** bucket, self.max)
+        return self.max
+
+    def to_dict(self) -> dict[str, int]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total // self.count if self.count else 0,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+
+async def _merge_latest(sizes: AsyncIterator[dict[str, Any]], latest: AsyncIterator[dict[str, Any]]):
+    """Pair each thread of ``iter_thread_sizes`` with its ``iter_latest_threads`` item (both ordered by thread_id)."""
+    pending = await anext(latest, None)
+    async for thread in sizes:
+        while pending is not None and pending["thread_id"] < thread["thread_id"]:
+            pending = await anext(latest, None)
+        if pending is not None and pending["thread_id"] == thread["thread_id"]:
+            yield thread, pending
+        else:
+            yield thread, None
+
+
+class CheckpointStats:
+    """Aggregate the checkpoint sizes of the threads, one thread at a time.
+
+    Only the distributions, the ``top`` heaviest threads and the totals are
+    kept, so memory doesn't grow with the number of threads.
+    """
+
+    def __init__(self, top: int = 10):
+        self.top = top
+        self.serde = JsonPlusSerializer()
+        self.threads = 0
+        self.totals = {"checkpoints": 0, "stored_bytes": 0, "latest_bytes": 0, "uncompressed_bytes": 0}
+        self.thread_bytes = SizeDistribution()
+        self.latest_bytes = SizeDistribution()
+        self.checkpoints_per_thread = SizeDistribution()
+        self.message_types: dict[str, SizeDistribution] = {}
+        self.tool_outputs: dict[str, SizeDistribution] = {}
+        self._heaviest: list[tuple[int, str, dict[str, Any]]] = []
+        # compression ratio measured on the latest messages
+        self._sample_raw = 0
+        self._sample_compressed = 0
+
+    def message_size(self, message: BaseMessage) -> int:
+        return len(self.serde.dumps_typed(message)[1])
+
+    def _compress(self, data: bytes) -> bytes:
+        if zstandard is not None:
+            return zstandard.ZstdCompressor(level=3).compress(data)
+        return zlib.compress(data, 1)
+
+    def add(self, sizes: dict[str, Any], messages: list[BaseMessage] | None = None) -> None:
+        stored = sizes["checkpoint_bytes"] + sizes["blob_bytes"] + sizes["write_bytes"]
+        self.threads += 1
+        self.totals["checkpoints"] += sizes["checkpoints"]
+        self.totals["stored_bytes"] += stored
+        self.totals["latest_bytes"] += sizes["latest_bytes"]
+        self.totals["uncompressed_bytes"] += sizes["uncompressed_bytes"]
+        self.thread_bytes.add(stored)
+        self.latest_bytes.add(sizes["latest_bytes"])
+        self.checkpoints_per_thread.add(sizes["checkpoints"])
+
+        summary = {
+            "thread_id": sizes["thread_id"],
+            "checkpoints": sizes["checkpoints"],
+            "stored_bytes": stored,
+            "latest_bytes": sizes["latest_bytes"],
+            "messages": len(messages or []),
+        }
+        entry = (stored, sizes["thread_id"], summary)
+        if len(self._heaviest) < self.top:
+            heapq.heappush(self._heaviest, entry)
+        elif self.top and entry[:2] > self._heaviest[0][:2]:
+            heapq.heapreplace(self._heaviest, entry)
+
+        if messages:
+            data = self.serde.dumps_typed(messages)[1]
+            self._sample_raw += len(data)
+            self._sample_compressed += len(self._compress(data))
+            for message in messages:
+                size = self.message_size(message)
+                self.message_types.setdefault(message.type, SizeDistribution()).add(size)
+                if isinstance(message, ToolMessage):
+                    self.tool_outputs.setdefault(message.name or "unknown", SizeDistribution()).add(size)
+
+    def compression_ratio(self) -> float | None:
+        """Compressed / raw size of the latest messages (None without messages)."""
+        if not self._sample_raw:
+            return None
+        return self._sample_compressed / self._sample_raw
+
+    def report(self) -> dict[str, Any]:
+        stored = self.totals["stored_bytes"]
+        ratio = self.compression_ratio()
+        return {
+            "threads": self.threads,
+            "totals": dict(self.totals),
+            "thread_bytes": self.thread_bytes.to_dict(),
+            "latest_bytes": self.latest_bytes.to_dict(),
+            "checkpoints_per_thread": self.checkpoints_per_thread.to_dict(),
+            "message_types": {name: d.to_dict() for name, d in sorted(self.message_types.items())},
+            "tool_outputs": {
+                name: d.to_dict() for name, d in sorted(self.tool_outputs.items(), key=lambda item: -item[1].total)
+            },
+            "heaviest_threads": [summary for _, _, summary in sorted(self._heaviest, reverse=True)],
+            "savings": {
+                # keep only the latest checkpoint of each thread
+                "prune_bytes": max(0, stored - self.totals["latest_bytes"]),
+                # compress the values stored without compression (ratio measured on the latest messages)
+                "compression_codec": "zstd" if zstandard is not None else "zlib",
+                "compression_ratio": round(ratio, 3) if ratio is not None else None,
+                "compression_bytes": round(self.totals["uncompressed_bytes"] * (1 - ratio)) if ratio is not None else 0,
+            },
+        }
+
+
+async def analyze_checkpoints(db: BaseDatabase, *, top: int = 10, batch_size: int = 100) -> dict[str, Any]:
+    """Size report of the checkpoints of ``db`` (see ``CheckpointStats.report``)."""
+    stats = CheckpointStats(top=top)
+    sizes = db.iter_thread_sizes(batch_size=batch_size)
+    latest = db.iter_latest_threads(batch_size=batch_size)
+    async for thread, latest_thread in _merge_latest(sizes, latest):
+        stats.add(thread, latest_thread["messages"] if latest_thread is not None else None)
+    return stats.report()
+
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def format_report(report: dict[str, Any]) -> str:
+    """Human readable version of ``analyze_checkpoints()``."""
+
+    def distribution(name: str, d: dict[str, int], unit=_format_bytes) -> str:
+        return (
+            f"  {name:<24} n={d['count']:<6} total={unit(d['total']):<10} mean={unit(d['mean']):<10}"
+            f" p50<={unit(d['p50']):<10} p90<={unit(d['p90']):<10} p99<={unit(d['p99']):<10} max={unit(d['max'])}"
+        )
+
+    totals, savings = report["totals"], report["savings"]
+    lines = [
+        f"Threads: {report['threads']}, checkpoints: {totals['checkpoints']}, stored: {_format_bytes(totals['stored_bytes'])}",
+        "",
+        "Per thread:",
+        distribution("stored", report["thread_bytes"]),
+        distribution("latest state (per turn)", report["latest_bytes"]),
+        distribution("checkpoints", report["checkpoints_per_thread"], unit=str),
+        "",
+        "Latest messages by type:",
+        *(distribution(name, d) for name, d in report["message_types"].items()),
+        "",
+        "Tool outputs by tool:",
+        *(distribution(name, d) for name, d in report["tool_outputs"].items()),
+        "",
+        "Heaviest threads:",
+        *(
+            f"  {t['thread_id']:<40} stored={_format_bytes(t['stored_bytes']):<10} latest={_format_bytes(t['latest_bytes']):<10}"
+            f" checkpoints={t['checkpoints']:<6} messages={t['messages']}"
+            for t in report["heaviest_threads"]
+        ),
+        "",
+        "Estimated savings:",
+        f"  keep only the latest checkpoint: {_format_bytes(savings['prune_bytes'])}",
+        f"  compress uncompressed values ({savings['compression_codec']}, ratio {savings['compression_ratio']}):"
+        f" {_format_bytes(savings['compression_bytes'])}",
+    ]
+    return "\n".join(lines)
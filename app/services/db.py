@@ -1,9 +1,10 @@
-"""Checkpointers LangGraph (InMemorySaver, AsyncPostgresSaver), create_database, database_lifecycle, get_database."""
+"""Checkpointers LangGraph (BoundedMemorySaver, AsyncSqliteSaver, AsyncPostgresSaver), create_database, database_lifecycle, get_database."""
 
 import logging
 import os
-from contextlib import asynccontextmanager
-from typing import AsyncIterator
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator
 
 from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
@@ -11,11 +12,43 @@ from langgraph.checkpoint.postgres.aio import AsyncPostgresSaver
 from psycopg import AsyncConnection
 from psycopg_pool import AsyncConnectionPool
 
-from ..config import DB_URI
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from ..config import CHECKPOINT_COMPRESSION, CHECKPOINT_COMPRESSION_THRESHOLD, DB_URI
+from ..config import MEMORY_IDLE_SECONDS, MEMORY_MAX_BYTES, MEMORY_MAX_THREADS, MEMORY_SPILL_DIR
+from .memory_saver import BoundedMemorySaver
+from .serializer import CompressedSerializer
 
 logger = logging.getLogger(__name__)
 
 
+# maximum length of a thread title (the first question)
+TITLE_MAX_CHARS = 80
+
+
+def thread_title(message: str) -> str:
+    """Title of a thread from its first question (one line, shortened)."""
+    title = " ".join(message.split())
+    if len(title) > TITLE_MAX_CHARS:
+        title = title[:TITLE_MAX_CHARS - 1].rstrip() + "…"
+    return title
+
+
+def _now() -> str:
+    # fixed width: the ISO timestamps are also compared as text (SQLite, memory)
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+def _in_range(ts: str, since: datetime | None, until: datetime | None) -> bool:
+    updated_at = datetime.fromisoformat(ts)
+    if since is not None and updated_at < since:
+        return False
+    if until is not None and updated_at >= until:
+        return False
+    return True
+
+
 class BaseDatabase:
     def __init__(self, checkpointer: InMemorySaver | AsyncPostgresSaver):
         self.checkpointer = checkpointer
@@ -23,19 +56,228 @@ class BaseDatabase:
     async def is_healthy(self) -> bool:
         raise NotImplementedError("is_healthy method must be implemented by subclasses")
 
+    async def list_thread_ids(self) -> list[str]:
+        """Sorted ids of the threads having at least one checkpoint."""
+        raise NotImplementedError("list_thread_ids method must be implemented by subclasses")
+
+    def get_stats(self) -> dict[str, Any]:
+        """Backend specific usage statistics (exposed on /health/db)."""
+        return {}
+
+    async def setup(self) -> None:
+        """Create the tables of the application, once at startup in ``get_agent()`` (the checkpointer creates its own)."""
+
+    async def touch_user_thread(self, user: str, thread_id: str, title: str) -> None:
+        """Record a turn of ``user`` on ``thread_id`` (the title is kept from the first turn)."""
+        raise NotImplementedError("touch_user_thread method must be implemented by subclasses")
+
+    async def list_user_threads(
+        self, user: str, *, before: tuple[str, str] | None = None, limit: int = 10
+    ) -> list[dict[str, Any]]:
+        """Threads of ``user``, most recently active first.
+
+        Returns ``{"thread_id", "title", "created_at", "updated_at"}`` dicts (ISO
+        timestamps); ``before`` is the ``(updated_at, thread_id)`` of the last
+        thread of the previous page.
+        """
+        raise NotImplementedError("list_user_threads method must be implemented by subclasses")
+
+    async def get_thread_users(self, thread_id: str) -> list[str]:
+        """Users having recorded a turn on ``thread_id`` (see ``touch_user_thread``)."""
+        raise NotImplementedError("get_thread_users method must be implemented by subclasses")
+
+    def iter_latest_threads(
+        self,
+        *,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        after: str | None = None,
+        batch_size: int = 100,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Iterate over threads ordered by thread_id with the messages of their latest checkpoint.
+
+        Yields ``{"thread_id", "checkpoint_id", "updated_at", "messages"}``. ``since`` / ``until``
+        filter on the latest checkpoint timestamp, ``after`` resumes after a thread_id.
+        """
+        raise NotImplementedError("iter_latest_threads method must be implemented by subclasses")
+
+    def iter_thread_sizes(self, *, after: str | None = None, batch_size: int = 100) -> AsyncIterator[dict[str, Any]]:
+        """Iterate over threads ordered by thread_id with the storage size of their checkpoints.
+
+        Yields ``{"thread_id", "checkpoints", "checkpoint_bytes", "blob_bytes", "write_bytes",
+        "latest_bytes", "uncompressed_bytes"}``: ``latest_bytes`` is what is left when only the
+        latest checkpoint is kept (the state loaded for each turn), ``uncompressed_bytes`` the
+        part of the stored values written without compression.
+        """
+        raise NotImplementedError("iter_thread_sizes method must be implemented by subclasses")
+
 
 class InMemoryDatabase(BaseDatabase):
-    def __init__(self, checkpointer: InMemorySaver):
+    def __init__(self, checkpointer: InMemorySaver, user_threads: dict[str, dict[str, dict[str, Any]]] | None = None):
         super().__init__(checkpointer)
+        # user -> thread_id -> thread
+        self.user_threads = user_threads if user_threads is not None else {}
 
     async def is_healthy(self) -> bool:
         return True
 
+    async def list_thread_ids(self) -> list[str]:
+        if isinstance(self.checkpointer, BoundedMemorySaver):
+            return self.checkpointer.thread_ids()
+        return sorted(thread_id for thread_id, namespaces in self.checkpointer.storage.items() if any(namespaces.values()))
+
+    def get_stats(self) -> dict[str, Any]:
+        if isinstance(self.checkpointer, BoundedMemorySaver):
+            return self.checkpointer.stats()
+        return {}
+
+    async def touch_user_thread(self, user, thread_id, title):
+        now = _now()
+        thread = self.user_threads.setdefault(user, {}).setdefault(
+            thread_id, {"thread_id": thread_id, "title": title, "created_at": now}
+        )
+        thread["updated_at"] = now
+
+    async def list_user_threads(self, user, *, before=None, limit=10):
+        threads = sorted(
+            self.user_threads.get(user, {}).values(),
+            key=lambda thread: (thread["updated_at"], thread["thread_id"]),
+            reverse=True,
+        )
+        if before is not None:
+            threads = [thread for thread in threads if (thread["updated_at"], thread["thread_id"]) < tuple(before)]
+        return [dict(thread) for thread in threads[:limit]]
+
+    async def get_thread_users(self, thread_id):
+        return sorted(user for user, threads in self.user_threads.items() if thread_id in threads)
+
+    async def iter_latest_threads(self, *, since=None, until=None, after=None, batch_size=100):
+        for thread_id in await self.list_thread_ids():
+            if after is not None and thread_id <= after:
+                continue
+            checkpoint_tuple = await self.checkpointer.aget_tuple({"configurable": {"thread_id": thread_id}})
+            if checkpoint_tuple is None:
+                continue
+            checkpoint = checkpoint_tuple.checkpoint
+            if not _in_range(checkpoint["ts"], since, until):
+                continue
+            yield {
+                "thread_id": thread_id,
+                "checkpoint_id": checkpoint["id"],
+                "updated_at": checkpoint["ts"],
+                "messages": checkpoint["channel_values"].get("messages", []),
+            }
+
+    async def iter_thread_sizes(self, *, after=None, batch_size=100):
+        saver = self.checkpointer
+        for thread_id in await self.list_thread_ids():
+            if after is not None and thread_id <= after:
+                continue
+            # loads a spilled thread back (BoundedMemorySaver)
+            if await saver.aget_tuple({"configurable": {"thread_id": thread_id}}) is None:
+                continue
+            sizes = {"thread_id": thread_id, "checkpoints": 0, "checkpoint_bytes": 0, "blob_bytes": 0,
+                     "write_bytes": 0, "latest_bytes": 0, "uncompressed_bytes": 0}
+            for checkpoint_ns, checkpoints in saver.storage.get(thread_id, {}).items():
+                for checkpoint_id, (checkpoint, metadata, _parent) in checkpoints.items():
+                    sizes["checkpoints"] += 1
+                    sizes["checkpoint_bytes"] += len(checkpoint[1]) + len(metadata[1])
+                    writes = [write[2] for write in saver.writes.get((thread_id, checkpoint_ns, checkpoint_id), {}).values()]
+                    sizes["write_bytes"] += sum(len(typed[1]) for typed in writes)
+                    for typed in (checkpoint, *writes):
+                        if "+" not in typed[0]:
+                            sizes["uncompressed_bytes"] += len(typed[1])
+            for (blob_thread_id, _ns, _channel, _version), typed in saver.blobs.items():
+                if blob_thread_id == thread_id:
+                    sizes["blob_bytes"] += len(typed[1])
+                    if "+" not in typed[0]:
+                        sizes["uncompressed_bytes"] += len(typed[1])
+            root = saver.storage.get(thread_id, {}).get("", {})
+            if root:
+                checkpoint_id = max(root)
+                checkpoint, metadata, _parent = root[checkpoint_id]
+                versions = saver.serde.loads_typed(checkpoint)["channel_versions"]
+                sizes["latest_bytes"] = len(checkpoint[1]) + len(metadata[1]) + sum(
+                    len(saver.blobs[key][1])
+                    for key in ((thread_id, "", channel, version) for channel, version in versions.items())
+                    if key in saver.blobs
+                )
+            yield sizes
+
+
+# Latest checkpoint of each thread (root namespace) joined with its "messages" blob
+SELECT_LATEST_THREADS_SQL = """
+SELECT c.thread_id, c.checkpoint_id, c.checkpoint->>'ts' AS ts, b.type, b.blob
+FROM (
+    SELECT DISTINCT ON (thread_id) thread_id, checkpoint_ns, checkpoint_id, checkpoint
+    FROM checkpoints
+    WHERE checkpoint_ns = '' AND thread_id > %(after)s
+    ORDER BY thread_id, checkpoint_id DESC
+) c
+LEFT JOIN checkpoint_blobs b
+    ON b.thread_id = c.thread_id
+    AND b.checkpoint_ns = c.checkpoint_ns
+    AND b.channel = 'messages'
+    AND b.version = c.checkpoint->'channel_versions'->>'messages'
+WHERE (%(since)s::timestamptz IS NULL OR (c.checkpoint->>'ts')::timestamptz >= %(since)s::timestamptz)
+    AND (%(until)s::timestamptz IS NULL OR (c.checkpoint->>'ts')::timestamptz < %(until)s::timestamptz)
+ORDER BY c.thread_id
+"""
+
+
+# Threads of each user (maintained at each turn), listed by the "Mes discussions" panel
+CREATE_USER_THREADS_SQL = """
+CREATE TABLE IF NOT EXISTS user_threads (
+    user_id TEXT NOT NULL,
+    thread_id TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    created_at TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (user_id, thread_id)
+)
+"""
+
+CREATE_USER_THREADS_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS user_threads_recent_idx ON user_threads (user_id, updated_at DESC, thread_id DESC)
+"""
+
+CREATE_USER_THREADS_THREAD_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS user_threads_thread_idx ON user_threads (thread_id)
+"""
+
+UPSERT_USER_THREAD_SQL = """
+INSERT INTO user_threads (user_id, thread_id, title, created_at, updated_at)
+VALUES (%(user)s, %(thread_id)s, %(title)s, %(now)s, %(now)s)
+ON CONFLICT (user_id, thread_id) DO UPDATE SET updated_at = excluded.updated_at
+"""
+
+# one page of threads, read from user_threads_recent_idx (keyset pagination)
+SELECT_USER_THREADS_SQL = """
+SELECT thread_id, title, created_at, updated_at
+FROM user_threads
+WHERE user_id = %(user)s
+ORDER BY updated_at DESC, thread_id DESC
+LIMIT %(limit)s
+"""
+
+SELECT_USER_THREADS_BEFORE_SQL = """
+SELECT thread_id, title, created_at, updated_at
+FROM user_threads
+WHERE user_id = %(user)s AND (updated_at, thread_id) < (%(before_updated_at)s::timestamptz, %(before_thread_id)s)
+ORDER BY updated_at DESC, thread_id DESC
+LIMIT %(limit)s
+"""
+
+SELECT_THREAD_USERS_SQL = """
+SELECT user_id FROM user_threads WHERE thread_id = %(thread_id)s ORDER BY user_id
+"""
+
 
 class PostgresDatabase(BaseDatabase):
-    def __init__(self, conn: AsyncConnection, checkpointer: AsyncPostgresSaver):
+    def __init__(self, conn: AsyncConnection, checkpointer: AsyncPostgresSaver, pool: AsyncConnectionPool | None = None):
         super().__init__(checkpointer)
         self.conn = conn
+        self.pool = pool
 
     async def is_healthy(self) -> bool:
         try:
@@ -47,12 +289,355 @@ class PostgresDatabase(BaseDatabase):
             logger.error("PostgreSQL health check failed: %s", e)
             return False
 
+    async def list_thread_ids(self) -> list[str]:
+        async with self.conn.cursor() as cursor:
+            await cursor.execute("SELECT DISTINCT thread_id FROM checkpoints ORDER BY thread_id")
+            return [row[0] for row in await cursor.fetchall()]
+
+    async def setup(self) -> None:
+        async with self.pool.connection() as conn:
+            await conn.execute(CREATE_USER_THREADS_SQL)
+            await conn.execute(CREATE_USER_THREADS_INDEX_SQL)
+            await conn.execute(CREATE_USER_THREADS_THREAD_INDEX_SQL)
+
+    async def touch_user_thread(self, user, thread_id, title):
+        # pool connection: the checkpointer connection is not held
+        async with self.pool.connection() as conn:
+            await conn.execute(UPSERT_USER_THREAD_SQL, {"user": user, "thread_id": thread_id, "title": title, "now": _now()})
+
+    async def list_user_threads(self, user, *, before=None, limit=10):
+        params = {"user": user, "limit": limit}
+        query = SELECT_USER_THREADS_SQL
+        if before is not None:
+            query = SELECT_USER_THREADS_BEFORE_SQL
+            params["before_updated_at"], params["before_thread_id"] = before
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(query, params)
+                rows = await cursor.fetchall()
+        return [
+            {
+                "thread_id": thread_id,
+                "title": title,
+                "created_at": created_at.isoformat(timespec="microseconds"),
+                "updated_at": updated_at.isoformat(timespec="microseconds"),
+            }
+            for thread_id, title, created_at, updated_at in rows
+        ]
+
+    async def get_thread_users(self, thread_id):
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(SELECT_THREAD_USERS_SQL, {"thread_id": thread_id})
+                return [row[0] for row in await cursor.fetchall()]
+
+    async def iter_latest_threads(self, *, since=None, until=None, after=None, batch_size=100):
+        # Dedicated connection: the checkpointer connection must not be held by a long export.
+        # A server-side (named) cursor keeps memory bounded to ``batch_size`` rows.
+        params = {"after": after or "", "since": since, "until": until}
+        async with self.pool.connection() as conn:
+            async with conn.transaction():
+                async with conn.cursor(name="iter_latest_threads") as cursor:
+                    cursor.itersize = batch_size
+                    await cursor.execute(SELECT_LATEST_THREADS_SQL, params)
+                    async for thread_id, checkpoint_id, ts, blob_type, blob in cursor:
+                        messages = []
+                        if blob_type is not None and blob_type != "empty":
+                            messages = self.checkpointer.serde.loads_typed((blob_type, blob))
+                        yield {
+                            "thread_id": thread_id,
+                            "checkpoint_id": checkpoint_id,
+                            "updated_at": ts,
+                            "messages": messages,
+                        }
+
+    async def iter_thread_sizes(self, *, after=None, batch_size=100):
+        # Aggregates computed by the server, one page of threads per round-trip
+        after = after or ""
+        async with self.pool.connection() as conn:
+            while True:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(SELECT_THREAD_SIZES_SQL, {"after": after, "limit": batch_size})
+                    rows = await cursor.fetchall()
+                    if not rows:
+                        return
+                    params = {"thread_ids": [row[0] for row in rows]}
+                    await cursor.execute(SELECT_BLOB_SIZES_SQL, params)
+                    blobs = {row[0]: row[1:] for row in await cursor.fetchall()}
+                    await cursor.execute(SELECT_WRITE_SIZES_SQL, params)
+                    writes = {row[0]: row[1:] for row in await cursor.fetchall()}
+                    await cursor.execute(SELECT_LATEST_SIZES_SQL, params)
+                    latest = {row[0]: row[1] for row in await cursor.fetchall()}
+                for thread_id, count, checkpoint_bytes in rows:
+                    after = thread_id
+                    blob_bytes, uncompressed_blob_bytes = blobs.get(thread_id, (0, 0))
+                    write_bytes, uncompressed_write_bytes = writes.get(thread_id, (0, 0))
+                    yield {
+                        "thread_id": thread_id,
+                        "checkpoints": count,
+                        "checkpoint_bytes": int(checkpoint_bytes),
+                        "blob_bytes": int(blob_bytes),
+                        "write_bytes": int(write_bytes),
+                        "latest_bytes": int(latest.get(thread_id, 0)),
+                        # checkpoints are stored as JSONB without their channel values (never compressed)
+                        "uncompressed_bytes": int(uncompressed_blob_bytes + uncompressed_write_bytes),
+                    }
+                if len(rows) < batch_size:
+                    return
+
+
+# Storage size of a page of threads: checkpoints, blobs (channel values) and pending writes
+SELECT_THREAD_SIZES_SQL = """
+SELECT thread_id, count(*), sum(pg_column_size(checkpoint) + pg_column_size(metadata))
+FROM checkpoints
+WHERE thread_id > %(after)s
+GROUP BY thread_id
+ORDER BY thread_id
+LIMIT %(limit)s
+"""
+
+SELECT_BLOB_SIZES_SQL = """
+SELECT thread_id,
+    coalesce(sum(octet_length(blob)), 0),
+    coalesce(sum(octet_length(blob)) FILTER (WHERE type NOT LIKE '%%+%%'), 0)
+FROM checkpoint_blobs
+WHERE thread_id = ANY(%(thread_ids)s)
+GROUP BY thread_id
+"""
+
+SELECT_WRITE_SIZES_SQL = """
+SELECT thread_id,
+    coalesce(sum(octet_length(blob)), 0),
+    coalesce(sum(octet_length(blob)) FILTER (WHERE type NOT LIKE '%%+%%'), 0)
+FROM checkpoint_writes
+WHERE thread_id = ANY(%(thread_ids)s)
+GROUP BY thread_id
+"""
+
+# Latest checkpoint (root namespace) with the blobs of its channel versions
+SELECT_LATEST_SIZES_SQL = """
+SELECT c.thread_id,
+    pg_column_size(c.checkpoint) + pg_column_size(c.metadata) + coalesce((
+        SELECT sum(octet_length(b.blob))
+        FROM checkpoint_blobs b
+        WHERE b.thread_id = c.thread_id
+            AND b.checkpoint_ns = c.checkpoint_ns
+            AND b.version = c.checkpoint->'channel_versions'->>b.channel
+    ), 0)
+FROM (
+    SELECT DISTINCT ON (thread_id) thread_id, checkpoint_ns, checkpoint, metadata
+    FROM checkpoints
+    WHERE checkpoint_ns = '' AND thread_id = ANY(%(thread_ids)s)
+    ORDER BY thread_id, checkpoint_id DESC
+) c
+"""
+
+
+# Latest checkpoint of each thread (root namespace), one page at a time (primary key order)
+SELECT_LATEST_SQLITE_SQL = """
+SELECT c.thread_id, c.checkpoint_id, c.type, c.checkpoint
+FROM checkpoints c
+JOIN (
+    SELECT thread_id, MAX(checkpoint_id) AS checkpoint_id
+    FROM checkpoints
+    WHERE checkpoint_ns = '' AND thread_id > ?
+    GROUP BY thread_id
+    ORDER BY thread_id
+    LIMIT ?
+) latest ON latest.thread_id = c.thread_id AND latest.checkpoint_id = c.checkpoint_id
+WHERE c.checkpoint_ns = ''
+ORDER BY c.thread_id
+"""
+
+
+# Storage size of a page of threads (the checkpoints include their channel values)
+SELECT_THREAD_SIZES_SQLITE_SQL = """
+SELECT c.thread_id, count(*), sum(length(c.checkpoint) + length(c.metadata)),
+    sum(CASE WHEN c.type LIKE '%+%' THEN 0 ELSE length(c.checkpoint) END),
+    (SELECT length(l.checkpoint) + length(l.metadata) FROM checkpoints l
+     WHERE l.thread_id = c.thread_id AND l.checkpoint_ns = ''
+     ORDER BY l.checkpoint_id DESC LIMIT 1),
+    (SELECT coalesce(sum(length(w.value)), 0) FROM writes w WHERE w.thread_id = c.thread_id),
+    (SELECT coalesce(sum(length(w.value)), 0) FROM writes w WHERE w.thread_id = c.thread_id AND w.type NOT LIKE '%+%')
+FROM checkpoints c
+WHERE c.thread_id IN (
+    SELECT DISTINCT thread_id FROM checkpoints WHERE thread_id > ? ORDER BY thread_id LIMIT ?
+)
+GROUP BY c.thread_id
+ORDER BY c.thread_id
+"""
+
+
+CREATE_USER_THREADS_SQLITE_SQL = """
+CREATE TABLE IF NOT EXISTS user_threads (
+    user_id TEXT NOT NULL,
+    thread_id TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, thread_id)
+)
+"""
+
+CREATE_USER_THREADS_INDEX_SQLITE_SQL = """
+CREATE INDEX IF NOT EXISTS user_threads_recent_idx ON user_threads (user_id, updated_at DESC, thread_id DESC)
+"""
+
+CREATE_USER_THREADS_THREAD_INDEX_SQLITE_SQL = """
+CREATE INDEX IF NOT EXISTS user_threads_thread_idx ON user_threads (thread_id)
+"""
+
+UPSERT_USER_THREAD_SQLITE_SQL = """
+INSERT INTO user_threads (user_id, thread_id, title, created_at, updated_at)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (user_id, thread_id) DO UPDATE SET updated_at = excluded.updated_at
+"""
+
+# ISO timestamps of the same width (see _now) are ordered as text
+SELECT_USER_THREADS_SQLITE_SQL = """
+SELECT thread_id, title, created_at, updated_at
+FROM user_threads
+WHERE user_id = ? AND (updated_at, thread_id) < (?, ?)
+ORDER BY updated_at DESC, thread_id DESC
+LIMIT ?
+"""
+
+SELECT_THREAD_USERS_SQLITE_SQL = """
+SELECT user_id FROM user_threads WHERE thread_id = ? ORDER BY user_id
+"""
+
+
+class SqliteDatabase(BaseDatabase):
+    def __init__(self, conn: "aiosqlite.Connection", checkpointer: "AsyncSqliteSaver", path: str):
+        super().__init__(checkpointer)
+        self.conn = conn
+        self.path = path
+
+    async def is_healthy(self) -> bool:
+        try:
+            async with self.conn.execute("SELECT 1") as cursor:
+                result = await cursor.fetchone()
+                return result is not None and result[0] == 1
+        except Exception as e:
+            logger.error("SQLite health check failed: %s", e)
+            return False
+
+    async def list_thread_ids(self) -> list[str]:
+        # DISTINCT on the primary key prefix: index scan, checkpoints are not read
+        async with self.conn.execute("SELECT DISTINCT thread_id FROM checkpoints ORDER BY thread_id") as cursor:
+            return [row[0] for row in await cursor.fetchall()]
+
+    async def setup(self) -> None:
+        async with self.checkpointer.lock:
+            await self.conn.execute(CREATE_USER_THREADS_SQLITE_SQL)
+            await self.conn.execute(CREATE_USER_THREADS_INDEX_SQLITE_SQL)
+            await self.conn.execute(CREATE_USER_THREADS_THREAD_INDEX_SQLITE_SQL)
+            await self.conn.commit()
+
+    async def touch_user_thread(self, user, thread_id, title):
+        # the connection is shared with the checkpointer: don't commit in the middle of its writes
+        async with self.checkpointer.lock:
+            now = _now()
+            await self.conn.execute(UPSERT_USER_THREAD_SQLITE_SQL, (user, thread_id, title, now, now))
+            await self.conn.commit()
+
+    async def list_user_threads(self, user, *, before=None, limit=10):
+        # the first page starts before any timestamp ("~" sorts after the digits)
+        before_updated_at, before_thread_id = before if before is not None else ("~", "")
+        async with self.conn.execute(
+            SELECT_USER_THREADS_SQLITE_SQL, (user, before_updated_at, before_thread_id, limit)
+        ) as cursor:
+            rows = await cursor.fetchall()
+        return [
+            {"thread_id": thread_id, "title": title, "created_at": created_at, "updated_at": updated_at}
+            for thread_id, title, created_at, updated_at in rows
+        ]
+
+    async def get_thread_users(self, thread_id):
+        async with self.conn.execute(SELECT_THREAD_USERS_SQLITE_SQL, (thread_id,)) as cursor:
+            return [row[0] for row in await cursor.fetchall()]
+
+    async def iter_latest_threads(self, *, since=None, until=None, after=None, batch_size=100):
+        # Dedicated read connection (WAL: readers don't block the checkpointer writes),
+        # keyset pagination keeps memory bounded to ``batch_size`` checkpoints.
+        after = after or ""
+        async with aiosqlite.connect(self.path) as conn:
+            while True:
+                async with conn.execute(SELECT_LATEST_SQLITE_SQL, (after, batch_size)) as cursor:
+                    rows = await cursor.fetchall()
+                for thread_id, checkpoint_id, checkpoint_type, blob in rows:
+                    after = thread_id
+                    checkpoint = self.checkpointer.serde.loads_typed((checkpoint_type, blob))
+                    if not _in_range(checkpoint["ts"], since, until):
+                        continue
+                    yield {
+                        "thread_id": thread_id,
+                        "checkpoint_id": checkpoint_id,
+                        "updated_at": checkpoint["ts"],
+                        "messages": checkpoint.get("channel_values", {}).get("messages", []),
+                    }
+                if len(rows) < batch_size:
+                    return
+
+    async def iter_thread_sizes(self, *, after=None, batch_size=100):
+        after = after or ""
+        async with aiosqlite.connect(self.path) as conn:
+            while True:
+                async with conn.execute(SELECT_THREAD_SIZES_SQLITE_SQL, (after, batch_size)) as cursor:
+                    rows = await cursor.fetchall()
+                for thread_id, count, checkpoint_bytes, uncompressed, latest, write_bytes, uncompressed_writes in rows:
+                    after = thread_id
+                    yield {
+                        "thread_id": thread_id,
+                        "checkpoints": count,
+                        "checkpoint_bytes": checkpoint_bytes,
+                        "blob_bytes": 0,
+                        "write_bytes": write_bytes,
+                        "latest_bytes": latest or 0,
+                        "uncompressed_bytes": uncompressed + uncompressed_writes,
+                    }
+                if len(rows) < batch_size:
+                    return
+
+
+_memory_checkpointer: BoundedMemorySaver | None = None
+# bounded with the saver: the threads it drops are removed from the lists of their users
+_memory_user_threads: dict[str, dict[str, dict[str, Any]]] = {}
+
+
+def _forget_memory_user_thread(thread_id: str) -> None:
+    for user in [user for user, threads in _memory_user_threads.items() if thread_id in threads]:
+        del _memory_user_threads[user][thread_id]
+        if not _memory_user_threads[user]:
+            del _memory_user_threads[user]
+# database opened by get_agent (see use_database), shared by the request handlers
+_current_database: BaseDatabase | None = None
+
+
+def get_serializer() -> CompressedSerializer:
+    """Checkpoint serializer (reads compressed and uncompressed values whatever the codec)."""
+    return CompressedSerializer(
+        codec=CHECKPOINT_COMPRESSION, threshold=CHECKPOINT_COMPRESSION_THRESHOLD
+    )
+
 
 @asynccontextmanager
 async def get_database() -> AsyncIterator[BaseDatabase]:
+    global _memory_checkpointer
+
     if DB_URI is None or DB_URI == "":
         logger.info("create InMemoryDatabase as DB_URI is not defined")
-        yield InMemoryDatabase(checkpointer=InMemorySaver())
+        # one saver per process so that the agent, health checks and exports share the same threads
+        if _memory_checkpointer is None:
+            _memory_checkpointer = BoundedMemorySaver(
+                max_threads=MEMORY_MAX_THREADS,
+                max_bytes=MEMORY_MAX_BYTES,
+                idle_seconds=MEMORY_IDLE_SECONDS,
+                spill_dir=MEMORY_SPILL_DIR,
+                serde=get_serializer(),
+                on_forget=_forget_memory_user_thread,
+            )
+        yield InMemoryDatabase(checkpointer=_memory_checkpointer, user_threads=_memory_user_threads)
     elif DB_URI.startswith("postgresql://"):
         logger.info("create AsyncConnectionPool for PostgreSQL...")
         connection_kwargs = {
@@ -63,21 +648,64 @@ async def get_database() -> AsyncIterator[BaseDatabase]:
             logger.debug("create connection...")
             async with pool.connection(timeout=5) as conn:
                 logger.debug("create AsyncPostgresSaver...")
-                checkpointer = AsyncPostgresSaver(conn=conn)
+                checkpointer = AsyncPostgresSaver(conn=conn, serde=get_serializer())
                 logger.debug("setup AsyncPostgresSaver...")
                 await checkpointer.setup()
+                database = PostgresDatabase(conn=conn, checkpointer=checkpointer, pool=pool)
                 logger.debug("PostgresDatabase created")
-                yield PostgresDatabase(conn=conn, checkpointer=checkpointer)
+                yield database
+    elif DB_URI.startswith("sqlite:///"):
+        # sqlite:///relative/path.db or sqlite:////absolute/path.db
+        path = DB_URI.removeprefix("sqlite:///")
+        logger.info(f"create AsyncSqliteSaver for {path}...")
+        async with aiosqlite.connect(path) as conn:
+            # WAL (set by setup()) + synchronous=NORMAL: one fsync per checkpoint
+            # at most, and readers (exports, health checks) don't wait for writers
+            await conn.execute("PRAGMA synchronous=NORMAL")
+            await conn.execute("PRAGMA busy_timeout=5000")
+            checkpointer = AsyncSqliteSaver(conn, serde=get_serializer())
+            await checkpointer.setup()
+            database = SqliteDatabase(conn=conn, checkpointer=checkpointer, path=path)
+            logger.debug("SqliteDatabase created")
+            yield database
     else:
-        raise RuntimeError("Invalid DB_URI (not starting with postgresql://)")
+        raise RuntimeError("Invalid DB_URI (not starting with postgresql:// or sqlite:///)")
+
+
+@contextmanager
+def use_database(db: BaseDatabase):
+    """Make ``db`` the database returned by ``get_current_database()`` while the context is active."""
+    global _current_database
+    previous, _current_database = _current_database, db
+    try:
+        yield db
+    finally:
+        _current_database = previous
+
+
+def get_current_database() -> BaseDatabase | None:
+    """Database opened with the agent (None before the startup), without opening a new connection pool."""
+    return _current_database
 
 
 async def is_database_healthy() -> bool:
-    """Check database health using the configured database context manager."""
+    """Check database health on the database opened at startup (else using the configured database context manager)."""
+    db = get_current_database()
+    if db is not None:
+        return await db.is_healthy()
     async with get_database() as db:
         return await db.is_healthy()
 
 
+async def get_database_stats() -> dict[str, Any]:
+    """Usage statistics of the configured database."""
+    db = get_current_database()
+    if db is not None:
+        return db.get_stats()
+    async with get_database() as db:
+        return db.get_stats()
+
+
 async def get_thread_ids(checkpointer: AsyncPostgresSaver) -> list[str]:
     """Find thread_ids by inspecting checkpointer"""
     thread_ids = []
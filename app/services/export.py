@@ -0,0 +1,62 @@
+"""Export NDJSON (éventuellement compressé gzip) des discussions."""
+import json
+import zlib
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator
+
+from langchain_core.messages import BaseMessage, message_to_dict
+
+from .db import BaseDatabase
+
+
+def parse_datetime(value: str | None) -> datetime | None:
+    """Parse an ISO 8601 date or datetime (naive values are assumed UTC)."""
+    if value is None or value == "":
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def thread_to_json(thread: dict[str, Any]) -> str:
+    """One NDJSON line for a thread. ``cursor`` is the value to pass as ``after`` to resume."""
+    messages = [
+        message_to_dict(message) if isinstance(message, BaseMessage) else message
+        for message in thread["messages"]
+    ]
+    return json.dumps(
+        {
+            "cursor": thread["thread_id"],
+            "thread_id": thread["thread_id"],
+            "checkpoint_id": thread["checkpoint_id"],
+            "updated_at": thread["updated_at"],
+            "messages": messages,
+        },
+        ensure_ascii=False,
+        default=str,
+    )
+
+
+async def export_threads_ndjson(
+    db: BaseDatabase,
+    *,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    after: str | None = None,
+    batch_size: int = 100,
+    compress: bool = False,
+) -> AsyncIterator[bytes]:
+    """Stream the latest messages of every thread as NDJSON chunks (gzip if ``compress``)."""
+    # wbits=31: gzip container, so the output can be read with gunzip / zcat
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    async for thread in db.iter_latest_threads(since=since, until=until, after=after, batch_size=batch_size):
+        chunk = (thread_to_json(thread) + "\n").encode("utf-8")
+        if compressor is None:
+            yield chunk
+        else:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+    if compressor is not None:
+        yield compressor.flush()
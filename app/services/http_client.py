@@ -0,0 +1,243 @@
+"""Client HTTP partagé (keep-alive, HTTP/2, proxy) pour les appels aux fournisseurs de modèles."""
+import ipaddress
+import logging
+import time
+import urllib.request
+from collections import Counter
+from types import ModuleType
+from typing import Any
+
+import httpx
+from langchain_core.language_models import BaseChatModel
+
+try:
+    import h2  # noqa: F401  (required by httpx for HTTP/2)
+except ImportError:  # optional dependency (HTTP/1.1 only)
+    h2 = None
+
+logger = logging.getLogger(__name__)
+
+# active pool (see get_http_client)
+_pool: "HttpClientPool | None" = None
+
+
+def environment_proxies() -> dict[str, str | None]:
+    """httpx mount patterns -> proxy URL (None: direct) from HTTP_PROXY / HTTPS_PROXY / ALL_PROXY / NO_PROXY."""
+    proxies = urllib.request.getproxies()
+    mounts: dict[str, str | None] = {}
+    for scheme in ("http", "https", "all"):
+        url = proxies.get(scheme)
+        if url:
+            mounts[f"{scheme}://"] = url if "://" in url else f"http://{url}"
+    for host in proxies.get("no", "").split(","):
+        host = host.strip().lstrip(".")
+        if not host:
+            continue
+        if host == "*":
+            return {}
+        try:
+            ipaddress.ip_network(host, strict=False)
+            is_address = True
+        except ValueError:
+            is_address = False
+        # "*example.com" matches example.com and its subdomains
+        mounts[f"all://{host}" if is_address or host == "localhost" else f"all://*{host}"] = None
+    return mounts
+
+
+class CountingTransport:
+    """Transport counting requests, new connections and TLS handshakes (httpcore trace events)."""
+
+    def __init__(self, transport: Any, stats: Counter):
+        self.transport = transport
+        self.stats = stats
+
+    async def _trace(self, event: str, info: dict[str, Any]) -> None:
+        if event == "connection.connect_tcp.complete":
+            self.stats["connections_opened"] += 1
+        elif event == "connection.start_tls.complete":
+            self.stats["tls_handshakes"] += 1
+
+    async def handle_async_request(self, request: Any) -> Any:
+        parent = request.extensions.get("trace")
+
+        async def trace(event: str, info: dict[str, Any]) -> None:
+            await self._trace(event, info)
+            if parent is not None:
+                await parent(event, info)
+
+        request.extensions["trace"] = trace
+        self.stats["requests"] += 1
+        try:
+            response = await self.transport.handle_async_request(request)
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        version = response.extensions.get("http_version")
+        if isinstance(version, bytes):
+            self.stats[version.decode("ascii", "replace")] += 1
+        return response
+
+    async def __aenter__(self) -> "CountingTransport":
+        await self.transport.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.transport.__aexit__(*exc_info)
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class HttpClientPool:
+    """One keep-alive connection pool shared by the model providers and the outbound fetchers.
+
+    The pool holds a single transport (with the connection limits and HTTP/2
+    when ``h2`` is installed) and one transport per proxy found in the
+    environment. ``client`` uses them, and so do the clients created from
+    ``client_kwargs()`` (e.g. by the Ollama SDK), so connections and TLS
+    sessions are reused across models and requests. SDKs built on ``httpx2``
+    get their own transports with the same settings. ``stats()`` reports the
+    requests, new connections and TLS handshakes.
+    """
+
+    def __init__(
+        self,
+        *,
+        http2: bool = True,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 60.0,
+        timeout: float | None = 600.0,
+    ):
+        if http2 and h2 is None:
+            logger.warning("HTTP/2 disabled: the h2 package is not installed (pip install 'httpx[http2]')")
+        self.http2 = http2 and h2 is not None
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.proxies = environment_proxies()
+        self.counters: Counter = Counter()
+        # per httpx module: transport, proxy mounts and client
+        self._transports: dict[str, tuple[CountingTransport, dict[str, CountingTransport | None]]] = {}
+        self._clients: dict[str, Any] = {}
+        # origins of the bound models -> httpx module of their SDK (connections opened by warmup())
+        self.origins: dict[str, ModuleType] = {}
+        self.started_at = time.monotonic()
+
+    def _transport(self, module: ModuleType, proxy: str | None = None) -> CountingTransport:
+        limits = module.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        return CountingTransport(module.AsyncHTTPTransport(http2=self.http2, limits=limits, proxy=proxy), self.counters)
+
+    async def __aenter__(self) -> "HttpClientPool":
+        global _pool
+        _pool = self
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        global _pool
+        if _pool is self:
+            _pool = None
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
+        for transport, mounts in self._transports.values():
+            for mounted in [transport, *mounts.values()]:
+                if mounted is not None:
+                    await mounted.aclose()
+        self._clients.clear()
+        self._transports.clear()
+
+    def client_kwargs(self, module: ModuleType = httpx) -> dict[str, Any]:
+        """``AsyncClient`` arguments sharing the pool (the proxies are resolved by the pool)."""
+        if module.__name__ not in self._transports:
+            self._transports[module.__name__] = (
+                self._transport(module),
+                {
+                    pattern: None if proxy is None else self._transport(module, proxy)
+                    for pattern, proxy in self.proxies.items()
+                },
+            )
+        transport, mounts = self._transports[module.__name__]
+        return {"transport": transport, "mounts": mounts, "trust_env": False}
+
+    def client_for(self, module: ModuleType = httpx) -> Any:
+        """Shared ``AsyncClient`` of an ``httpx`` module."""
+        if module.__name__ not in self._clients:
+            self._clients[module.__name__] = module.AsyncClient(
+                timeout=self.timeout, follow_redirects=True, **self.client_kwargs(module)
+            )
+        return self._clients[module.__name__]
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self.client_for(httpx)
+
+    def model_kwargs(self, model_name: str) -> dict[str, Any]:
+        """``init_chat_model`` arguments for providers accepting httpx client arguments."""
+        if model_name.startswith("ollama:"):
+            return {"async_client_kwargs": self.client_kwargs()}
+        return {}
+
+    def bind(self, model: BaseChatModel) -> BaseChatModel:
+        """Register the provider of a model built with ``model_kwargs()`` for the ``warmup()``."""
+        provider = type(model).__name__
+        if provider == "ChatOllama":
+            self.origins[str(model.base_url or "http://localhost:11434")] = httpx
+        else:
+            # e.g. ChatAnthropic has no public argument for an async HTTP client
+            logger.info("%s keeps its own HTTP client", provider)
+        return model
+
+    async def warmup(self, timeout: float = 5.0) -> None:
+        """Open a connection (DNS, proxy, TLS) to every bound provider so the first turn doesn't pay for it."""
+        for origin, module in sorted(self.origins.items()):
+            try:
+                response = await self.client_for(module).head(origin, timeout=timeout)
+                logger.info("HTTP warmup %s: %s (%s)", origin, response.status_code, response.http_version)
+            except (httpx.HTTPError, OSError) as e:
+                logger.warning("HTTP warmup %s failed: %s", origin, e)
+
+    def stats(self) -> dict[str, Any]:
+        requests = self.counters["requests"]
+        opened = self.counters["connections_opened"]
+        return {
+            "http2": self.http2,
+            "proxies": {pattern: proxy is not None for pattern, proxy in self.proxies.items()},
+            "requests": requests,
+            "errors": self.counters["errors"],
+            "connections_opened": opened,
+            "tls_handshakes": self.counters["tls_handshakes"],
+            # share of the requests sent on an already open connection
+            "reuse_ratio": round(1 - opened / requests, 3) if requests else None,
+            "http_versions": {k: v for k, v in self.counters.items() if k.startswith("HTTP/")},
+            "uptime_seconds": round(time.monotonic() - self.started_at),
+        }
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared HTTP client for outbound requests (raises if the pool is not started)."""
+    if _pool is None:
+        raise RuntimeError("HTTP client pool is not started")
+    return _pool.client
+
+
+def get_http_pool() -> HttpClientPool | None:
+    return _pool
+
+
+async def warmup_http_pool() -> None:
+    if _pool is not None:
+        await _pool.warmup()
+
+
+def get_http_stats() -> dict[str, Any] | None:
+    """Connection reuse stats of the shared pool (None if it is not used)."""
+    return _pool.stats() if _pool is not None else None
@@ -0,0 +1,288 @@
+"""Mises à jour en direct des discussions partagées (PostgreSQL LISTEN/NOTIFY)."""
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+import psycopg
+from psycopg import sql
+
+logger = logging.getLogger(__name__)
+
+# maximum wait for the LISTEN of a new thread before loading its history
+LISTEN_TIMEOUT = 5.0
+
+# NOTIFY on the channel of the thread for each checkpoint of the root namespace, whatever
+# the replica (or the script) writing it. The channel is computed like ``thread_channel``.
+SETUP_NOTIFY_SQL = """
+CREATE OR REPLACE FUNCTION notify_thread_checkpoint() RETURNS trigger AS $$
+BEGIN
+    IF NEW.checkpoint_ns = '' THEN
+        PERFORM pg_notify('thread_' || left(md5(NEW.thread_id), 24), NEW.checkpoint_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS notify_thread_checkpoint ON checkpoints;
+CREATE TRIGGER notify_thread_checkpoint
+    AFTER INSERT OR UPDATE ON checkpoints
+    FOR EACH ROW EXECUTE FUNCTION notify_thread_checkpoint();
+"""
+
+# serializes the setup of the replicas starting together
+SETUP_LOCK_ID = 0x6765_6F63
+
+
+def thread_channel(thread_id: str) -> str:
+    """NOTIFY channel of a thread (a valid identifier whatever the thread_id)."""
+    return "thread_" + hashlib.md5(thread_id.encode("utf-8")).hexdigest()[:24]
+
+
+def _message_key(message: Any, index: int) -> str:
+    return getattr(message, "id", None) or f"#{index}"
+
+
+@dataclass(eq=False)
+class Subscriber:
+    thread_id: str
+    session_id: str | None = None
+    # latest messages of the thread, not read yet by the subscriber
+    messages: list[Any] | None = None
+    changed: asyncio.Event = field(default_factory=asyncio.Event)
+    closed: bool = False
+
+
+class ThreadUpdates:
+    """Push the new messages of a thread to its viewers when a checkpoint is written.
+
+    A trigger on the ``checkpoints`` table publishes a NOTIFY on the channel of
+    the thread (see ``SETUP_NOTIFY_SQL``), so that the writes of every replica are
+    seen. Each process holds one listening connection, with a LISTEN per thread
+    followed by at least one viewer.
+
+    On a notification, the messages of the thread are loaded once (concurrent
+    notifications are coalesced) and handed to every subscriber, which yields
+    the messages it has not seen yet. After a reconnection, every followed
+    thread is reloaded (notifications sent while disconnected are lost).
+    """
+
+    def __init__(
+        self,
+        conninfo: str,
+        load_messages: Callable[[str], Awaitable[list[Any]]],
+        *,
+        setup: bool = True,
+        reconnect_initial: float = 1,
+        reconnect_max: float = 30,
+    ):
+        self.conninfo = conninfo
+        self.load_messages = load_messages
+        self.setup = setup
+        self.reconnect_initial = reconnect_initial
+        self.reconnect_max = reconnect_max
+        self._subscribers: dict[str, set[Subscriber]] = {}
+        # channel -> thread_id (followed threads)
+        self._channels: dict[str, str] = {}
+        # channels with a LISTEN on the current connection
+        self._listening: set[str] = set()
+        self._listened: dict[str, asyncio.Event] = {}
+        self._channels_changed = asyncio.Event()
+        self._loading: set[str] = set()
+        self._reload: set[str] = set()
+        self._tasks: set[asyncio.Task] = set()
+        self._task: asyncio.Task | None = None
+        self.connected = False
+        self.notifications = 0
+        self.loads = 0
+
+    async def __aenter__(self) -> "ThreadUpdates":
+        global _updates
+        self._task = asyncio.create_task(self._run(), name="live-updates")
+        _updates = self
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        global _updates
+        if _updates is self:
+            _updates = None
+        for task in [self._task, *self._tasks]:
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*(task for task in [self._task, *self._tasks] if task is not None), return_exceptions=True)
+        for subscribers in self._subscribers.values():
+            for subscriber in subscribers:
+                self._close(subscriber)
+
+    async def follow(self, thread_id: str, *, session_id: str | None = None) -> AsyncIterator[list[Any]]:
+        """Yield every message of the thread, then the new ones after each checkpoint.
+
+        The LISTEN is done before the history is loaded: a message written in
+        between is yielded once, with the next batch.
+        """
+        subscriber = Subscriber(thread_id, session_id=session_id)
+        channel = thread_channel(thread_id)
+        self._subscribers.setdefault(thread_id, set()).add(subscriber)
+        if channel not in self._channels:
+            self._channels[channel] = thread_id
+            self._listened[channel] = asyncio.Event()
+            self._channels_changed.set()
+        try:
+            try:
+                await asyncio.wait_for(self._listened[channel].wait(), LISTEN_TIMEOUT)
+            except asyncio.TimeoutError:
+                # disconnected: the thread is reloaded after the reconnection
+                logger.warning("live updates: LISTEN %s not confirmed, loading the history anyway", channel)
+
+            seen = set()
+            messages = await self.load_messages(thread_id)
+            while not subscriber.closed:
+                new = []
+                for index, message in enumerate(messages):
+                    key = _message_key(message, index)
+                    if key not in seen:
+                        seen.add(key)
+                        new.append(message)
+                if new:
+                    yield new
+                await subscriber.changed.wait()
+                subscriber.changed.clear()
+                messages, subscriber.messages = subscriber.messages or [], None
+        finally:
+            self._unsubscribe(subscriber)
+
+    def detach_session(self, session_id: str) -> None:
+        """Stop the subscriptions of a closed page."""
+        for subscribers in self._subscribers.values():
+            for subscriber in subscribers:
+                if subscriber.session_id == session_id:
+                    self._close(subscriber)
+
+    def notify(self, thread_id: str) -> None:
+        """Reload the messages of a thread for its subscribers (coalesced while a load is in progress)."""
+        if thread_id not in self._subscribers:
+            return
+        if thread_id in self._loading:
+            self._reload.add(thread_id)
+            return
+        self._loading.add(thread_id)
+        task = asyncio.create_task(self._load(thread_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "connected": self.connected,
+            "threads": len(self._subscribers),
+            "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "notifications": self.notifications,
+            "loads": self.loads,
+        }
+
+    def _close(self, subscriber: Subscriber) -> None:
+        subscriber.closed = True
+        subscriber.changed.set()
+
+    def _unsubscribe(self, subscriber: Subscriber) -> None:
+        subscribers = self._subscribers.get(subscriber.thread_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self._subscribers[subscriber.thread_id]
+            channel = thread_channel(subscriber.thread_id)
+            self._channels.pop(channel, None)
+            self._listened.pop(channel, None)
+            self._channels_changed.set()
+
+    async def _load(self, thread_id: str) -> None:
+        try:
+            while thread_id in self._subscribers:
+                self._reload.discard(thread_id)
+                self.loads += 1
+                try:
+                    messages = await self.load_messages(thread_id)
+                except Exception as e:
+                    logger.warning("live updates: failed to load thread %s (%s)", thread_id, e)
+                    return
+                for subscriber in self._subscribers.get(thread_id, ()):
+                    subscriber.messages = messages
+                    subscriber.changed.set()
+                if thread_id not in self._reload:
+                    return
+        finally:
+            self._loading.discard(thread_id)
+            self._reload.discard(thread_id)
+
+    async def _run(self) -> None:
+        attempt = 0
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True) as conn:
+                    if self.setup:
+                        await self._setup(conn)
+                        self.setup = False
+                    self.connected = True
+                    attempt = 0
+                    self._listening.clear()
+                    await self._sync_channels(conn)
+                    logger.info("live updates: listening for checkpoints (%s threads followed)", len(self._channels))
+                    # nothing was notified while disconnected (or before the LISTEN of a timed out subscriber)
+                    for thread_id in list(self._subscribers):
+                        self.notify(thread_id)
+                    await self._listen(conn)
+            except psycopg.Error as e:
+                self.connected = False
+                delay = min(self.reconnect_max, self.reconnect_initial * 2 ** attempt)
+                logger.warning("live updates: connection lost (%s), retry in %s s", e, delay)
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def _setup(self, conn: psycopg.AsyncConnection) -> None:
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock(%s)", (SETUP_LOCK_ID,))
+            await conn.execute(SETUP_NOTIFY_SQL)
+
+    async def _sync_channels(self, conn: psycopg.AsyncConnection) -> None:
+        self._channels_changed.clear()
+        for channel in self._listening - self._channels.keys():
+            await conn.execute(sql.SQL("UNLISTEN {}").format(sql.Identifier(channel)))
+            self._listening.discard(channel)
+        for channel in self._channels.keys() - self._listening:
+            await conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(channel)))
+            self._listening.add(channel)
+            if channel in self._listened:
+                self._listened[channel].set()
+
+    async def _listen(self, conn: psycopg.AsyncConnection) -> None:
+        while True:
+            # wait for notifications until the followed threads change
+            receiving = asyncio.create_task(self._receive(conn))
+            changed = asyncio.create_task(self._channels_changed.wait())
+            try:
+                await asyncio.wait({receiving, changed}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for task in (receiving, changed):
+                    task.cancel()
+                await asyncio.gather(changed, return_exceptions=True)
+                try:
+                    await receiving
+                except asyncio.CancelledError:
+                    pass
+            await self._sync_channels(conn)
+
+    async def _receive(self, conn: psycopg.AsyncConnection) -> None:
+        async for notification in conn.notifies():
+            thread_id = self._channels.get(notification.channel)
+            if thread_id is not None:
+                self.notifications += 1
+                self.notify(thread_id)
+
+
+# started in the server lifespan (PostgreSQL only)
+_updates: ThreadUpdates | None = None
+
+
+def get_thread_updates() -> ThreadUpdates | None:
+    return _updates
@@ -0,0 +1,70 @@
+"""Emprise des données d'une carte (create_map) connue côté serveur, d'après le catalogue WFS."""
+import math
+from urllib.parse import parse_qsl, urlsplit
+
+from ..config import WFS_CATALOG_URL
+from .catalog import get_catalog
+
+Extent = tuple[float, float, float, float]
+
+# parameters restricting the features of a GetFeature request: the extent of the type does not apply
+FILTER_PARAMS = {"bbox", "count", "cql_filter", "featureid", "filter", "maxfeatures", "resourceid", "startindex"}
+
+# Web Mercator resolution (m/px) at zoom 0 with 256 px tiles, and latitude limit
+RESOLUTION_ZOOM_0 = 156543.03392804097
+MAX_LATITUDE = 85.0511287798
+EARTH_RADIUS = 6378137.0
+
+
+def _mercator(lon: float, lat: float) -> tuple[float, float]:
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    return (
+        EARTH_RADIUS * math.radians(lon),
+        EARTH_RADIUS * math.log(math.tan(math.pi / 4 + math.radians(lat) / 2)),
+    )
+
+
+def _lonlat(x: float, y: float) -> tuple[float, float]:
+    return (
+        math.degrees(x / EARTH_RADIUS),
+        math.degrees(2 * math.atan(math.exp(y / EARTH_RADIUS)) - math.pi / 2),
+    )
+
+
+def extent_view(
+    extent: Extent, *, width: int = 500, height: int = 500, padding: int = 20, max_zoom: int = 16
+) -> tuple[float, float, int]:
+    """Center (lon, lat) and largest integer zoom showing ``extent`` on a Web Mercator map of this size."""
+    min_x, min_y = _mercator(extent[0], extent[1])
+    max_x, max_y = _mercator(extent[2], extent[3])
+    lon, lat = _lonlat((min_x + max_x) / 2, (min_y + max_y) / 2)
+    resolution = max(
+        (max_x - min_x) / max(1, width - 2 * padding),
+        (max_y - min_y) / max(1, height - 2 * padding),
+    )
+    if resolution <= 0:
+        return lon, lat, max_zoom
+    zoom = math.floor(math.log2(RESOLUTION_ZOOM_0 / resolution))
+    return lon, lat, max(0, min(max_zoom, zoom))
+
+
+def data_extent(url: str) -> Extent | None:
+    """Extent (longitude / latitude) of the features requested by a Géoplateforme WFS GetFeature URL.
+
+    Read from the bounding box of the type in the local catalog: the URL given
+    by the model is never fetched by the server. Only an unfiltered request of
+    a type of the catalog on the host of ``WFS_CATALOG_URL`` has a known extent
+    (None otherwise: the browser fits the view on the data).
+    """
+    parts = urlsplit(url)
+    if parts.scheme != "https" or parts.hostname != urlsplit(WFS_CATALOG_URL).hostname:
+        return None
+    keys = {key.lower(): value for key, value in parse_qsl(parts.query, keep_blank_values=True)}
+    if keys.get("request", "").lower() != "getfeature" or FILTER_PARAMS & keys.keys():
+        return None
+    typename = keys.get("typenames") or keys.get("typename") or ""
+    catalog = get_catalog()
+    if catalog is None or typename not in catalog.feature_types:
+        return None
+    bbox = catalog.feature_types[typename].get("bbox")
+    return tuple(bbox) if bbox else None
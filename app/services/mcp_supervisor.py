@@ -0,0 +1,497 @@
+"""Supervision des serveurs MCP : sessions persistantes, health-checks, redémarrage, secours à chaud et recyclage."""
+import asyncio
+import logging
+import os
+import time
+from contextlib import nullcontext
+from typing import Any, Callable
+
+import anyio
+import httpx
+from langchain_core.tools import BaseTool
+from langchain_mcp_adapters.interceptors import MCPToolCallRequest
+from langchain_mcp_adapters.sessions import create_session
+from langchain_mcp_adapters.tools import convert_mcp_tool_to_langchain_tool
+from mcp import ClientSession
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+
+from .tool_timeout import hedged_request
+
+logger = logging.getLogger(__name__)
+
+# replacements of a healthy process (it keeps serving until the new one is ready)
+RECYCLE_REASONS = ("max_calls", "max_rss")
+
+# failures of the session itself (closed stream, dead process), as opposed to JSON-RPC errors
+TRANSPORT_ERRORS = (
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    OSError,
+    httpx.TransportError,
+)
+
+# active supervisor (see get_mcp_status)
+_supervisor: "McpSupervisor | None" = None
+
+
+def _process_table() -> dict[int, int]:
+    """pid -> parent pid of the running processes (empty if /proc is not available)."""
+    table = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return table
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                # the command name (2nd field) may contain spaces and parentheses
+                fields = f.read().rsplit(")", 1)[1].split()
+            table[int(entry)] = int(fields[1])
+        except (OSError, IndexError, ValueError):
+            continue
+    return table
+
+
+def is_transport_error(error: BaseException) -> bool:
+    """True if ``error`` means that the session is unusable (the process must be replaced).
+
+    A JSON-RPC error response (``McpError``: invalid params, unknown tool...)
+    comes from a healthy server, except the one raised for a closed connection.
+    """
+    if isinstance(error, McpError):
+        return error.error.code == CONNECTION_CLOSED
+    return isinstance(error, TRANSPORT_ERRORS)
+
+
+def child_pids(pid: int | None = None) -> set[int]:
+    """Direct children of ``pid`` (the current process by default)."""
+    parent = os.getpid() if pid is None else pid
+    return {child for child, ppid in _process_table().items() if ppid == parent}
+
+
+def rss_bytes(pids: list[int]) -> int | None:
+    """Resident memory of ``pids`` and their descendants (e.g. ``npx`` -> ``node``), None if unknown."""
+    if not pids:
+        return None
+    table = _process_table()
+    tree, pending = set(), list(pids)
+    while pending:
+        pid = pending.pop()
+        if pid in tree or pid not in table:
+            continue
+        tree.add(pid)
+        pending.extend(child for child, ppid in table.items() if ppid == pid)
+    total = 0
+    for pid in tree:
+        try:
+            with open(f"/proc/{pid}/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except (OSError, ValueError):
+            continue
+    return total if tree else None
+
+
+class ServerProcess:
+    """One started MCP server (a child process for stdio) with its initialized session.
+
+    The session is opened and closed by a dedicated task: the context managers
+    of the MCP SDK must be exited by the task that entered them.
+    """
+
+    def __init__(self, name: str, connection: dict[str, Any], session_factory: Callable = create_session):
+        self.name = name
+        self.connection = connection
+        self.session: ClientSession | None = None
+        self.pids: list[int] = []
+        self.calls = 0
+        self.inflight = 0
+        self.started_at: float | None = None
+        self.error: BaseException | None = None
+        self._session_factory = session_factory
+        self._ready = asyncio.Event()
+        self._stop = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def alive(self) -> bool:
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def start(self, timeout: float, track_pids: bool = False) -> None:
+        before = child_pids() if track_pids else set()
+        self._task = asyncio.create_task(self._run(), name=f"mcp-{self.name}")
+        ready = asyncio.create_task(self._ready.wait())
+        try:
+            await asyncio.wait({self._task, ready}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            ready.cancel()
+        if not self.alive:
+            await self.stop()
+            raise self.error or TimeoutError(f"MCP server {self.name} not ready after {timeout} s")
+        if track_pids:
+            self.pids = sorted(child_pids() - before)
+
+    async def _run(self) -> None:
+        try:
+            async with self._session_factory(self.connection) as session:
+                await session.initialize()
+                self.session = session
+                self.started_at = time.monotonic()
+                self._ready.set()
+                await self._stop.wait()
+        except Exception as e:
+            self.error = e
+            logger.warning("MCP server %s stopped: %s", self.name, e)
+        finally:
+            self.session = None
+
+    def rss(self) -> int | None:
+        return rss_bytes(self.pids)
+
+    async def ping(self, timeout: float) -> None:
+        if not self.alive:
+            raise RuntimeError(f"MCP server {self.name} is not running") from self.error
+        await asyncio.wait_for(self.session.send_ping(), timeout)
+
+    async def stop(self, timeout: float = 5) -> None:
+        self._stop.set()
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except (asyncio.TimeoutError, Exception):
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def drain_and_stop(self, timeout: float = 60) -> None:
+        """Stop once the calls in progress are done (recycled process)."""
+        deadline = time.monotonic() + timeout
+        while self.inflight and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        await self.stop()
+
+
+class ServerState:
+    """Supervision state of one configured MCP server."""
+
+    def __init__(self, name: str, connection: dict[str, Any]):
+        self.name = name
+        self.connection = connection
+        self.current: ServerProcess | None = None
+        self.spare: ServerProcess | None = None
+        self.restarts = 0
+        self.recycled = 0
+        self.failures = 0
+        self.last_error: str | None = None
+        self.replacing: asyncio.Task | None = None
+        self.ready = asyncio.Event()
+
+
+class McpSupervisor:
+    """Keep one persistent session per MCP server and replace it when it fails.
+
+    ``langchain-mcp-adapters`` opens a new session (a new ``npx`` process for
+    stdio servers) for each tool call. The supervisor instead starts each server
+    once and routes the tool calls to it through a tool interceptor:
+
+    - the servers are pinged every ``health_interval`` seconds and restarted
+      with an exponential backoff (up to ``backoff_max`` seconds) when they
+      don't answer or a call fails at the transport level;
+    - with ``warm_spare``, a second process per server is started in advance
+      and takes over immediately when the current one is replaced;
+    - a process is recycled after ``max_calls`` calls or above ``max_rss_mb``
+      of resident memory (0 to disable), once its calls in progress are done.
+
+    Usage::
+
+        async with McpSupervisor(get_mcp_servers_config()) as supervisor:
+            tools_by_server = await supervisor.get_tools()
+    """
+
+    def __init__(
+        self,
+        connections: dict[str, dict[str, Any]],
+        *,
+        warm_spare: bool = False,
+        max_calls: int = 0,
+        max_rss_mb: float = 0,
+        health_interval: float = 30,
+        health_timeout: float = 10,
+        start_timeout: float = 120,
+        backoff_initial: float = 1,
+        backoff_max: float = 60,
+        session_factory: Callable = create_session,
+    ):
+        self.servers = {name: ServerState(name, connection) for name, connection in connections.items()}
+        self.warm_spare = warm_spare
+        self.max_calls = max_calls
+        self.max_rss_mb = max_rss_mb
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.start_timeout = start_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self._session_factory = session_factory
+        # the pids of a new process are found by difference: one start at a time
+        self._spawn_lock = asyncio.Lock()
+        self._health_task: asyncio.Task | None = None
+        self._background: set[asyncio.Task] = set()
+
+    async def __aenter__(self) -> "McpSupervisor":
+        global _supervisor
+        await self.start()
+        _supervisor = self
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        global _supervisor
+        if _supervisor is self:
+            _supervisor = None
+        await self.aclose()
+
+    async def start(self) -> None:
+        """Start every server (failing if one of them can't start) and the health checks."""
+        await asyncio.gather(*(self._start_current(state) for state in self.servers.values()))
+        if self.warm_spare:
+            for state in self.servers.values():
+                self._spawn(self._start_spare(state))
+        if self.health_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def aclose(self) -> None:
+        tasks = [task for task in (self._health_task, *self._background) if task is not None]
+        for state in self.servers.values():
+            if state.replacing is not None:
+                tasks.append(state.replacing)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        processes = [p for state in self.servers.values() for p in (state.current, state.spare) if p is not None]
+        await asyncio.gather(*(process.stop() for process in processes), return_exceptions=True)
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    async def _new_process(self, state: ServerState) -> ServerProcess:
+        process = ServerProcess(state.name, state.connection, self._session_factory)
+        track_pids = self.max_rss_mb > 0
+        async with self._spawn_lock if track_pids else nullcontext():
+            await process.start(self.start_timeout, track_pids=track_pids)
+        logger.info("MCP server %s started (pids: %s)", state.name, process.pids)
+        return process
+
+    async def _start_current(self, state: ServerState) -> None:
+        state.current = await self._new_process(state)
+        state.ready.set()
+
+    async def _start_spare(self, state: ServerState) -> None:
+        try:
+            state.spare = await self._new_process(state)
+        except Exception as e:
+            state.last_error = f"spare: {e}"
+            logger.warning("MCP server %s: warm spare failed to start: %s", state.name, e)
+
+    def replace(self, state: ServerState, reason: str) -> asyncio.Task:
+        """Replace the current process of ``state`` (at most one replacement at a time)."""
+        if state.replacing is None or state.replacing.done():
+            if reason not in RECYCLE_REASONS:
+                # new calls wait for the replacement instead of reaching the failed process
+                state.ready.clear()
+            state.replacing = asyncio.create_task(self._replace(state, reason))
+        return state.replacing
+
+    async def _replace(self, state: ServerState, reason: str) -> None:
+        old = state.current
+        recycle = reason in RECYCLE_REASONS
+        logger.warning("MCP server %s: replacing process (%s)", state.name, reason)
+        if recycle:
+            state.recycled += 1
+        else:
+            state.failures += 1
+            state.last_error = reason
+
+        spare, state.spare = state.spare, None
+        if spare is not None and spare.alive:
+            state.current = spare
+        else:
+            if spare is not None:
+                await spare.stop()
+            if not recycle:
+                state.current = None
+            attempt = 0
+            while True:
+                try:
+                    new = await self._new_process(state)
+                    break
+                except Exception as e:
+                    delay = min(self.backoff_max, self.backoff_initial * 2 ** attempt)
+                    state.last_error = str(e) or type(e).__name__
+                    logger.warning("MCP server %s failed to start (%s), retry in %s s", state.name, e, delay)
+                    attempt += 1
+                    await asyncio.sleep(delay)
+            state.current = new
+        state.restarts += 1
+        state.ready.set()
+
+        if old is not None and old is not state.current:
+            self._spawn(old.drain_and_stop() if recycle else old.stop())
+        if self.warm_spare:
+            self._spawn(self._start_spare(state))
+
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_interval)
+            await asyncio.gather(*(self.check(state) for state in self.servers.values()))
+
+    async def check(self, state: ServerState) -> None:
+        """Ping the current process (and the spare) of a server, replace it if needed."""
+        if state.replacing is not None and not state.replacing.done():
+            return
+        process = state.current
+        try:
+            if process is None:
+                raise RuntimeError("no process")
+            await process.ping(self.health_timeout)
+        except Exception as e:
+            self.replace(state, f"health check failed: {str(e) or type(e).__name__}")
+            return
+        self._check_recycle(state, process)
+
+        spare = state.spare
+        if spare is not None:
+            try:
+                await spare.ping(self.health_timeout)
+            except Exception as e:
+                logger.warning("MCP server %s: warm spare unhealthy (%s), restarting it", state.name, e)
+                state.spare = None
+                self._spawn(spare.stop())
+                self._spawn(self._start_spare(state))
+
+    def _check_recycle(self, state: ServerState, process: ServerProcess) -> None:
+        if process is not state.current:
+            return
+        if self.max_calls and process.calls >= self.max_calls:
+            self.replace(state, "max_calls")
+        elif self.max_rss_mb:
+            rss = process.rss()
+            if rss is not None and rss > self.max_rss_mb * 1024 * 1024:
+                self.replace(state, "max_rss")
+
+    async def _ready_process(self, state: ServerState) -> ServerProcess:
+        process = state.current
+        if process is None or not process.alive:
+            self.replace(state, "process exited" if process is not None else "no process")
+        if not state.ready.is_set():
+            await asyncio.wait_for(state.ready.wait(), self.start_timeout)
+            process = state.current
+            if process is None or not process.alive:
+                raise RuntimeError(f"MCP server {state.name} is not available: {state.last_error}")
+        return process
+
+    async def call_tool(self, server_name: str, name: str, arguments: dict[str, Any]):
+        """Call a tool on the current process of ``server_name`` (``CallToolResult``)."""
+        state = self.servers[server_name]
+        if hedged_request.get():
+            return await self._call_spare(state, name, arguments)
+        process = await self._ready_process(state)
+        process.calls += 1
+        process.inflight += 1
+        try:
+            return await process.session.call_tool(name, arguments)
+        except Exception as e:
+            # the session is replaced on transport failures only (a JSON-RPC error is raised as is,
+            # tool errors are returned as isError results)
+            if is_transport_error(e) and process is state.current:
+                self.replace(state, f"call failed: {str(e) or type(e).__name__}")
+            raise
+        finally:
+            process.inflight -= 1
+            self._check_recycle(state, process)
+
+    async def _call_spare(self, state: ServerState, name: str, arguments: dict[str, Any]):
+        """Duplicate request of a hedged call, on the warm spare (the current process runs the first one)."""
+        spare = state.spare
+        if spare is None or not spare.alive:
+            raise RuntimeError(f"MCP server {state.name}: no warm spare for the hedged request")
+        spare.calls += 1
+        spare.inflight += 1
+        try:
+            return await spare.session.call_tool(name, arguments)
+        except Exception as e:
+            if is_transport_error(e) and spare is state.spare:
+                logger.warning("MCP server %s: warm spare failed (%s), restarting it", state.name, e)
+                state.spare = None
+                self._spawn(spare.stop())
+                self._spawn(self._start_spare(state))
+            raise
+        finally:
+            spare.inflight -= 1
+
+    async def __call__(self, request: MCPToolCallRequest, handler) -> Any:
+        """Tool interceptor routing the calls to the supervised sessions (``handler`` is not used)."""
+        return await self.call_tool(request.server_name, request.name, request.args)
+
+    async def get_tools(self) -> dict[str, list[BaseTool]]:
+        """LangChain tools of each server, executed through the supervisor."""
+        tools_by_server = {}
+        for name, state in self.servers.items():
+            process = await self._ready_process(state)
+            mcp_tools, cursor = [], None
+            while True:
+                page = await process.session.list_tools(cursor=cursor)
+                mcp_tools.extend(page.tools)
+                cursor = page.nextCursor
+                if not cursor:
+                    break
+            tools_by_server[name] = [
+                convert_mcp_tool_to_langchain_tool(
+                    None,
+                    tool,
+                    connection=state.connection,
+                    tool_interceptors=[self],
+                    server_name=name,
+                )
+                for tool in mcp_tools
+            ]
+        return tools_by_server
+
+    def status(self) -> dict[str, dict[str, Any]]:
+        """Per-server status (state, pids, calls, memory, restarts...)."""
+        now = time.monotonic()
+        result = {}
+        for name, state in self.servers.items():
+            process = state.current
+            replacing = state.replacing is not None and not state.replacing.done()
+            if process is not None and process.alive:
+                status = "restarting" if replacing else "ready"
+            else:
+                status = "restarting" if replacing else "down"
+            rss = process.rss() if process is not None and self.max_rss_mb else None
+            result[name] = {
+                "status": status,
+                "pids": process.pids if process is not None else [],
+                "calls": process.calls if process is not None else 0,
+                "inflight": process.inflight if process is not None else 0,
+                "rss_mb": round(rss / 1024 / 1024, 1) if rss is not None else None,
+                "uptime_seconds": round(now - process.started_at, 1) if process is not None and process.started_at else None,
+                "spare": "ready" if state.spare is not None and state.spare.alive else None,
+                "restarts": state.restarts,
+                "recycled": state.recycled,
+                "failures": state.failures,
+                "last_error": state.last_error,
+            }
+        return result
+
+
+def get_mcp_status() -> dict[str, dict[str, Any]] | None:
+    """Status of the supervised MCP servers (None if the supervisor is not used)."""
+    return _supervisor.status() if _supervisor is not None else None
@@ -0,0 +1,466 @@
+"""Checkpointer en mémoire borné (LRU, compaction des threads inactifs, déversement sur disque)."""
+from __future__ import annotations
+
+import asyncio
+import base64
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Callable, Iterator
+
+import ormsgpack
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.base import SerializerProtocol
+
+logger = logging.getLogger(__name__)
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """``InMemorySaver`` with a bounded footprint for long-running demo pods.
+
+    - threads idle for ``idle_seconds`` are compacted to their latest checkpoint
+      (the history used by ``get_state_history`` is dropped, not the messages);
+    - above ``max_threads`` threads or ``max_bytes`` (estimated from serialized
+      sizes), least recently used threads are evicted;
+    - with ``spill_dir``, evicted threads are written to disk and transparently
+      reloaded on access instead of being lost. The async methods (used by the
+      agent) read and write these files in a worker thread.
+
+    ``on_forget(thread_id)`` is called when a thread is evicted without spill
+    directory or deleted, to drop the data kept about it elsewhere.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_threads: int | None = None,
+        max_bytes: int | None = None,
+        idle_seconds: float = 300,
+        spill_dir: str | None = None,
+        serde: SerializerProtocol | None = None,
+        on_forget: Callable[[str], None] | None = None,
+    ) -> None:
+        super().__init__(serde=serde)
+        self.max_threads = max_threads or None
+        self.max_bytes = max_bytes or None
+        self.idle_seconds = idle_seconds
+        self.spill_dir = spill_dir or None
+        self.on_forget = on_forget
+
+        # thread_id -> last access (oldest first)
+        self._last_access: OrderedDict[str, float] = OrderedDict()
+        self._sizes: dict[str, int] = {}
+        self._blob_keys: dict[str, set[tuple]] = {}
+        self._write_keys: dict[str, set[tuple]] = {}
+        self._compacted: set[str] = set()
+        # threads evicted to the spill directory, and those not written yet
+        self._spilled: set[str] = set()
+        self._pending_spills: dict[str, dict[str, Any]] = {}
+        self._spill_lock = asyncio.Lock()
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            for filename in os.listdir(self.spill_dir):
+                if filename.endswith(".msgpack"):
+                    self._spilled.add(base64.urlsafe_b64decode(filename.removesuffix(".msgpack")).decode("utf-8"))
+        self.evictions = 0
+        self.reloads = 0
+        self.compactions = 0
+
+    # --- checkpointer API ---
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        self._ensure_loaded(config["configurable"]["thread_id"])
+        result = self._get_tuple(config)
+        self._flush_spills()
+        return result
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        await self._aensure_loaded(config["configurable"]["thread_id"])
+        result = self._get_tuple(config)
+        await self._aflush_spills()
+        return result
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        if config:
+            self._ensure_loaded(config["configurable"]["thread_id"])
+            self._flush_spills()
+            yield from super().list(config, filter=filter, before=before, limit=limit)
+            return
+
+        # all threads: the spilled ones are read from disk without being reloaded in memory
+        count = 0
+        for item in super().list(None, filter=filter, before=before, limit=limit):
+            yield item
+            count += 1
+        for thread_id in sorted(self._spilled):
+            if limit is not None and count >= limit:
+                return
+            data = self._pending_spills.get(thread_id) or self._read_spill(thread_id)
+            remaining = None if limit is None else limit - count
+            for item in self._spilled_view(thread_id, data).list(None, filter=filter, before=before, limit=remaining):
+                yield item
+                count += 1
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        if config:
+            await self._aensure_loaded(config["configurable"]["thread_id"])
+            await self._aflush_spills()
+            for item in [*super().list(config, filter=filter, before=before, limit=limit)]:
+                yield item
+            return
+
+        count = 0
+        for item in [*super().list(None, filter=filter, before=before, limit=limit)]:
+            yield item
+            count += 1
+        for thread_id in sorted(self._spilled):
+            if limit is not None and count >= limit:
+                return
+            data = self._pending_spills.get(thread_id)
+            if data is None:
+                try:
+                    data = await asyncio.to_thread(self._read_spill, thread_id)
+                except FileNotFoundError:
+                    # reloaded in memory in the meantime
+                    continue
+            remaining = None if limit is None else limit - count
+            for item in self._spilled_view(thread_id, data).list(None, filter=filter, before=before, limit=remaining):
+                yield item
+                count += 1
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        self._ensure_loaded(config["configurable"]["thread_id"])
+        result = self._put(config, checkpoint, metadata, new_versions)
+        self._flush_spills()
+        return result
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        await self._aensure_loaded(config["configurable"]["thread_id"])
+        result = self._put(config, checkpoint, metadata, new_versions)
+        await self._aflush_spills()
+        return result
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Any,
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        self._ensure_loaded(config["configurable"]["thread_id"])
+        self._put_writes(config, writes, task_id, task_path)
+        self._flush_spills()
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Any,
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await self._aensure_loaded(config["configurable"]["thread_id"])
+        self._put_writes(config, writes, task_id, task_path)
+        await self._aflush_spills()
+
+    def delete_thread(self, thread_id: str) -> None:
+        if self._delete(thread_id):
+            self._remove_spill(thread_id)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        if self._delete(thread_id):
+            async with self._spill_lock:
+                await asyncio.to_thread(self._remove_spill, thread_id)
+
+    # --- stats ---
+
+    def thread_ids(self) -> list[str]:
+        """Ids of the threads in memory and spilled to disk."""
+        thread_ids = {thread_id for thread_id, namespaces in self.storage.items() if any(namespaces.values())}
+        return sorted(thread_ids | self._spilled)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "threads": len(self._last_access),
+            "spilled_threads": len(self._spilled),
+            "bytes": sum(self._sizes.values()),
+            "max_threads": self.max_threads,
+            "max_bytes": self.max_bytes,
+            "compactions": self.compactions,
+            "evictions": self.evictions,
+            "reloads": self.reloads,
+        }
+
+    # --- internals ---
+
+    def _get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config["configurable"]["thread_id"]
+        result = super().get_tuple(config)
+        if result is None:
+            # InMemorySaver.storage is a defaultdict: don't keep empty entries for unknown threads
+            if not any(self.storage.get(thread_id, {}).values()):
+                self.storage.pop(thread_id, None)
+        else:
+            self._touch(thread_id)
+        return result
+
+    def _put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        result = super().put(config, checkpoint, metadata, new_versions)
+
+        blob_keys = self._blob_keys.setdefault(thread_id, set())
+        saved = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+        added = len(saved[0][1]) + len(saved[1][1])
+        for channel, version in new_versions.items():
+            key = (thread_id, checkpoint_ns, channel, version)
+            blob_keys.add(key)
+            added += len(self.blobs[key][1])
+        self._sizes[thread_id] = self._sizes.get(thread_id, 0) + added
+        self._compacted.discard(thread_id)
+        self._touch(thread_id)
+        self._enforce_limits()
+        return result
+
+    def _put_writes(self, config: RunnableConfig, writes: Any, task_id: str, task_path: str) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        outer_key = (thread_id, config["configurable"].get("checkpoint_ns", ""), config["configurable"]["checkpoint_id"])
+        before = self._writes_size(outer_key)
+        super().put_writes(config, writes, task_id, task_path)
+        self._write_keys.setdefault(thread_id, set()).add(outer_key)
+        self._sizes[thread_id] = self._sizes.get(thread_id, 0) + self._writes_size(outer_key) - before
+        self._touch(thread_id)
+
+    def _delete(self, thread_id: str) -> bool:
+        """Drop ``thread_id`` from memory, True if it also has a spill file to remove."""
+        super().delete_thread(thread_id)
+        self._forget(thread_id)
+        self._pending_spills.pop(thread_id, None)
+        spilled = thread_id in self._spilled
+        self._spilled.discard(thread_id)
+        if self.on_forget is not None:
+            self.on_forget(thread_id)
+        return spilled
+
+    def _writes_size(self, outer_key: tuple) -> int:
+        return sum(len(value[2][1]) for value in self.writes.get(outer_key, {}).values())
+
+    def _measure(self, thread_id: str) -> int:
+        size = sum(
+            len(saved[0][1]) + len(saved[1][1])
+            for checkpoints in self.storage.get(thread_id, {}).values()
+            for saved in checkpoints.values()
+        )
+        size += sum(len(self.blobs[key][1]) for key in self._blob_keys.get(thread_id, ()))
+        size += sum(self._writes_size(key) for key in self._write_keys.get(thread_id, ()))
+        return size
+
+    def _touch(self, thread_id: str) -> None:
+        self._last_access[thread_id] = time.monotonic()
+        self._last_access.move_to_end(thread_id)
+
+    def _forget(self, thread_id: str) -> None:
+        self._last_access.pop(thread_id, None)
+        self._sizes.pop(thread_id, None)
+        self._blob_keys.pop(thread_id, None)
+        self._write_keys.pop(thread_id, None)
+        self._compacted.discard(thread_id)
+
+    def _over_limits(self) -> bool:
+        if self.max_threads is not None and len(self._last_access) > self.max_threads:
+            return True
+        if self.max_bytes is not None and sum(self._sizes.values()) > self.max_bytes:
+            return True
+        return False
+
+    def _enforce_limits(self) -> None:
+        now = time.monotonic()
+        for thread_id, last_access in self._last_access.items():
+            if now - last_access < self.idle_seconds:
+                break
+            if thread_id not in self._compacted:
+                self._compact(thread_id)
+
+        # never evict the most recently used thread (the one being written)
+        while self._over_limits() and len(self._last_access) > 1:
+            self._evict(next(iter(self._last_access)))
+
+    def _compact(self, thread_id: str) -> None:
+        """Keep only the latest checkpoint of each namespace (with its writes and blobs)."""
+        keep_blobs = set()
+        for checkpoint_ns, checkpoints in self.storage[thread_id].items():
+            if not checkpoints:
+                continue
+            latest = max(checkpoints)
+            versions = self.serde.loads_typed(checkpoints[latest][0])["channel_versions"]
+            keep_blobs.update((thread_id, checkpoint_ns, channel, version) for channel, version in versions.items())
+            for checkpoint_id in [c for c in checkpoints if c != latest]:
+                del checkpoints[checkpoint_id]
+                self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+                self._write_keys.get(thread_id, set()).discard((thread_id, checkpoint_ns, checkpoint_id))
+
+        blob_keys = self._blob_keys.get(thread_id, set())
+        for key in blob_keys - keep_blobs:
+            self.blobs.pop(key, None)
+        self._blob_keys[thread_id] = blob_keys & keep_blobs
+
+        self._sizes[thread_id] = self._measure(thread_id)
+        self._compacted.add(thread_id)
+        self.compactions += 1
+
+    def _spill_path(self, thread_id: str) -> str:
+        filename = base64.urlsafe_b64encode(thread_id.encode("utf-8")).decode("ascii")
+        return os.path.join(self.spill_dir, f"{filename}.msgpack")
+
+    def _evict(self, thread_id: str) -> None:
+        """Drop ``thread_id`` from memory, its data is queued for ``_flush_spills`` with ``spill_dir``."""
+        namespaces = self.storage.pop(thread_id, {})
+        writes = {key: self.writes.pop(key) for key in self._write_keys.get(thread_id, ()) if key in self.writes}
+        blobs = {key: self.blobs.pop(key) for key in self._blob_keys.get(thread_id, ()) if key in self.blobs}
+
+        if self.spill_dir and any(namespaces.values()):
+            self._pending_spills[thread_id] = {
+                "storage": [
+                    [checkpoint_ns, checkpoint_id, list(saved[0]), list(saved[1]), saved[2]]
+                    for checkpoint_ns, checkpoints in namespaces.items()
+                    for checkpoint_id, saved in checkpoints.items()
+                ],
+                "writes": [
+                    [key[1], key[2], inner[0], inner[1], [value[0], value[1], list(value[2]), value[3]]]
+                    for key, values in writes.items()
+                    for inner, value in values.items()
+                ],
+                "blobs": [[key[1], key[2], key[3], list(value)] for key, value in blobs.items()],
+            }
+            self._spilled.add(thread_id)
+            logger.debug("thread %s spilled to disk", thread_id)
+        else:
+            logger.debug("thread %s evicted from memory", thread_id)
+            if self.on_forget is not None:
+                self.on_forget(thread_id)
+
+        self._forget(thread_id)
+        self.evictions += 1
+
+    # blocking file operations (run in a worker thread by the async methods)
+
+    def _write_spill(self, thread_id: str, data: dict[str, Any]) -> None:
+        with open(self._spill_path(thread_id), "wb") as f:
+            f.write(ormsgpack.packb(data))
+
+    def _read_spill(self, thread_id: str) -> dict[str, Any]:
+        with open(self._spill_path(thread_id), "rb") as f:
+            return ormsgpack.unpackb(f.read())
+
+    def _take_spill(self, thread_id: str) -> dict[str, Any]:
+        data = self._read_spill(thread_id)
+        os.remove(self._spill_path(thread_id))
+        return data
+
+    def _remove_spill(self, thread_id: str) -> None:
+        if self.spill_dir and os.path.exists(self._spill_path(thread_id)):
+            os.remove(self._spill_path(thread_id))
+
+    def _flush_spills(self) -> None:
+        while self._pending_spills:
+            self._write_spill(*self._pending_spills.popitem())
+
+    async def _aflush_spills(self) -> None:
+        if not self._pending_spills:
+            return
+        async with self._spill_lock:
+            while self._pending_spills:
+                thread_id, data = next(iter(self._pending_spills.items()))
+                await asyncio.to_thread(self._write_spill, thread_id, data)
+                if self._pending_spills.get(thread_id) is data:
+                    del self._pending_spills[thread_id]
+                if thread_id not in self._spilled:
+                    # reloaded while it was written
+                    await asyncio.to_thread(self._remove_spill, thread_id)
+
+    def _ensure_loaded(self, thread_id: str) -> None:
+        if thread_id not in self._spilled:
+            return
+        data = self._pending_spills.pop(thread_id, None)
+        if data is None:
+            data = self._take_spill(thread_id)
+        self._install(thread_id, data)
+
+    async def _aensure_loaded(self, thread_id: str) -> None:
+        while thread_id in self._spilled:
+            # not written yet, or being written (_aflush_spills then removes the file)
+            data = self._pending_spills.pop(thread_id, None)
+            if data is None:
+                async with self._spill_lock:
+                    if thread_id not in self._spilled or thread_id in self._pending_spills:
+                        # reloaded or evicted again while we waited for the lock
+                        continue
+                    data = await asyncio.to_thread(self._take_spill, thread_id)
+            self._install(thread_id, data)
+            return
+
+    def _unpack(self, saver: InMemorySaver, thread_id: str, data: dict[str, Any]) -> tuple[set[tuple], set[tuple]]:
+        """Fill ``saver`` with the spilled data of ``thread_id``, return its write and blob keys."""
+        write_keys, blob_keys = set(), set()
+        for checkpoint_ns, checkpoint_id, checkpoint, metadata, parent in data["storage"]:
+            saver.storage[thread_id][checkpoint_ns][checkpoint_id] = (tuple(checkpoint), tuple(metadata), parent)
+        for checkpoint_ns, checkpoint_id, task_id, idx, value in data["writes"]:
+            key = (thread_id, checkpoint_ns, checkpoint_id)
+            saver.writes[key][(task_id, idx)] = (value[0], value[1], tuple(value[2]), value[3])
+            write_keys.add(key)
+        for checkpoint_ns, channel, version, value in data["blobs"]:
+            key = (thread_id, checkpoint_ns, channel, version)
+            saver.blobs[key] = tuple(value)
+            blob_keys.add(key)
+        return write_keys, blob_keys
+
+    def _spilled_view(self, thread_id: str, data: dict[str, Any]) -> InMemorySaver:
+        view = InMemorySaver(serde=self.serde)
+        self._unpack(view, thread_id, data)
+        return view
+
+    def _install(self, thread_id: str, data: dict[str, Any]) -> None:
+        self._spilled.discard(thread_id)
+        write_keys, blob_keys = self._unpack(self, thread_id, data)
+        self._write_keys.setdefault(thread_id, set()).update(write_keys)
+        self._blob_keys.setdefault(thread_id, set()).update(blob_keys)
+
+        self._sizes[thread_id] = self._measure(thread_id)
+        self._touch(thread_id)
+        self.reloads += 1
+        logger.debug("thread %s reloaded from disk", thread_id)
+        self._enforce_limits()
@@ -0,0 +1,161 @@
+"""Routage par tour entre un modèle rapide et le modèle principal."""
+import logging
+import re
+import time
+from typing import Annotated, Any, Awaitable, Callable, NotRequired
+
+from langchain.agents.middleware import AgentMiddleware, AgentState, ModelRequest, ModelResponse
+from langchain.agents.middleware.types import ExtendedModelResponse, PrivateStateAttr
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage, SystemMessage
+from langchain_core.tools import BaseTool
+from langgraph.types import Command
+from pydantic import BaseModel, ValidationError
+
+logger = logging.getLogger(__name__)
+
+FAST = "fast"
+MAIN = "main"
+
+ModelHandler = Callable[[ModelRequest], Awaitable[ModelResponse]]
+
+# questions that usually need several tool calls or some reasoning
+MAIN_KEYWORDS = (
+    "carte", "map", "compar", "analys", "explique", "pourquoi", "comment",
+    "liste", "toutes", "tous", "statisti", "évolution", "différence",
+)
+
+CLASSIFIER_PROMPT = (
+    "Tu aiguilles les questions posées à un assistant géographique. "
+    "Réponds FAST si la question est simple (salutation, heure, date, un seul géocodage "
+    "ou une seule recherche), MAIN si elle demande plusieurs appels d'outils, une carte, "
+    "une comparaison ou un raisonnement. Réponds uniquement par FAST ou MAIN."
+)
+
+
+def last_human_message(messages: list[AnyMessage]) -> HumanMessage | None:
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return message
+    return None
+
+
+class HeuristicClassifier:
+    """Cheap rule-based classifier: short questions without "complex" keywords go to the fast model."""
+
+    def __init__(self, max_chars: int = 200, keywords: tuple[str, ...] = MAIN_KEYWORDS):
+        self.max_chars = max_chars
+        self._pattern = re.compile("|".join(re.escape(k) for k in keywords), re.IGNORECASE)
+
+    async def __call__(self, messages: list[AnyMessage]) -> str:
+        message = last_human_message(messages)
+        if message is None:
+            return MAIN
+        text = message.text
+        if len(text) > self.max_chars or self._pattern.search(text):
+            return MAIN
+        return FAST
+
+
+class ModelClassifier:
+    """Ask a small chat model whether the last question needs the main model."""
+
+    def __init__(self, model: BaseChatModel, prompt: str = CLASSIFIER_PROMPT):
+        self.model = model
+        self.prompt = prompt
+
+    async def __call__(self, messages: list[AnyMessage]) -> str:
+        message = last_human_message(messages)
+        if message is None:
+            return MAIN
+        try:
+            answer = await self.model.ainvoke([SystemMessage(content=self.prompt), HumanMessage(content=message.text)])
+        except Exception as e:
+            logger.warning("model router: classifier failed (%s), using main model", e)
+            return MAIN
+        return FAST if answer.text.strip().upper().startswith("FAST") else MAIN
+
+
+def invalid_tool_calls(message: AIMessage, tools: list[BaseTool | dict[str, Any]]) -> list[str]:
+    """Reasons why the tool calls of ``message`` can't be executed (empty if they are valid)."""
+    errors = [f"{call.get('name')}: {call.get('error')}" for call in message.invalid_tool_calls]
+    tools_by_name = {tool.name: tool for tool in tools if isinstance(tool, BaseTool)}
+    for call in message.tool_calls:
+        tool = tools_by_name.get(call["name"])
+        if tool is None:
+            errors.append(f"{call['name']}: unknown tool")
+            continue
+        schema = tool.args_schema
+        if isinstance(schema, type) and issubclass(schema, BaseModel):
+            try:
+                schema.model_validate(call["args"])
+            except ValidationError as e:
+                errors.append(f"{call['name']}: {e.error_count()} invalid argument(s)")
+        elif isinstance(schema, dict):
+            # MCP tools: JSON schema, only check required properties
+            missing = [name for name in schema.get("required", []) if name not in call["args"]]
+            if missing:
+                errors.append(f"{call['name']}: missing {', '.join(missing)}")
+    return errors
+
+
+class RouterState(AgentState):
+    model_tier: NotRequired[Annotated[str, PrivateStateAttr]]
+
+
+class ModelRouterMiddleware(AgentMiddleware[RouterState]):
+    """Route each turn to a fast model or to the main model (the agent's model).
+
+    The classifier runs once per turn (``before_agent``) and its decision is kept
+    in the state for the following model calls of the turn. When the fast model
+    fails or produces tool calls that can't be executed (unknown tool, invalid
+    arguments), the call is replayed on the main model which is then used until
+    the end of the turn.
+    """
+
+    state_schema = RouterState
+
+    def __init__(
+        self,
+        fast_model: BaseChatModel,
+        classifier: Callable[[list[AnyMessage]], Awaitable[str]],
+    ):
+        super().__init__()
+        self.fast_model = fast_model
+        self.classifier = classifier
+        self.decisions = {FAST: 0, MAIN: 0}
+        self.escalations = 0
+
+    async def abefore_agent(self, state: RouterState, runtime: Any) -> dict[str, Any]:
+        start = time.perf_counter()
+        tier = await self.classifier(state["messages"])
+        self.decisions[tier] += 1
+        logger.info("model router: turn routed to %s model (classified in %.1f ms)", tier, (time.perf_counter() - start) * 1000)
+        return {"model_tier": tier}
+
+    async def awrap_model_call(self, request: ModelRequest, handler: ModelHandler) -> ModelResponse | ExtendedModelResponse:
+        if request.state.get("model_tier", MAIN) == MAIN:
+            return await self._timed(MAIN, handler, request)
+
+        try:
+            response = await self._timed(FAST, handler, request.override(model=self.fast_model))
+        except Exception as e:
+            reason = f"fast model failed: {e}"
+        else:
+            messages = [m for m in response.result if isinstance(m, AIMessage)]
+            errors = [error for m in messages for error in invalid_tool_calls(m, request.tools)]
+            if not errors:
+                return response
+            reason = "invalid tool calls: " + "; ".join(errors)
+
+        self.escalations += 1
+        logger.warning("model router: escalating to main model (%s)", reason)
+        response = await self._timed(MAIN, handler, request)
+        return ExtendedModelResponse(model_response=response, command=Command(update={"model_tier": MAIN}))
+
+    async def _timed(self, tier: str, handler: ModelHandler, request: ModelRequest) -> ModelResponse:
+        start = time.perf_counter()
+        try:
+            return await handler(request)
+        finally:
+            logger.info("model router: %s model call took %.2f s", tier, time.perf_counter() - start)
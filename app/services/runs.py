@@ -0,0 +1,264 @@
+"""Registre des exécutions de l'agent par thread (tâches détachées, événements bufferisés, annulation)."""
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langgraph.graph.state import CompiledStateGraph
+
+from .chat import run_slot
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("cancel", "queue")
+CANCEL_REASONS = ("disconnect", "reset", "resubmit")
+
+
+@dataclass
+class Run:
+    thread_id: str
+    session_id: str | None = None
+    on_cancel: Callable[[str], Awaitable[None]] | None = None
+    # free data for the clients attaching to the run (e.g. the user message)
+    metadata: dict[str, Any] = field(default_factory=dict)
+    task: asyncio.Task | None = None
+    cancel_reason: str | None = None
+    error: BaseException | None = None
+    # every item produced since the start of the run (replayed to attaching clients)
+    items: list[Any] = field(default_factory=list)
+    finished: bool = False
+    subscribers: set[Any] = field(default_factory=set)
+    changed: asyncio.Condition = field(default_factory=asyncio.Condition)
+
+
+class RunRegistry:
+    """Agent runs executed as detached tasks keyed by thread id.
+
+    The items of a run are buffered so that a client can ``attach()`` to a run
+    in progress (after a reload or a dropped connection) and receive the items
+    from the start of the run, then the remaining ones. A run without any
+    subscriber is cancelled after ``detach_grace_seconds`` (immediately with 0).
+
+    A new submission on a thread with a run in progress either cancels it
+    (``policy="cancel"``) or waits for its end (``policy="queue"``). A run is
+    queued until it holds the lock of its thread, then it is the active run
+    that ``attach()`` and ``cancel()`` act on.
+    """
+
+    def __init__(self, policy: str = "cancel", detach_grace_seconds: float = 0):
+        if policy not in POLICIES:
+            raise ValueError(f"Invalid policy: {policy} (expected one of {POLICIES})")
+        self.policy = policy
+        self.detach_grace_seconds = detach_grace_seconds
+        # active run of each thread, and the runs waiting for the lock of the thread
+        self._runs: dict[str, Run] = {}
+        self._queues: dict[str, deque[Run]] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._waiting: dict[str, int] = {}
+        self._timers: set[asyncio.Task] = set()
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.attached = 0
+        self.cancelled = {reason: 0 for reason in CANCEL_REASONS}
+
+    def attach(self, thread_id: str) -> Run | None:
+        """Run in progress for ``thread_id``, else the next queued one (None if there is none)."""
+        run = self._runs.get(thread_id)
+        if run is None and thread_id in self._queues:
+            run = self._queues[thread_id][0]
+        if run is None or run.finished:
+            return None
+        self.attached += 1
+        return run
+
+    async def start(
+        self,
+        thread_id: str,
+        events: AsyncIterator[Any],
+        *,
+        session_id: str | None = None,
+        on_cancel: Callable[[str], Awaitable[None]] | None = None,
+        metadata: dict[str, Any] | None = None,
+    ) -> Run:
+        """Start consuming ``events`` in a detached task as the run of ``thread_id``.
+
+        ``on_cancel(thread_id)`` is awaited after a cancellation, before the next
+        run of the thread starts (see ``repair_dangling_tool_calls``).
+        """
+        if self.policy == "cancel":
+            for current in self._thread_runs(thread_id):
+                await self._cancel_run(current, "resubmit")
+
+        run = Run(thread_id, session_id=session_id, on_cancel=on_cancel, metadata=metadata or {})
+        self._queues.setdefault(thread_id, deque()).append(run)
+        run.task = asyncio.create_task(self._execute(run, events))
+        return run
+
+    async def subscribe(self, run: Run, *, session_id: str | None = None) -> AsyncIterator[Any]:
+        """Yield the items of ``run`` from its start, then the new ones until its end."""
+        token = session_id if session_id is not None else object()
+        run.subscribers.add(token)
+        index = 0
+        try:
+            while True:
+                async with run.changed:
+                    await run.changed.wait_for(lambda: len(run.items) > index or run.finished)
+                    batch = run.items[index:]
+                    finished = run.finished
+                for item in batch:
+                    yield item
+                index += len(batch)
+                if finished and index == len(run.items):
+                    break
+        finally:
+            run.subscribers.discard(token)
+            if not run.subscribers and not run.finished:
+                # the last client went away (closed SSE connection, cancelled Gradio event)
+                await self._orphaned(run)
+
+        if run.error is not None:
+            raise run.error
+
+    async def _execute(self, run: Run, events: AsyncIterator[Any]) -> None:
+        thread_id = run.thread_id
+        lock = self._locks.setdefault(thread_id, asyncio.Lock())
+        self._waiting[thread_id] = self._waiting.get(thread_id, 0) + 1
+        try:
+            async with lock:
+                # the previous run of the thread is over: this one becomes the active run
+                self._dequeue(run)
+                self._runs[thread_id] = run
+                async with run_slot():
+                    self.started += 1
+                    async for item in events:
+                        async with run.changed:
+                            run.items.append(item)
+                            run.changed.notify_all()
+            self.completed += 1
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.failed += 1
+            run.error = e
+        finally:
+            self._waiting[thread_id] -= 1
+            if self._waiting[thread_id] == 0:
+                del self._waiting[thread_id]
+                del self._locks[thread_id]
+            self._dequeue(run)
+            if self._runs.get(thread_id) is run:
+                del self._runs[thread_id]
+            async with run.changed:
+                run.finished = True
+                run.changed.notify_all()
+
+    async def _orphaned(self, run: Run) -> None:
+        if self.detach_grace_seconds <= 0:
+            await self._cancel_run(run, "disconnect")
+            return
+
+        async def cancel_later():
+            await asyncio.sleep(self.detach_grace_seconds)
+            if not run.subscribers:
+                await self._cancel_run(run, "disconnect")
+
+        logger.info("run of thread %s detached, cancelled in %s s without client", run.thread_id, self.detach_grace_seconds)
+        timer = asyncio.create_task(cancel_later())
+        self._timers.add(timer)
+        timer.add_done_callback(self._timers.discard)
+
+    async def _cancel_run(self, run: Run, reason: str) -> bool:
+        if run.task is None or run.task.done() or run.cancel_reason is not None:
+            return False
+        run.cancel_reason = reason
+        run.task.cancel()
+        await asyncio.gather(run.task, return_exceptions=True)
+        if not run.finished:
+            # cancelled before its task started: _execute() did not clean up
+            self._dequeue(run)
+            async with run.changed:
+                run.finished = True
+                run.changed.notify_all()
+        self.cancelled[reason] += 1
+        logger.info("run of thread %s cancelled (%s)", run.thread_id, reason)
+        if run.on_cancel is not None:
+            try:
+                await run.on_cancel(run.thread_id)
+            except Exception as e:
+                logger.warning("on_cancel(%s) failed: %s", run.thread_id, e)
+        return True
+
+    def _thread_runs(self, thread_id: str) -> list[Run]:
+        """Queued runs of ``thread_id`` (last submitted first), then its active run.
+
+        Cancelled in this order, a queued run cannot take the lock released by the active run.
+        """
+        runs = list(reversed(self._queues.get(thread_id, ())))
+        return runs + ([self._runs[thread_id]] if thread_id in self._runs else [])
+
+    def _dequeue(self, run: Run) -> None:
+        queue = self._queues.get(run.thread_id)
+        if queue is not None and run in queue:
+            queue.remove(run)
+            if not queue:
+                del self._queues[run.thread_id]
+
+    async def cancel(self, thread_id: str, reason: str) -> bool:
+        """Cancel the runs of ``thread_id`` (active and queued, if any) and wait for them to stop."""
+        cancelled = False
+        for run in self._thread_runs(thread_id):
+            cancelled = await self._cancel_run(run, reason) or cancelled
+        return cancelled
+
+    async def detach_session(self, session_id: str) -> None:
+        """Forget a closed (Gradio) session: its runs are cancelled if no other client follows them."""
+        runs = list(self._runs.values()) + [run for queue in self._queues.values() for run in queue]
+        for run in runs:
+            if session_id in run.subscribers:
+                run.subscribers.discard(session_id)
+                if not run.subscribers:
+                    await self._orphaned(run)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": len(self._runs),
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "started": self.started,
+            "completed": self.completed,
+            "failed": self.failed,
+            "attached": self.attached,
+            "cancelled": dict(self.cancelled),
+        }
+
+
+async def repair_dangling_tool_calls(graph: CompiledStateGraph, thread_id: str) -> None:
+    """Answer the tool calls left without result by a cancelled run.
+
+    Models reject a history where an AI message with tool calls is not followed
+    by the matching tool messages, so the thread could not be continued.
+    """
+    config = {"configurable": {"thread_id": thread_id}}
+    state = await graph.aget_state(config)
+    messages = state.values.get("messages", [])
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], AIMessage):
+            break
+    else:
+        return
+    answered = {m.tool_call_id for m in messages[index + 1:] if isinstance(m, ToolMessage)}
+    missing = [
+        ToolMessage(
+            content="Appel annulé : la demande a été interrompue avant la fin de l'outil.",
+            tool_call_id=tool_call["id"],
+            name=tool_call["name"],
+            status="error",
+        )
+        for tool_call in messages[index].tool_calls
+        if tool_call["id"] not in answered
+    ]
+    if missing:
+        logger.info("repair_dangling_tool_calls(%s): %s tool call(s) cancelled", thread_id, len(missing))
+        await graph.aupdate_state(config, {"messages": missing}, as_node="tools")
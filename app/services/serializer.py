@@ -0,0 +1,79 @@
+"""Sérialisation compressée des checkpoints LangGraph."""
+import zlib
+from typing import Any
+
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+CODECS = ("none", "zlib", "zstd")
+# level 1 for zlib, 3 for zstd: most of the size gain at a fraction of the cost of higher levels (see benchmarks)
+DEFAULT_LEVELS = {"zlib": 1, "zstd": 3}
+LEVELS = {"zlib": range(-1, 10), "zstd": range(1, 23)}
+
+
+class CompressedSerializer(SerializerProtocol):
+    """Compress serialized checkpoint values above a size threshold.
+
+    Like ``EncryptedSerializer``, the codec is appended to the stored type
+    (``msgpack+zstd``), so values written without compression (including
+    checkpoints written before this serializer was enabled) are still read.
+    With ``codec="none"``, nothing is compressed but compressed values are
+    still read (compression can be turned off without losing threads).
+
+    ``level`` is the compression level of the codec: -1 to 9 for zlib, 1 to 22
+    for zstd (``DEFAULT_LEVELS`` if not set, ignored with ``codec="none"``).
+    """
+
+    def __init__(
+        self,
+        codec: str = "zstd",
+        threshold: int = 1024,
+        level: int | None = None,
+        serde: SerializerProtocol | None = None,
+    ):
+        if codec not in CODECS:
+            raise ValueError(f"Invalid codec: {codec} (expected one of {CODECS})")
+        if codec == "zstd" and zstandard is None:
+            raise ImportError("zstandard is not installed. Please install the zstd extra: `uv sync --extra zstd`.")
+        if codec != "none":
+            level = DEFAULT_LEVELS[codec] if level is None else level
+            if level not in LEVELS[codec]:
+                raise ValueError(f"Invalid {codec} compression level: {level}")
+        self.codec = codec
+        self.threshold = threshold
+        self.level = level
+        self.serde = serde or JsonPlusSerializer()
+        if codec == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=level)
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return self._compressor.compress(data)
+        return zlib.compress(data, self.level)
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        typ, data = self.serde.dumps_typed(obj)
+        if self.codec == "none" or len(data) < self.threshold:
+            return typ, data
+        return f"{typ}+{self.codec}", self._compress(data)
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        typ, payload = data
+        if "+" not in typ:
+            return self.serde.loads_typed(data)
+        typ, codec = typ.rsplit("+", 1)
+        if codec == "zstd":
+            if zstandard is None:
+                raise ImportError("zstandard is required to read zstd compressed checkpoints")
+            payload = zstandard.ZstdDecompressor().decompress(payload)
+        elif codec == "zlib":
+            payload = zlib.decompress(payload)
+        else:
+            raise NotImplementedError(f"Unknown checkpoint compression: {codec}")
+        return self.serde.loads_typed((typ, payload))
+
@@ -0,0 +1,170 @@
+"""Fichiers statiques avec empreinte de contenu, variantes précompressées (brotli / gzip) et cache immuable."""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+import stat
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # optional dependency (gzip only)
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+COMPRESSIBLE_EXTENSIONS = (".js", ".css", ".map", ".svg", ".html", ".json", ".txt")
+# (Accept-Encoding token, file suffix) by order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+HASH_LENGTH = 10
+IMMUTABLE = "public, max-age=31536000, immutable"
+# unhashed URLs: always revalidated (ETag / Last-Modified)
+REVALIDATE = "no-cache"
+
+_HASHED_NAME = re.compile(rf"^(?P<stem>.+)\.(?P<hash>[0-9a-f]{{{HASH_LENGTH}}})(?P<ext>\.[^./]+)$")
+
+
+def content_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 16), b""):
+            digest.update(block)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+
+def hashed_name(path: str, digest: str) -> str:
+    """``demo-geocontext.min.js`` -> ``demo-geocontext.min.<hash>.js``"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{digest}{ext}"
+
+
+def _is_variant(name: str) -> bool:
+    return name.endswith(tuple(suffix for _, suffix in ENCODINGS))
+
+
+def precompress_directory(directory: str) -> int:
+    """Write the ``.br`` (if brotli is installed) and ``.gz`` variants of the compressible files.
+
+    Up-to-date variants are kept. Returns the number of files written.
+    """
+    written = 0
+    for root, _dirs, files in os.walk(directory):
+        for name in files:
+            if _is_variant(name) or not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            mtime = os.stat(path).st_mtime
+            data = None
+            for encoding, suffix in ENCODINGS:
+                if encoding == "br" and brotli is None:
+                    continue
+                variant = path + suffix
+                if os.path.exists(variant) and os.stat(variant).st_mtime >= mtime:
+                    continue
+                if data is None:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                if encoding == "br":
+                    compressed = brotli.compress(data, quality=11)
+                else:
+                    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                if len(compressed) >= len(data):
+                    continue
+                with open(variant, "wb") as f:
+                    f.write(compressed)
+                written += 1
+    return written
+
+
+class HashedStaticFiles(StaticFiles):
+    """``StaticFiles`` serving content-hashed URLs and precompressed variants.
+
+    The files are hashed when the application starts: ``url(path)`` returns
+    ``<prefix>/<name>.<hash>.<ext>``, served with ``Cache-Control: immutable``
+    (a new version has a new URL, no more manual version bump). The plain names
+    are still served, with ``Cache-Control: no-cache`` (revalidated with their
+    ETag). A ``.br`` or ``.gz`` variant is served instead of a file when the
+    client accepts it; with ``precompress=True``, missing variants are written
+    at startup (if the directory is writable).
+    """
+
+    def __init__(self, *, directory: str, prefix: str, precompress: bool = True, **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.prefix = prefix.rstrip("/")
+        if precompress:
+            try:
+                written = precompress_directory(directory)
+                if written:
+                    logger.info("%s: %s precompressed file(s) written", directory, written)
+            except OSError as e:
+                logger.warning("%s: precompressed files not written (%s)", directory, e)
+        self.hashes: dict[str, str] = {}
+        for root, _dirs, files in os.walk(directory):
+            for name in files:
+                if _is_variant(name):
+                    continue
+                path = os.path.relpath(os.path.join(root, name), directory).replace(os.sep, "/")
+                self.hashes[path] = content_hash(os.path.join(root, name))
+
+    def url(self, path: str) -> str:
+        """Content-hashed URL of ``path`` (relative to the directory)."""
+        digest = self.hashes.get(path)
+        if digest is None:
+            raise KeyError(f"{path} not found in {self.directory}")
+        return f"{self.prefix}/{hashed_name(path, digest)}"
+
+    def _resolve(self, path: str) -> tuple[str, bool]:
+        """Real path of a requested path and whether it is the current hashed URL."""
+        match = _HASHED_NAME.match(path)
+        if match is not None:
+            original = match.group("stem") + match.group("ext")
+            if original in self.hashes:
+                return original, self.hashes[original] == match.group("hash")
+        return path, False
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        if scope["method"] not in ("GET", "HEAD"):
+            raise HTTPException(status_code=405, headers={"Allow": "GET, HEAD"})
+        path, immutable = self._resolve(path.replace(os.sep, "/"))
+        try:
+            response = await self._variant_response(path, scope)
+        except (OSError, ValueError):
+            response = None
+        if response is None:
+            response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            if path.endswith(COMPRESSIBLE_EXTENSIONS):
+                response.headers["Vary"] = "Accept-Encoding"
+            # an outdated hash (page cached during a deployment) gets the current file, revalidated
+            response.headers["Cache-Control"] = IMMUTABLE if immutable else REVALIDATE
+        return response
+
+    async def _variant_response(self, path: str, scope: Scope) -> Response | None:
+        if _is_variant(path) or not path.endswith(COMPRESSIBLE_EXTENSIONS):
+            return None
+        request_headers = Headers(scope=scope)
+        accepted = {
+            token.split(";")[0].strip()
+            for token in request_headers.get("accept-encoding", "").lower().split(",")
+        }
+        media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        for encoding, suffix in ENCODINGS:
+            if encoding not in accepted:
+                continue
+            full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path + suffix)
+            if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+                continue
+            response = FileResponse(full_path, stat_result=stat_result, media_type=media_type)
+            response.headers["Content-Encoding"] = encoding
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+        return None
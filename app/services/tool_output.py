@@ -0,0 +1,207 @@
+"""Réduction des résultats GeoJSON des outils avant leur transmission au modèle."""
+import json
+import logging
+import re
+from typing import Any, Awaitable, Callable
+
+from langchain.agents.middleware import AgentMiddleware, ToolCallRequest
+from langchain_core.messages import ToolMessage
+from langgraph.types import Command
+
+logger = logging.getLogger(__name__)
+
+ToolHandler = Callable[[ToolCallRequest], Awaitable[ToolMessage | Command[Any]]]
+
+# property names used for the geometry by the WFS services of the Géoplateforme and GeoServer
+GEOMETRY_NAMES = ("geometry", "geometrie", "geom", "the_geom", "wkb_geometry")
+
+# key of the ToolMessage artifact holding the output before trimming
+UNTRIMMED_KEY = "untrimmed_content"
+
+
+def untrimmed_content(message: ToolMessage) -> str | None:
+    """Tool output as returned by the tool if ``GeoJsonTrimMiddleware`` trimmed it, None otherwise."""
+    artifact = getattr(message, "artifact", None)
+    if isinstance(artifact, dict):
+        return artifact.get(UNTRIMMED_KEY)
+    return None
+
+
+def _positions(coordinates: Any):
+    """Positions ``[x, y, ...]`` of nested GeoJSON coordinates."""
+    if not coordinates:
+        return
+    if isinstance(coordinates[0], (int, float)):
+        yield coordinates
+        return
+    for item in coordinates:
+        yield from _positions(item)
+
+
+def _geometry_positions(geometry: dict[str, Any]):
+    if geometry.get("type") == "GeometryCollection":
+        for item in geometry.get("geometries") or []:
+            yield from _geometry_positions(item)
+    else:
+        yield from _positions(geometry.get("coordinates"))
+
+
+def _round_coordinates(coordinates: Any, precision: int) -> Any:
+    if isinstance(coordinates, (int, float)):
+        return round(coordinates, precision)
+    return [_round_coordinates(item, precision) for item in coordinates]
+
+
+def round_geometry(geometry: dict[str, Any], precision: int) -> dict[str, Any]:
+    if geometry.get("type") == "GeometryCollection":
+        return {**geometry, "geometries": [round_geometry(g, precision) for g in geometry.get("geometries") or []]}
+    if "coordinates" not in geometry:
+        return geometry
+    return {**geometry, "coordinates": _round_coordinates(geometry["coordinates"], precision)}
+
+
+def summarize_geometry(geometry: dict[str, Any], precision: int) -> dict[str, Any] | None:
+    """Geometry type, bbox and centroid (mean of the vertices) of a geometry."""
+    positions = list(_geometry_positions(geometry))
+    if not positions:
+        return None
+    xs = [p[0] for p in positions]
+    ys = [p[1] for p in positions]
+    summary = {"type": geometry.get("type"), "vertices": len(positions)}
+    if len(positions) == 1:
+        summary["coordinates"] = [round(xs[0], precision), round(ys[0], precision)]
+    else:
+        summary["bbox"] = [round(v, precision) for v in (min(xs), min(ys), max(xs), max(ys))]
+        summary["centroid"] = [round(sum(xs) / len(xs), precision), round(sum(ys) / len(ys), precision)]
+    return summary
+
+
+def wants_geometry(args: dict[str, Any]) -> bool:
+    """True if a tool argument explicitly names the geometry (e.g. ``property_names: "nom,geometrie"``)."""
+    for value in args.values():
+        values = value if isinstance(value, list) else [value]
+        for item in values:
+            if isinstance(item, str) and any(name in GEOMETRY_NAMES for name in re.split(r"[\s,;]+", item.lower())):
+                return True
+    return False
+
+
+class GeoJsonTrimMiddleware(AgentMiddleware):
+    """Shrink the GeoJSON FeatureCollections returned by tools before the model reads them.
+
+    For the tools in ``tools``, a FeatureCollection output is reduced to its
+    first ``max_features`` features, to the ``properties`` listed (all of them
+    if empty, without null values and with long values shortened), with
+    coordinates rounded to ``precision`` decimals. Geometries are replaced by a
+    summary (type, bbox, centroid) unless ``keep_geometry`` is set or the tool
+    call explicitly names the geometry. Other outputs (errors, ``hits`` or
+    ``request`` result types) are left as is.
+
+    The untouched output is kept in the ToolMessage artifact (see
+    ``untrimmed_content``), which is stored in the checkpoint and rendered by
+    the UI but not sent to the model.
+    """
+
+    def __init__(
+        self,
+        tools: set[str],
+        *,
+        max_features: int = 20,
+        properties: list[str] | None = None,
+        max_value_chars: int = 200,
+        precision: int = 5,
+        keep_geometry: bool = False,
+    ):
+        self.tools = tools
+        self.max_features = max_features
+        self.properties = properties or []
+        self.max_value_chars = max_value_chars
+        self.precision = precision
+        self.keep_geometry = keep_geometry
+        self.trimmed = 0
+        self.chars_before = 0
+        self.chars_after = 0
+
+    def _project(self, properties: dict[str, Any] | None) -> dict[str, Any]:
+        if not properties:
+            return {}
+        names = self.properties or list(properties)
+        projected = {}
+        for name in names:
+            value = properties.get(name)
+            if value is None or value == "":
+                continue
+            if isinstance(value, str) and len(value) > self.max_value_chars:
+                value = value[: self.max_value_chars] + "…"
+            projected[name] = value
+        return projected
+
+    def _feature(self, feature: dict[str, Any], keep_geometry: bool) -> dict[str, Any]:
+        trimmed = {"type": "Feature"}
+        if feature.get("id") is not None:
+            trimmed["id"] = feature["id"]
+        trimmed["properties"] = self._project(feature.get("properties"))
+        geometry = feature.get("geometry")
+        if not geometry:
+            trimmed["geometry"] = None
+        elif keep_geometry:
+            trimmed["geometry"] = round_geometry(geometry, self.precision)
+        else:
+            trimmed["geometry"] = None
+            trimmed["geometry_summary"] = summarize_geometry(geometry, self.precision)
+        return trimmed
+
+    def trim(self, collection: dict[str, Any], *, keep_geometry: bool = False) -> dict[str, Any]:
+        """Trimmed copy of a FeatureCollection."""
+        features = collection.get("features") or []
+        kept = features[: self.max_features] if self.max_features > 0 else features
+        trimmed = {key: value for key, value in collection.items() if key not in ("features", "crs")}
+        trimmed["features"] = [self._feature(feature, keep_geometry) for feature in kept]
+        if len(kept) < len(features):
+            trimmed["trimmed"] = {
+                "features_returned": len(features),
+                "features_kept": len(kept),
+                "note": "Résultat tronqué : affine la requête (filtre, emprise) ou utilise create_map pour afficher l'ensemble.",
+            }
+        if not keep_geometry:
+            positions = [p for feature in features if feature.get("geometry") for p in _geometry_positions(feature["geometry"])]
+            if positions:
+                trimmed["bbox"] = [
+                    round(v, self.precision)
+                    for v in (
+                        min(p[0] for p in positions),
+                        min(p[1] for p in positions),
+                        max(p[0] for p in positions),
+                        max(p[1] for p in positions),
+                    )
+                ]
+        return trimmed
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: ToolHandler,
+    ) -> ToolMessage | Command[Any]:
+        result = await handler(request)
+        tool_name = request.tool_call["name"]
+        if tool_name not in self.tools or not isinstance(result, ToolMessage) or result.status == "error":
+            return result
+
+        text = result.text
+        try:
+            collection = json.loads(text)
+        except (json.JSONDecodeError, TypeError):
+            return result
+        if not isinstance(collection, dict) or collection.get("type") != "FeatureCollection":
+            return result
+
+        keep_geometry = self.keep_geometry or wants_geometry(request.tool_call.get("args") or {})
+        content = json.dumps(self.trim(collection, keep_geometry=keep_geometry), ensure_ascii=False, separators=(",", ":"))
+        self.trimmed += 1
+        self.chars_before += len(text)
+        self.chars_after += len(content)
+        logger.info("%s output trimmed from %s to %s chars", tool_name, len(text), len(content))
+
+        artifact = dict(result.artifact) if isinstance(result.artifact, dict) else {}
+        artifact[UNTRIMMED_KEY] = text
+        return result.model_copy(update={"content": content, "artifact": artifact})
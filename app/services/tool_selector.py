@@ -0,0 +1,182 @@
+"""Sélection par tour des outils exposés au modèle (recherche locale sur les noms et descriptions)."""
+import json
+import logging
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Any, Awaitable, Callable
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest, ModelResponse
+from langchain_core.messages import AIMessage, AnyMessage
+from langchain_core.tools import BaseTool
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from .model_router import last_human_message
+
+logger = logging.getLogger(__name__)
+
+ModelHandler = Callable[[ModelRequest], Awaitable[ModelResponse]]
+
+# selector of the agent (see get_tool_selection_stats)
+_selector: "ToolSelectorMiddleware | None" = None
+
+STOPWORDS = frozenset(
+    "les des une un le la de du et en au aux pour par sur dans avec est sont que qui quoi quel quelle "
+    "quels quelles ou ce cette ces mon ma mes ton ta tes son sa ses il elle ils elles je tu nous vous "
+    "moi the and for with from this that are get set".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase words without accents, split on ``_`` and punctuation, stop words removed."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [token for token in re.split(r"[^a-z0-9]+", text) if len(token) > 1 and token not in STOPWORDS]
+
+
+def _stem(token: str) -> str:
+    # plural forms ("communes", "bâtiments") match the singular of the descriptions
+    return token[:-1] if len(token) > 3 and token.endswith(("s", "x")) else token
+
+
+def tool_text(tool: BaseTool) -> str:
+    """Text indexed for a tool: its name (twice, it is the most specific), description and argument names."""
+    schema = tool.args_schema if isinstance(tool.args_schema, dict) else tool.get_input_schema().model_json_schema()
+    properties = schema.get("properties", {})
+    descriptions = " ".join(str(p.get("description", "")) for p in properties.values() if isinstance(p, dict))
+    return " ".join([tool.name, tool.name, tool.description or "", " ".join(properties), descriptions])
+
+
+def schema_size(tool: BaseTool | dict[str, Any]) -> int:
+    """Size (in characters) of the JSON schema sent to the model for a tool."""
+    schema = tool if isinstance(tool, dict) else convert_to_openai_tool(tool)
+    return len(json.dumps(schema, ensure_ascii=False, default=str))
+
+
+def messages_size(messages: list[AnyMessage]) -> int:
+    return sum(len(message.text) + len(json.dumps(getattr(message, "tool_calls", []), default=str)) for message in messages)
+
+
+class TextIndex:
+    """BM25 index over named documents (built once, searched in-process)."""
+
+    def __init__(self, names: list[str], texts: list[str], k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.names = names
+        self._terms = [Counter(_stem(token) for token in tokenize(text)) for text in texts]
+        self._lengths = [sum(terms.values()) for terms in self._terms]
+        self._average_length = sum(self._lengths) / len(self._lengths) if names else 0
+        document_frequency = Counter(term for terms in self._terms for term in terms)
+        count = len(names)
+        self._idf = {
+            term: math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def scores(self, query: str) -> dict[str, float]:
+        terms = [_stem(token) for token in tokenize(query)]
+        scores = {}
+        for name, tool_terms, length in zip(self.names, self._terms, self._lengths):
+            score = 0.0
+            for term in terms:
+                frequency = tool_terms.get(term, 0)
+                if frequency:
+                    norm = self.k1 * (1 - self.b + self.b * length / self._average_length)
+                    score += self._idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            scores[name] = score
+        return scores
+
+    def search(self, query: str, top_k: int) -> list[str]:
+        """Names of the ``top_k`` best matching documents (with a positive score)."""
+        ranked = sorted(self.scores(query).items(), key=lambda item: -item[1])
+        return [name for name, score in ranked[:top_k] if score > 0]
+
+
+class ToolIndex(TextIndex):
+    """BM25 index over the tool names, descriptions and argument names (built once at startup)."""
+
+    def __init__(self, tools: list[BaseTool], k1: float = 1.2, b: float = 0.75):
+        super().__init__([tool.name for tool in tools], [tool_text(tool) for tool in tools], k1=k1, b=b)
+
+
+class ToolSelectorMiddleware(AgentMiddleware):
+    """Expose to the model only the tools relevant to the current turn.
+
+    The tools are ranked against the last user message with a local BM25
+    index; the ``top_k`` best ones are kept along with the ``core_tools`` and
+    the tools already called during the turn. When nothing matches, all the
+    tools are kept. The size of the prompt with and without the selection is
+    logged and accumulated (see ``stats()``, exposed on /health/tools).
+    """
+
+    def __init__(self, tools: list[BaseTool], *, top_k: int = 5, core_tools: set[str] | None = None):
+        self.index = ToolIndex(tools)
+        self.top_k = top_k
+        self.core_tools = core_tools or set()
+        self._schema_sizes = {tool.name: schema_size(tool) for tool in tools}
+        self.calls = 0
+        self.chars_without = 0
+        self.chars_with = 0
+        global _selector
+        _selector = self
+
+    def select(self, messages: list[AnyMessage], tool_names: list[str]) -> set[str] | None:
+        """Names of the tools to expose (None to keep all of them)."""
+        message = last_human_message(messages)
+        if message is None:
+            return None
+        selected = set(self.index.search(message.text, self.top_k))
+        if not selected:
+            return None
+        selected |= self.core_tools
+        # tools called since the last user message (the model may call them again)
+        for previous in reversed(messages):
+            if previous is message:
+                break
+            if isinstance(previous, AIMessage):
+                selected |= {tool_call["name"] for tool_call in previous.tool_calls}
+        return {name for name in tool_names if name in selected}
+
+    def _tools_size(self, tools: list[BaseTool | dict[str, Any]]) -> int:
+        return sum(
+            self._schema_sizes[tool.name] if isinstance(tool, BaseTool) and tool.name in self._schema_sizes else schema_size(tool)
+            for tool in tools
+        )
+
+    async def awrap_model_call(self, request: ModelRequest, handler: ModelHandler) -> ModelResponse:
+        tools = request.tools or []
+        names = [tool.name if isinstance(tool, BaseTool) else tool.get("name", "") for tool in tools]
+        selected = self.select(request.messages, names)
+        if selected is not None:
+            kept = [tool for tool, name in zip(tools, names) if name in selected]
+        else:
+            kept = tools
+
+        base = messages_size(request.messages) + len(request.system_prompt or "")
+        without, with_selection = base + self._tools_size(tools), base + self._tools_size(kept)
+        self.calls += 1
+        self.chars_without += without
+        self.chars_with += with_selection
+        logger.info(
+            "tool selection: %s/%s tools %s, prompt %s chars (%s without selection)",
+            len(kept), len(tools), sorted(selected) if selected is not None else "(all)", with_selection, without,
+        )
+        if kept is tools:
+            return await handler(request)
+        return await handler(request.override(tools=kept))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "tools": len(self._schema_sizes),
+            "top_k": self.top_k,
+            "model_calls": self.calls,
+            "prompt_chars_without_selection": self.chars_without,
+            "prompt_chars_with_selection": self.chars_with,
+        }
+
+
+def get_tool_selection_stats() -> dict[str, Any] | None:
+    """Statistics of the tool selection of the agent (None if TOOL_SELECTION is disabled)."""
+    return _selector.stats() if _selector is not None else None
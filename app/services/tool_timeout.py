@@ -0,0 +1,202 @@
+"""Délais d'expiration et requêtes « hedgées » pour les appels d'outils MCP."""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable
+
+from langchain.agents.middleware import AgentMiddleware, ToolCallRequest
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import BaseTool, ToolException
+from langgraph.types import Command
+
+logger = logging.getLogger(__name__)
+
+ToolHandler = Callable[[ToolCallRequest], Awaitable[ToolMessage | Command[Any]]]
+
+# True in the duplicate request of a hedged call (sent to the warm spare by McpSupervisor)
+hedged_request: ContextVar[bool] = ContextVar("hedged_request", default=False)
+
+
+class LatencyTracker:
+    """Sliding window of successful tool call durations, per tool name."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: dict[str, deque[float]] = {}
+
+    def record(self, tool_name: str, seconds: float) -> None:
+        samples = self._samples.setdefault(tool_name, deque(maxlen=self.window))
+        samples.append(seconds)
+
+    def count(self, tool_name: str) -> int:
+        return len(self._samples.get(tool_name, ()))
+
+    def percentile(self, tool_name: str, q: float) -> float | None:
+        """Nearest-rank percentile (``q`` in [0, 100]) or None without samples."""
+        samples = self._samples.get(tool_name)
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        rank = max(1, math.ceil(q / 100 * len(ordered)))
+        return ordered[rank - 1]
+
+
+def is_idempotent_read_only(tool: BaseTool) -> bool:
+    """True if the MCP server annotated the tool as read-only and idempotent."""
+    metadata = tool.metadata or {}
+    return bool(metadata.get("readOnlyHint")) and bool(metadata.get("idempotentHint"))
+
+
+class ToolTimeoutMiddleware(AgentMiddleware):
+    """Cancel tool calls exceeding their deadline and optionally hedge slow ones.
+
+    On expiry, the call is cancelled (closing its MCP session) and a
+    ``ToolException`` is raised so that an outer ``ToolRetryMiddleware`` can turn
+    it into a recoverable message for the model (see ``format_tool_error``).
+
+    For hedged tools, once a call has been running longer than the configured
+    percentile of the tool's recent latencies, a duplicate call is started and
+    the first answer wins. ``langchain-mcp-adapters`` opens a new session for
+    each call, so the duplicate runs on a second session. With the MCP
+    supervisor, the duplicate is flagged with ``hedged_request`` and sent to the
+    warm spare of the server (``get_agent`` disables hedging without spare).
+    """
+
+    def __init__(
+        self,
+        *,
+        default_timeout: float | None = None,
+        server_timeouts: dict[str, float] | None = None,
+        tool_timeouts: dict[str, float] | None = None,
+        tool_servers: dict[str, str] | None = None,
+        hedged_tools: set[str] | None = None,
+        hedge_percentile: float = 95.0,
+        hedge_min_samples: int = 20,
+        latencies: LatencyTracker | None = None,
+    ):
+        super().__init__()
+        self.default_timeout = default_timeout
+        self.server_timeouts = server_timeouts or {}
+        self.tool_timeouts = tool_timeouts or {}
+        self.tool_servers = tool_servers or {}
+        self.hedged_tools = hedged_tools or set()
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = latencies or LatencyTracker()
+
+    @classmethod
+    def from_config(
+        cls, config: dict[str, Any], tools_by_server: dict[str, list[BaseTool]]
+    ) -> "ToolTimeoutMiddleware":
+        """Build the middleware from ``get_tool_timeouts_config()`` and the loaded tools."""
+        tool_servers = {
+            tool.name: server_name
+            for server_name, tools in tools_by_server.items()
+            for tool in tools
+        }
+
+        hedging = config.get("hedging", {})
+        hedged_tools: set[str] = set()
+        if hedging.get("enabled"):
+            if hedging.get("tools") is not None:
+                hedged_tools = set(hedging["tools"])
+            else:
+                hedged_tools = {
+                    tool.name
+                    for tools in tools_by_server.values()
+                    for tool in tools
+                    if is_idempotent_read_only(tool)
+                }
+            logger.info("Hedging enabled for tools: %s", sorted(hedged_tools))
+
+        return cls(
+            default_timeout=config.get("default"),
+            server_timeouts=config.get("servers"),
+            tool_timeouts=config.get("tools"),
+            tool_servers=tool_servers,
+            hedged_tools=hedged_tools,
+            hedge_percentile=float(hedging.get("percentile", 95.0)),
+            hedge_min_samples=int(hedging.get("min_samples", 20)),
+        )
+
+    def get_timeout(self, tool_name: str) -> float | None:
+        """Per-tool timeout, then per-server timeout, then the default one."""
+        if tool_name in self.tool_timeouts:
+            return self.tool_timeouts[tool_name]
+        server_name = self.tool_servers.get(tool_name)
+        if server_name in self.server_timeouts:
+            return self.server_timeouts[server_name]
+        return self.default_timeout
+
+    def get_hedge_delay(self, tool_name: str) -> float | None:
+        """Delay before sending a duplicate request (None to disable hedging)."""
+        if tool_name not in self.hedged_tools:
+            return None
+        if self.latencies.count(tool_name) < self.hedge_min_samples:
+            return None
+        return self.latencies.percentile(tool_name, self.hedge_percentile)
+
+    async def awrap_tool_call(
+        self,
+        request: ToolCallRequest,
+        handler: ToolHandler,
+    ) -> ToolMessage | Command[Any]:
+        tool_name = request.tool.name if request.tool else request.tool_call["name"]
+        timeout = self.get_timeout(tool_name)
+        hedge_delay = self.get_hedge_delay(tool_name)
+
+        try:
+            if hedge_delay is None:
+                return await asyncio.wait_for(self._timed(tool_name, handler, request), timeout)
+            return await asyncio.wait_for(
+                self._hedged(tool_name, handler, request, hedge_delay), timeout
+            )
+        except TimeoutError:
+            logger.warning("Tool %s cancelled after %ss timeout", tool_name, timeout)
+            raise ToolException(
+                f"L'outil '{tool_name}' n'a pas répondu dans le délai imparti ({timeout:g} s)."
+                " Essaie une requête plus ciblée (filtre, emprise ou nombre de résultats réduits)."
+            ) from None
+
+    async def _timed(
+        self, tool_name: str, handler: ToolHandler, request: ToolCallRequest, hedge: bool = False
+    ) -> ToolMessage | Command[Any]:
+        if hedge:
+            # own task: the flag doesn't leak to the primary request
+            hedged_request.set(True)
+        start = time.perf_counter()
+        result = await handler(request)
+        self.latencies.record(tool_name, time.perf_counter() - start)
+        return result
+
+    async def _hedged(
+        self,
+        tool_name: str,
+        handler: ToolHandler,
+        request: ToolCallRequest,
+        hedge_delay: float,
+    ) -> ToolMessage | Command[Any]:
+        primary = asyncio.create_task(self._timed(tool_name, handler, request))
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+            if not done:
+                logger.info("Tool %s slower than %.2fs, sending hedged request", tool_name, hedge_delay)
+                tasks.add(asyncio.create_task(self._timed(tool_name, handler, request, hedge=True)))
+
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                # Both attempts failed: surface the last failure
+                if not tasks:
+                    raise done.pop().exception()
+            raise RuntimeError("Unexpected: hedged call completed without result")
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,5 +1,11 @@
+import json
+
 from langchain_core.tools import tool
 
+from .config import MAP_EXTENT, WFS_CATALOG_MAX_AGE_DAYS
+from .services.catalog import get_catalog
+from .services.map_extent import data_extent, extent_view
+
 @tool
 def create_map(
     lon: float = None, lat: float = None, zoom: int = None,
@@ -26,6 +32,20 @@ def create_map(
     - L'outil prend en charge une seule couche de données GeoJSON (n'essaie pas de passer plusieurs URL dans un seul appel).
     - Ne jamais construire l'URL `geojson_url` manuellement. Toujours utiliser `gpf_wfs_get_features` avec `result_type: "request"` au préalable pour obtenir les informations nécessaires.
     """
+    # Emprise des données connue côté serveur (catalogue WFS) : la carte est centrée dès
+    # son affichage, sans attendre le téléchargement du GeoJSON par le navigateur
+    extent_attr = ""
+    if MAP_EXTENT and geojson_url and (lon is None or lat is None or zoom is None):
+        extent = data_extent(geojson_url)
+        if extent is not None:
+            # the view requested by the model wins, the extent is only used for the missing values
+            if lon is None and lat is None and zoom is None:
+                extent_attr = 'extent="{}"'.format(",".join(f"{value:.6f}" for value in extent))
+            extent_lon, extent_lat, extent_zoom = extent_view(extent)
+            lon = round(extent_lon, 6) if lon is None else lon
+            lat = round(extent_lat, 6) if lat is None else lat
+            zoom = extent_zoom if zoom is None else zoom
+
     # Construire les attributs optionnels
     lon_attr = f'lon="{lon}"' if lon is not None else ""
     lat_attr = f'lat="{lat}"' if lat is not None else ""
@@ -46,7 +66,33 @@ def create_map(
         background_greyscale_attr = f'background-greyscale=false'
     
     # Construire la liste des attributs non vides
-    attributes = [attr for attr in [lon_attr, lat_attr, zoom_attr, width_attr, height_attr, f'background="{background}"', data_url_attr, fit_bounds_attr, background_greyscale_attr] if attr]
+    attributes = [attr for attr in [lon_attr, lat_attr, zoom_attr, extent_attr, width_attr, height_attr, f'background="{background}"', data_url_attr, fit_bounds_attr, background_greyscale_attr] if attr]
     attributes_str = " ".join(attributes)
 
     return f"<ol-simple-map {attributes_str}></ol-simple-map>"
+
+
+@tool
+def search_feature_types(query: str, limit: int = 5) -> str:
+    """Recherche les types d'objets WFS de la Géoplateforme (typename, titre, attributs) dans un catalogue local.
+
+    À utiliser en premier pour trouver le `typename` et les noms des attributs à
+    passer à `gpf_wfs_get_features` (réponse immédiate, sans appel au service).
+
+    Paramètres :
+        query : mots-clés décrivant les données recherchées (ex : "limites des communes", "bâtiments hauteur")
+        limit : nombre maximal de types renvoyés (par défaut : 5)
+
+    Si le catalogue local est indisponible ou obsolète, utilise les outils de découverte
+    de la Géoplateforme (outils `gpf_*`) à la place.
+    """
+    catalog = get_catalog()
+    if catalog is None or catalog.is_stale(WFS_CATALOG_MAX_AGE_DAYS * 86400):
+        return (
+            "Le catalogue local des types d'objets est indisponible ou obsolète : "
+            "utilise les outils de la Géoplateforme (gpf_*) pour découvrir les types d'objets et leurs attributs."
+        )
+    results = catalog.search(query, max(1, min(limit, 20)))
+    if not results:
+        return "Aucun type d'objet ne correspond : reformule la recherche ou utilise les outils de la Géoplateforme (gpf_*)."
+    return json.dumps(results, ensure_ascii=False)
@@ -0,0 +1,107 @@
+"""Per-turn checkpoint latency of the memory, SQLite and PostgreSQL backends.
+
+Usage : uv run python -m benchmarks.checkpoint_backends [--threads 4] [--turns 10] [--postgres postgresql://...]
+
+Each turn appends a question, a GeoJSON tool output and an answer to a thread
+through a graph without model (only the checkpointer is measured). Threads run
+concurrently to show how each backend behaves with several users.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langgraph.graph import START, MessagesState, StateGraph
+
+import app.services.db as db_service
+from benchmarks.checkpoint_serializer import feature_collection
+
+
+def build_graph(checkpointer, n_features: int):
+    async def tool(state: MessagesState) -> dict:
+        return {"messages": [ToolMessage(content=feature_collection(n_features), tool_call_id="call")]}
+
+    async def answer(state: MessagesState) -> dict:
+        return {"messages": [AIMessage(content=f"{len(state['messages'])} messages")]}
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("tool", tool)
+    builder.add_node("answer", answer)
+    builder.add_edge(START, "tool")
+    builder.add_edge("tool", "answer")
+    return builder.compile(checkpointer=checkpointer)
+
+
+@asynccontextmanager
+async def database(db_uri: str):
+    # get_database() reads the module level DB_URI
+    db_service.DB_URI = db_uri
+    db_service._memory_checkpointer = None
+    async with db_service.get_database() as db:
+        yield db
+
+
+async def run_thread(graph, thread_id: str, turns: int) -> list[float]:
+    latencies = []
+    for turn in range(turns):
+        start = time.perf_counter()
+        await graph.ainvoke(
+            {"messages": [{"role": "user", "content": f"question {turn}"}]},
+            {"configurable": {"thread_id": thread_id}},
+        )
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def bench(name: str, db_uri: str, args) -> dict:
+    async with database(db_uri) as db:
+        graph = build_graph(db.checkpointer, args.features)
+        prefix = f"bench-{time.time_ns()}"
+        start = time.perf_counter()
+        results = await asyncio.gather(*[
+            run_thread(graph, f"{prefix}-{i}", args.turns) for i in range(args.threads)
+        ])
+        duration = time.perf_counter() - start
+        start = time.perf_counter()
+        n_threads = len(await db.list_thread_ids())
+        listing = time.perf_counter() - start
+
+    latencies = sorted(latency for result in results for latency in result)
+    return {
+        "backend": name,
+        "median_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        "turns_per_s": len(latencies) / duration,
+        "list_ms": listing * 1000,
+        "n_threads": n_threads,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=4, help="concurrent threads")
+    parser.add_argument("--turns", type=int, default=10, help="turns per thread")
+    parser.add_argument("--features", type=int, default=50, help="features per tool output")
+    parser.add_argument("--postgres", default=os.getenv("BENCH_POSTGRES_URI"), help="postgresql:// URI (skipped if empty)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        backends = [("memory", ""), ("sqlite", f"sqlite:///{tmpdir}/bench.db")]
+        if args.postgres:
+            backends.append(("postgres", args.postgres))
+        else:
+            print("(--postgres not set: postgres skipped)")
+        results = [await bench(name, db_uri, args) for name, db_uri in backends]
+
+    print(f"{args.threads} concurrent threads x {args.turns} turns, {args.features} features per tool output")
+    print(f"{'backend':<10} {'median (ms)':>12} {'p95 (ms)':>10} {'turns/s':>9} {'list threads (ms)':>18}")
+    for r in results:
+        print(f"{r['backend']:<10} {r['median_ms']:>12.2f} {r['p95_ms']:>10.2f} {r['turns_per_s']:>9.1f} {r['list_ms']:>18.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
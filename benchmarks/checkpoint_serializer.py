@@ -0,0 +1,103 @@
+"""Micro-benchmark of checkpoint serializers on a synthetic geocontext thread.
+
+Usage : uv run python -m benchmarks.checkpoint_serializer [--turns 10] [--features 200]
+
+The "messages" channel of a thread is what dominates checkpoint blobs: each
+turn holds a question, tool calls, GeoJSON tool outputs and a final answer with
+an ``<ol-simple-map>`` fragment. The whole list is (de)serialized on each turn.
+"""
+import argparse
+import json
+import random
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from app.services.serializer import CompressedSerializer, zstandard
+
+
+def feature_collection(n_features: int) -> str:
+    features = []
+    for i in range(n_features):
+        lon, lat = random.uniform(-5, 9), random.uniform(41, 51)
+        ring = [[lon + random.uniform(-0.01, 0.01), lat + random.uniform(-0.01, 0.01)] for _ in range(20)]
+        ring.append(ring[0])
+        features.append({
+            "type": "Feature",
+            "id": f"commune.{i}",
+            "geometry": {"type": "Polygon", "coordinates": [ring]},
+            "properties": {
+                "nom_officiel": f"Commune {i}",
+                "code_insee": f"{random.randint(1000, 99999):05d}",
+                "population": random.randint(50, 100000),
+                "date_creation": "2006-11-07 00:00:00",
+                "date_modification": "2024-01-10 12:34:56",
+            },
+        })
+    return json.dumps({"type": "FeatureCollection", "features": features}, ensure_ascii=False)
+
+
+def geocontext_thread(turns: int, n_features: int) -> list:
+    messages = []
+    for turn in range(turns):
+        call_id = f"call-{turn}"
+        messages.append(HumanMessage(content=f"Quelles sont les communes du département {turn + 1} ?"))
+        messages.append(AIMessage(content="", tool_calls=[{
+            "name": "gpf_wfs_get_features",
+            "args": {"typename": "ADMINEXPRESS-COG.LATEST:commune", "cql_filter": f"code_insee_du_departement='{turn + 1:02d}'"},
+            "id": call_id,
+        }]))
+        messages.append(ToolMessage(content=feature_collection(n_features), tool_call_id=call_id, name="gpf_wfs_get_features"))
+        messages.append(AIMessage(content=(
+            f"Le département compte {n_features} communes.\n"
+            f'<ol-simple-map lon="2.35" lat="48.85" zoom="8" width=500px height=500px background="osm"></ol-simple-map>'
+        )))
+    return messages
+
+
+def bench(name: str, serde, value, repeat: int) -> dict:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        typ, data = serde.dumps_typed(value)
+    encode = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        serde.loads_typed((typ, data))
+    decode = (time.perf_counter() - start) / repeat
+
+    return {"serializer": name, "type": typ, "size": len(data), "encode_ms": encode * 1000, "decode_ms": decode * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--features", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(0)
+    messages = geocontext_thread(args.turns, args.features)
+
+    serializers = [
+        ("default (msgpack)", JsonPlusSerializer()),
+        ("zlib level 1", CompressedSerializer(codec="zlib")),
+        ("zlib level 6", CompressedSerializer(codec="zlib", level=6)),
+    ]
+    if zstandard is not None:
+        serializers.append(("zstd level 3", CompressedSerializer(codec="zstd")))
+    else:
+        print("(zstandard is not installed: zstd skipped)")
+
+    results = [bench(name, serde, messages, args.repeat) for name, serde in serializers]
+    baseline = results[0]["size"]
+
+    print(f"thread: {args.turns} turns, {args.features} features per tool output, {len(messages)} messages")
+    print(f"{'serializer':<20} {'size (KiB)':>12} {'ratio':>7} {'encode (ms)':>12} {'decode (ms)':>12}")
+    for r in results:
+        print(f"{r['serializer']:<20} {r['size'] / 1024:>12.1f} {r['size'] / baseline:>7.2f} {r['encode_ms']:>12.2f} {r['decode_ms']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
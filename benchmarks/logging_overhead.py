@@ -0,0 +1,119 @@
+"""Per-message logging overhead on the event loop, before and after the queued JSON logging.
+
+Usage : uv run python -m benchmarks.logging_overhead [--messages 2000] [--features 50] [--sink-latency-ms 0.2]
+
+Replays the log calls made while a conversation is loaded and streamed (one
+per message, the prompt at INFO, a debug line with the content), at the INFO
+level:
+
+- before: eager f-strings (the content is formatted even though DEBUG is
+  disabled) and a ``StreamHandler`` writing from the calling thread;
+- after: %-style arguments, ``LazyQueueHandler`` and a ``QueueListener``
+  writing JSON lines from its own thread.
+
+``--sink-latency-ms`` simulates a slow stderr (e.g. a blocked log collector):
+the "before" path pays it on the event loop, the "after" path in the listener.
+"""
+import argparse
+import io
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.helpers.logs import ContextFilter, JsonFormatter, LazyQueueHandler
+
+
+class SlowStream(io.StringIO):
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+
+    def write(self, s: str) -> int:
+        if self.latency:
+            time.sleep(self.latency)
+        return super().write(s)
+
+
+def conversation(n_messages: int, n_features: int) -> list:
+    features = [
+        {"type": "Feature", "properties": {"nom": f"Commune {i}"}, "geometry": {"type": "Point", "coordinates": [random.uniform(-5, 9), random.uniform(41, 51)]}}
+        for i in range(n_features)
+    ]
+    geojson = json.dumps({"type": "FeatureCollection", "features": features})
+    messages = []
+    for i in range(n_messages):
+        if i % 3 == 0:
+            messages.append(HumanMessage(content=f"Quelles sont les communes du département {i % 95 + 1} ?"))
+        elif i % 3 == 1:
+            messages.append(ToolMessage(content=geojson, tool_call_id=f"call-{i}", name="gpf_wfs_get_features"))
+        else:
+            messages.append(AIMessage(content="Voici les communes demandées."))
+    return messages
+
+
+def before(logger: logging.Logger, thread_id: str, message) -> None:
+    logger.debug(f"Traitement message: type={getattr(message, 'type', 'unknown')}, content={getattr(message, 'content', 'no content')}")
+    logger.debug(f"to_gradio_message({type(message)} - {message.type})")
+    if message.type == "human":
+        logger.info(f"user({thread_id}, alice): {message.content}")
+
+
+def after(logger: logging.Logger, thread_id: str, message) -> None:
+    logger.debug("Traitement message: type=%s, id=%s", getattr(message, "type", "unknown"), getattr(message, "id", None))
+    logger.debug("to_gradio_message(%s - %s)", type(message).__name__, message.type)
+    if message.type == "human":
+        logger.info("user(%s, %s): %s chars", thread_id, "alice", len(message.content))
+
+
+def run(name: str, handler: logging.Handler, log, messages: list) -> float:
+    logger = logging.getLogger(f"benchmarks.logging.{name}")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    start = time.perf_counter()
+    for message in messages:
+        log(logger, "thread-0123456789abcdef", message)
+    return (time.perf_counter() - start) / len(messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--features", type=int, default=50)
+    parser.add_argument("--sink-latency-ms", type=float, default=0.2)
+    args = parser.parse_args()
+
+    random.seed(0)
+    messages = conversation(args.messages, args.features)
+    latency = args.sink_latency_ms / 1000
+
+    stream_handler = logging.StreamHandler(SlowStream(latency))
+    stream_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    before_seconds = run("before", stream_handler, before, messages)
+
+    json_handler = logging.StreamHandler(SlowStream(latency))
+    json_handler.setFormatter(JsonFormatter())
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(records)
+    queue_handler.addFilter(ContextFilter())
+    listener = logging.handlers.QueueListener(records, json_handler)
+    listener.start()
+    after_seconds = run("after", queue_handler, after, messages)
+    start = time.perf_counter()
+    listener.stop()
+    drain = time.perf_counter() - start
+
+    print(f"{args.messages} messages, {args.features} features per tool output, sink latency {args.sink_latency_ms} ms")
+    print(f"{'logging':<32} {'per message (us)':>18}")
+    print(f"{'before (f-strings, sync)':<32} {before_seconds * 1e6:>18.1f}")
+    print(f"{'after (lazy, queued JSON)':<32} {after_seconds * 1e6:>18.1f}")
+    print(f"(listener drained the remaining records in {drain * 1000:.0f} ms, off the event loop)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+/**
+ * Fetch the GeoJSON features of the maps (IndexedDB cache, shared requests).
+ *
+ * Kept free of OpenLayers imports: this module is bundled in the GeoJSON web worker.
+ */
+
+/**
+ * Features cache (IndexedDB) : size cap with LRU eviction and TTL
+ */
+const CACHE_DB_NAME = 'demo-geocontext-features';
+const CACHE_MAX_BYTES = 50 * 1024 * 1024;
+const CACHE_TTL_MS = 24 * 60 * 60 * 1000;
+
+interface CacheEntry {
+    key: string;
+    // approximate size (characters of the response)
+    size: number;
+    createdAt: number;
+    accessedAt: number;
+}
+
+interface FeatureRequest {
+    url: string;
+    init: RequestInit;
+    // cache key : normalized URL and request body
+    key: string;
+}
+
+const cacheStats = { hits: 0, misses: 0, deduplicated: 0, expired: 0, evicted: 0, errors: 0 };
+
+/**
+ * Cache statistics (also logged with console.debug on each lookup)
+ */
+export function getFeatureCacheStats() {
+    const lookups = cacheStats.hits + cacheStats.misses;
+    return { ...cacheStats, hitRatio: lookups ? cacheStats.hits / lookups : null };
+}
+
+function logCache(event: string, url: string) {
+    console.debug(`[feature-cache] ${event} ${url}`, getFeatureCacheStats());
+}
+
+/**
+ * Normalize a URL for the cache key (lowercase parameter names, sorted parameters)
+ */
+export function normalizeUrl(url: string): string {
+    const [base, query] = url.split('?', 2);
+    const params = [...new URLSearchParams(query ?? '')]
+        .map(([name, value]) => [name.toLowerCase(), value])
+        .sort((a, b) => a[0].localeCompare(b[0]) || a[1].localeCompare(b[1]));
+    return base + (params.length ? '?' + new URLSearchParams(params).toString() : '');
+}
+
+function promisify<T>(request: IDBRequest<T>): Promise<T> {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function transactionDone(transaction: IDBTransaction): Promise<void> {
+    return new Promise((resolve, reject) => {
+        transaction.oncomplete = () => resolve();
+        transaction.onerror = () => reject(transaction.error);
+        transaction.onabort = () => reject(transaction.error);
+    });
+}
+
+let cacheDB: Promise<IDBDatabase | null> | null = null;
+
+/**
+ * Open the cache database (null if IndexedDB is not available, e.g. some private modes)
+ */
+function openCacheDB(): Promise<IDBDatabase | null> {
+    if (!cacheDB) {
+        cacheDB = new Promise((resolve) => {
+            if (typeof indexedDB === 'undefined') {
+                resolve(null);
+                return;
+            }
+            const request = indexedDB.open(CACHE_DB_NAME, 1);
+            request.onupgradeneeded = () => {
+                const db = request.result;
+                // metadata and bodies are separated so that eviction doesn't read the bodies
+                db.createObjectStore('entries', { keyPath: 'key' }).createIndex('accessedAt', 'accessedAt');
+                db.createObjectStore('bodies');
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => {
+                console.warn('[feature-cache] IndexedDB not available', request.error);
+                resolve(null);
+            };
+        });
+    }
+    return cacheDB;
+}
+
+async function cacheGet(key: string): Promise<string | null> {
+    const db = await openCacheDB();
+    if (!db) return null;
+    const transaction = db.transaction(['entries', 'bodies'], 'readwrite');
+    const entries = transaction.objectStore('entries');
+    const entry: CacheEntry | undefined = await promisify(entries.get(key));
+    if (!entry) return null;
+    const now = Date.now();
+    if (now - entry.createdAt > CACHE_TTL_MS) {
+        cacheStats.expired++;
+        entries.delete(key);
+        transaction.objectStore('bodies').delete(key);
+        await transactionDone(transaction);
+        return null;
+    }
+    const body: string | undefined = await promisify(transaction.objectStore('bodies').get(key));
+    entries.put({ ...entry, accessedAt: now });
+    await transactionDone(transaction);
+    return body ?? null;
+}
+
+async function cachePut(key: string, body: string) {
+    const db = await openCacheDB();
+    if (!db || body.length > CACHE_MAX_BYTES) return;
+    const now = Date.now();
+    const transaction = db.transaction(['entries', 'bodies'], 'readwrite');
+    transaction.objectStore('entries').put({ key, size: body.length, createdAt: now, accessedAt: now } as CacheEntry);
+    transaction.objectStore('bodies').put(body, key);
+    await transactionDone(transaction);
+    await cacheEvict();
+}
+
+async function cacheDelete(key: string) {
+    const db = await openCacheDB();
+    if (!db) return;
+    const transaction = db.transaction(['entries', 'bodies'], 'readwrite');
+    transaction.objectStore('entries').delete(key);
+    transaction.objectStore('bodies').delete(key);
+    await transactionDone(transaction);
+}
+
+/**
+ * Remove the expired entries, then the least recently used ones above CACHE_MAX_BYTES
+ */
+async function cacheEvict() {
+    const db = await openCacheDB();
+    if (!db) return;
+    const transaction = db.transaction(['entries', 'bodies'], 'readwrite');
+    const entries = transaction.objectStore('entries');
+    const bodies = transaction.objectStore('bodies');
+    // oldest access first
+    const all: CacheEntry[] = await promisify(entries.index('accessedAt').getAll());
+    let total = all.reduce((sum, entry) => sum + entry.size, 0);
+    const now = Date.now();
+    for (const entry of all) {
+        const expired = now - entry.createdAt > CACHE_TTL_MS;
+        if (!expired && total <= CACHE_MAX_BYTES) continue;
+        entries.delete(entry.key);
+        bodies.delete(entry.key);
+        total -= entry.size;
+        if (expired) {
+            cacheStats.expired++;
+        } else {
+            cacheStats.evicted++;
+        }
+    }
+    await transactionDone(transaction);
+}
+
+async function fetchText(request: FeatureRequest, signal: AbortSignal): Promise<string> {
+    const response = await fetch(request.url, { ...request.init, signal });
+    if (!response.ok) {
+        throw new Error(`Failed to fetch features from ${request.url}: ${response.statusText}`);
+    }
+    return response.text();
+}
+
+/**
+ * Cached response, or fetched and stored (cache errors fall back to the network)
+ */
+async function cachedFeatures(request: FeatureRequest, signal: AbortSignal): Promise<any> {
+    let body: string | null = null;
+    try {
+        body = await cacheGet(request.key);
+    } catch (error) {
+        cacheStats.errors++;
+        console.warn('[feature-cache] read failed', error);
+    }
+    if (body !== null) {
+        try {
+            const features = JSON.parse(body);
+            cacheStats.hits++;
+            logCache('hit', request.url);
+            return features;
+        } catch (error) {
+            // corrupted entry: removed and fetched again (instead of failing until it expires)
+            cacheStats.errors++;
+            console.warn('[feature-cache] corrupted entry', request.url, error);
+            cacheDelete(request.key).catch((error) => {
+                console.warn('[feature-cache] delete failed', error);
+            });
+        }
+    }
+    cacheStats.misses++;
+    logCache('miss', request.url);
+    body = await fetchText(request, signal);
+    const features = JSON.parse(body);
+    cachePut(request.key, body).catch((error) => {
+        cacheStats.errors++;
+        console.warn('[feature-cache] write failed', error);
+    });
+    return features;
+}
+
+interface InflightRequest {
+    promise: Promise<any>;
+    controller: AbortController;
+    waiters: number;
+}
+
+// requests in progress, shared by the maps of the page (aborted when every map gave up)
+const inflight: Map<string, InflightRequest> = new Map();
+
+function getFeatures(request: FeatureRequest, signal?: AbortSignal): Promise<any> {
+    let shared = inflight.get(request.key);
+    if (shared) {
+        cacheStats.deduplicated++;
+        logCache('deduplicated', request.url);
+    } else {
+        const controller = new AbortController();
+        const promise = cachedFeatures(request, controller.signal).finally(() => inflight.delete(request.key));
+        shared = { promise, controller, waiters: 0 };
+        inflight.set(request.key, shared);
+    }
+    const current = shared;
+    current.waiters++;
+    return new Promise((resolve, reject) => {
+        const onAbort = () => {
+            current.waiters--;
+            if (current.waiters === 0) {
+                current.controller.abort();
+            }
+            reject(new DOMException('Aborted', 'AbortError'));
+        };
+        if (signal?.aborted) {
+            onAbort();
+            return;
+        }
+        signal?.addEventListener('abort', onAbort, { once: true });
+        current.promise.then(
+            (features) => {
+                signal?.removeEventListener('abort', onAbort);
+                resolve(features);
+            },
+            (error) => {
+                signal?.removeEventListener('abort', onAbort);
+                reject(error);
+            }
+        );
+    });
+}
+
+/**
+ * Hack to fetch GeoJSON features from Geoplateforme WFS using POST
+ * request with cql_filter to support large geometries (issue #57)
+ *
+ * @param url 
+ * @param signal to abort the request
+ */
+export async function getFeaturesFromGeoplateformeWFS(url: string, signal?: AbortSignal): Promise<any> {
+    const queryParams = new URLSearchParams(url.split('?')[1]);
+    const cqlFilter = queryParams.get('cql_filter') ?? queryParams.get('CQL_FILTER');
+    if ( cqlFilter ) {
+        // Use POST request with cql_filter in body to avoid too-long GET URLs (issue #57)
+        queryParams.delete('cql_filter');
+        queryParams.delete('CQL_FILTER');
+        const baseUrl = url.split('?')[0] + '?' + queryParams.toString();
+        const body = 'cql_filter=' + encodeURIComponent(cqlFilter);
+        return getFeatures({
+            url: baseUrl,
+            init: {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/x-www-form-urlencoded' },
+                body
+            },
+            key: 'POST ' + normalizeUrl(baseUrl) + '\n' + body
+        }, signal);
+    }
+    // If no cql_filter, fallback to GET request
+    return getFeatures({ url, init: {}, key: 'GET ' + normalizeUrl(url) }, signal);
+}
+
+/**
+ * Fetch GeoJSON features from a URL.
+ * Prepared for issue #57: turn GET into POST for cql_filter support with large geometries.
+ */
+export async function getFeatureFromURL(url: string, signal?: AbortSignal): Promise<any> {
+    if ( url.startsWith('https://data.geopf.fr/wfs') ) {
+        return getFeaturesFromGeoplateformeWFS(url, signal);
+    }
+
+    return getFeatures({ url, init: {}, key: 'GET ' + normalizeUrl(url) }, signal);
+}
@@ -0,0 +1,124 @@
+import Feature from 'ol/Feature';
+import GeoJSON from 'ol/format/GeoJSON';
+
+import GeoJsonWorker from './geojson-worker?worker&inline';
+import { getFeatureFromURL } from './features';
+
+/**
+ * Number of features added to a VectorSource at once
+ */
+export const CHUNK_SIZE = 500;
+
+export interface GeoJSONLoad {
+    /** resolved with the number of features once every chunk is delivered */
+    promise: Promise<number>;
+    /** stop the download and ignore the remaining chunks */
+    cancel: () => void;
+}
+
+type ChunkCallback = (features: Feature[]) => void;
+
+interface PendingLoad {
+    url: string;
+    projection: string;
+    onChunk: ChunkCallback;
+    resolve: (count: number) => void;
+    reject: (error: Error) => void;
+}
+
+const format = new GeoJSON();
+const pending = new Map<number, PendingLoad>();
+let nextId = 1;
+// undefined : not created yet, null : not available (fetched and parsed on the main thread)
+let worker: Worker | null | undefined;
+
+function onWorkerMessage(event: MessageEvent) {
+    const { type, id } = event.data;
+    const load = pending.get(id);
+    if (!load) return;
+    if (type === 'chunk') {
+        // already in the map projection
+        load.onChunk(format.readFeatures(
+            { type: 'FeatureCollection', features: event.data.features },
+            { dataProjection: load.projection, featureProjection: load.projection }
+        ) as Feature[]);
+    } else if (type === 'done') {
+        pending.delete(id);
+        load.resolve(event.data.count);
+    } else if (type === 'error') {
+        pending.delete(id);
+        load.reject(new Error(event.data.message));
+    }
+}
+
+function onWorkerError(event: ErrorEvent) {
+    // e.g. workers blocked by a Content-Security-Policy : continue on the main thread
+    console.warn('GeoJSON worker unavailable, loading on the main thread', event.message);
+    worker?.terminate();
+    worker = null;
+    const loads = [...pending.values()];
+    pending.clear();
+    for (const load of loads) {
+        loadOnMainThread(load.url, load.projection, load.onChunk).promise.then(load.resolve, load.reject);
+    }
+}
+
+function getWorker(): Worker | null {
+    if (worker === undefined) {
+        try {
+            worker = new GeoJsonWorker();
+            worker.onmessage = onWorkerMessage;
+            worker.onerror = onWorkerError;
+        } catch (error) {
+            console.warn('GeoJSON worker unavailable, loading on the main thread', error);
+            worker = null;
+        }
+    }
+    return worker;
+}
+
+/**
+ * Fetch and parse on the main thread, adding the features chunk by chunk
+ * (yielding to the browser between chunks).
+ */
+function loadOnMainThread(url: string, projection: string, onChunk: ChunkCallback): GeoJSONLoad {
+    const controller = new AbortController();
+    const promise = (async () => {
+        const geojson = await getFeatureFromURL(url, controller.signal);
+        const features = format.readFeatures(geojson, { featureProjection: projection }) as Feature[];
+        for (let start = 0; start < features.length; start += CHUNK_SIZE) {
+            if (controller.signal.aborted) break;
+            onChunk(features.slice(start, start + CHUNK_SIZE));
+            await new Promise((resolve) => setTimeout(resolve));
+        }
+        return features.length;
+    })();
+    return { promise, cancel: () => controller.abort() };
+}
+
+/**
+ * Load GeoJSON features from a URL in a Web Worker (shared by all the maps).
+ *
+ * @param url the GeoJSON URL (WGS84 coordinates)
+ * @param projection code of the map projection (ex : EPSG:3857)
+ * @param onChunk called with each chunk of features
+ */
+export function loadGeoJSON(url: string, projection: string, onChunk: ChunkCallback): GeoJSONLoad {
+    const geojsonWorker = getWorker();
+    if (!geojsonWorker) {
+        return loadOnMainThread(url, projection, onChunk);
+    }
+    const id = nextId++;
+    const promise = new Promise<number>((resolve, reject) => {
+        pending.set(id, { url, projection, onChunk, resolve, reject });
+    });
+    geojsonWorker.postMessage({ type: 'load', id, url, projection, chunkSize: CHUNK_SIZE });
+    return {
+        promise,
+        cancel: () => {
+            if (pending.delete(id)) {
+                worker?.postMessage({ type: 'cancel', id });
+            }
+        }
+    };
+}
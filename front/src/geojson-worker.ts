@@ -0,0 +1,73 @@
+/**
+ * Web Worker fetching and parsing GeoJSON off the main thread.
+ *
+ * The features are reprojected to the map projection here and sent back as
+ * plain GeoJSON objects, in chunks, so the main thread only builds the
+ * OpenLayers features of one chunk at a time.
+ *
+ * Messages received : {type: 'load', id, url, projection, chunkSize} | {type: 'cancel', id}
+ * Messages sent : {type: 'chunk', id, features} | {type: 'done', id, count} | {type: 'error', id, message}
+ */
+import { getTransform, TransformFunction } from 'ol/proj';
+
+import { getFeatureFromURL } from './features';
+
+const controllers = new Map<number, AbortController>();
+
+function transformCoordinates(coordinates: any, transform: TransformFunction): any {
+    if (typeof coordinates[0] === 'number') {
+        const [x, y] = transform([coordinates[0], coordinates[1]]);
+        return coordinates.length > 2 ? [x, y, ...coordinates.slice(2)] : [x, y];
+    }
+    return coordinates.map((item: any) => transformCoordinates(item, transform));
+}
+
+function transformGeometry(geometry: any, transform: TransformFunction): any {
+    if (!geometry) {
+        return geometry;
+    }
+    if (geometry.type === 'GeometryCollection') {
+        return { ...geometry, geometries: geometry.geometries.map((g: any) => transformGeometry(g, transform)) };
+    }
+    return { ...geometry, coordinates: transformCoordinates(geometry.coordinates, transform) };
+}
+
+async function load(id: number, url: string, projection: string, chunkSize: number) {
+    const controller = new AbortController();
+    controllers.set(id, controller);
+    try {
+        const geojson = await getFeatureFromURL(url, controller.signal);
+        // FeatureCollection, single Feature or bare geometry
+        const features: any[] = geojson.type === 'FeatureCollection' ? (geojson.features ?? [])
+            : geojson.type === 'Feature' ? [geojson]
+            : [{ type: 'Feature', properties: {}, geometry: geojson }];
+        const transform = getTransform('EPSG:4326', projection);
+        for (let start = 0; start < features.length; start += chunkSize) {
+            if (controller.signal.aborted) {
+                return;
+            }
+            const chunk = features.slice(start, start + chunkSize).map((feature) => ({
+                ...feature,
+                geometry: transformGeometry(feature.geometry, transform)
+            }));
+            self.postMessage({ type: 'chunk', id, features: chunk });
+        }
+        self.postMessage({ type: 'done', id, count: features.length });
+    } catch (error) {
+        if (!controller.signal.aborted) {
+            self.postMessage({ type: 'error', id, message: String(error) });
+        }
+    } finally {
+        controllers.delete(id);
+    }
+}
+
+self.onmessage = (event: MessageEvent) => {
+    const message = event.data;
+    if (message.type === 'load') {
+        load(message.id, message.url, message.projection, message.chunkSize);
+    } else if (message.type === 'cancel') {
+        controllers.get(message.id)?.abort();
+        controllers.delete(message.id);
+    }
+};
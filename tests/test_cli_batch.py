@@ -0,0 +1,139 @@
+"""Tests for the batch mode of app.cli."""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+from pathlib import Path
+from types import SimpleNamespace
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.cli import read_completed_ids, read_failed_attempts, read_prompts, run_batch
+
+
+class FakeGraph:
+    def __init__(self, fail_on: set[str] | None = None, used_threads: set[str] | None = None):
+        self.fail_on = fail_on or set()
+        self.used_threads = used_threads or set()
+        self.thread_ids: list[str] = []
+        self.running = 0
+        self.max_running = 0
+
+    async def aget_state(self, config):
+        used = config["configurable"]["thread_id"] in self.used_threads
+        return SimpleNamespace(values={"messages": [HumanMessage(content="q")]} if used else {})
+
+    async def astream(self, payload, config):
+        thread_id = config["configurable"]["thread_id"]
+        self.thread_ids.append(thread_id)
+        prompt = payload["messages"][0]["content"]
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(0.01)
+            if prompt in self.fail_on:
+                raise RuntimeError("model unavailable")
+            yield {
+                "model": {
+                    "messages": [
+                        AIMessage(
+                            content="",
+                            tool_calls=[{"name": "geocode", "args": {"q": prompt}, "id": "c1"}],
+                        )
+                    ]
+                }
+            }
+            yield {"tools": {"messages": [ToolMessage(content="{}", tool_call_id="c1")]}}
+            yield {"model": {"messages": [AIMessage(content=f"answer to {prompt}")]}}
+        finally:
+            self.running -= 1
+
+
+def test_run_batch_writes_one_result_per_prompt_with_its_own_thread() -> None:
+    graph = FakeGraph()
+    prompts = [{"id": str(i), "prompt": f"q{i}"} for i in range(5)]
+    output = io.StringIO()
+
+    failures = asyncio.run(run_batch(graph, prompts, output, concurrency=2, thread_prefix="nightly"))
+
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert failures == 0
+    assert sorted(r["id"] for r in results) == ["0", "1", "2", "3", "4"]
+    assert sorted(graph.thread_ids) == [f"nightly-{i}" for i in range(5)]
+    assert graph.max_running == 2
+
+    result = next(r for r in results if r["id"] == "3")
+    assert result["answer"] == "answer to q3"
+    assert result["tool_calls"] == [{"name": "geocode", "args": {"q": "q3"}}]
+    assert [t["node"] for t in result["timings"]] == ["model", "tools", "model"]
+    assert result["error"] is None
+
+
+def test_run_batch_records_errors_without_stopping() -> None:
+    graph = FakeGraph(fail_on={"bad"})
+    output = io.StringIO()
+
+    failures = asyncio.run(
+        run_batch(graph, [{"id": "a", "prompt": "bad"}, {"id": "b", "prompt": "good"}], output)
+    )
+
+    results = {r["id"]: r for r in map(json.loads, output.getvalue().splitlines())}
+    assert failures == 1
+    assert results["a"]["error"] == "RuntimeError: model unavailable"
+    assert results["b"]["answer"] == "answer to good"
+
+
+def test_read_prompts_defaults_id_to_line_number(tmp_path: Path) -> None:
+    path = tmp_path / "prompts.jsonl"
+    path.write_text('{"prompt": "a"}\n\n{"id": 7, "prompt": "b"}\n', encoding="utf-8")
+
+    assert read_prompts(str(path)) == [{"prompt": "a", "id": "1"}, {"id": "7", "prompt": "b"}]
+
+
+def test_read_completed_ids_skips_failures_and_truncated_lines(tmp_path: Path) -> None:
+    path = tmp_path / "results.jsonl"
+    path.write_text(
+        '{"id": "1", "error": null}\n{"id": "2", "error": "boom"}\n{"id": "3", "err',
+        encoding="utf-8",
+    )
+
+    assert read_completed_ids(str(path)) == {"1"}
+    assert read_completed_ids(str(tmp_path / "missing.jsonl")) == set()
+
+
+def test_retried_prompts_run_on_a_new_thread(tmp_path: Path) -> None:
+    path = tmp_path / "results.jsonl"
+    path.write_text(
+        '{"id": "a", "error": "boom"}\n{"id": "a", "error": "boom"}\n{"id": "b", "error": null}\n',
+        encoding="utf-8",
+    )
+    failed = read_failed_attempts(str(path))
+    assert failed == {"a": 2}
+
+    graph = FakeGraph()
+    output = io.StringIO()
+    prompts = [{"id": "a", "prompt": "qa", "attempt": failed["a"] + 1}, {"id": "c", "prompt": "qc"}]
+    asyncio.run(run_batch(graph, prompts, output))
+
+    results = {r["id"]: r for r in map(json.loads, output.getvalue().splitlines())}
+    assert results["a"]["thread_id"] == "batch-a-attempt3" and results["a"]["attempt"] == 3
+    assert results["c"]["thread_id"] == "batch-c" and results["c"]["attempt"] == 1
+
+
+def test_resumed_prompts_skip_the_threads_of_interrupted_attempts() -> None:
+    # attempt 3 was killed mid-run: its thread exists but it has no result line
+    graph = FakeGraph(used_threads={"batch-a", "batch-a-attempt2", "batch-a-attempt3", "batch-c"})
+    output = io.StringIO()
+    prompts = [
+        {"id": "a", "prompt": "qa", "attempt": 3, "resume": True},
+        {"id": "c", "prompt": "qc", "attempt": 1, "resume": True},
+        {"id": "d", "prompt": "qd", "attempt": 1, "resume": True},
+    ]
+    asyncio.run(run_batch(graph, prompts, output))
+
+    results = {r["id"]: r for r in map(json.loads, output.getvalue().splitlines())}
+    assert results["a"]["thread_id"] == "batch-a-attempt4" and results["a"]["attempt"] == 4
+    assert results["c"]["thread_id"] == "batch-c-attempt2" and results["c"]["attempt"] == 2
+    assert results["d"]["thread_id"] == "batch-d" and results["d"]["attempt"] == 1
@@ -6,6 +6,7 @@ import json
 from types import SimpleNamespace
 
 import gradio as gr
+from langchain_core.messages import AIMessage
 
 from app.helpers.gradio import to_gradio_message
 
@@ -104,3 +105,8 @@ def test_to_gradio_message_unknown_node_type() -> None:
 def test_to_gradio_message_unknown_content_type_returns_none() -> None:
     out = to_gradio_message(_message("human", 123))
     assert out is None
+
+
+def test_to_gradio_message_does_not_print_skipped_messages(capsys) -> None:
+    assert to_gradio_message(AIMessage(content="")) is None
+    assert capsys.readouterr().out == ""
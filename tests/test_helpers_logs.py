@@ -0,0 +1,106 @@
+"""Tests for app.helpers.logs (queued JSON logging)."""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import json
+import logging
+import logging.handlers
+import queue
+
+from app.helpers.logs import (
+    ContextFilter,
+    DebugSamplingFilter,
+    JsonFormatter,
+    LazyQueueHandler,
+    set_log_context,
+)
+
+
+def _logger(name: str, *filters: logging.Filter) -> tuple[logging.Logger, logging.handlers.QueueListener, io.StringIO]:
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(records)
+    queue_handler.addFilter(ContextFilter())
+    for record_filter in filters:
+        queue_handler.addFilter(record_filter)
+    logger = logging.getLogger(name)
+    logger.handlers = [queue_handler]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    return logger, logging.handlers.QueueListener(records, handler), stream
+
+
+def _lines(stream: io.StringIO) -> list[dict]:
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_lines_carry_the_thread_id_and_user_of_the_emitting_task() -> None:
+    logger, listener, stream = _logger("tests.logs.context")
+    listener.start()
+
+    async def turn(thread_id: str, user: str) -> None:
+        set_log_context(thread_id=thread_id, user=user)
+        await asyncio.sleep(0)
+        logger.info("turn of %s", user, extra={"tool": "altitude"})
+
+    async def scenario() -> None:
+        await asyncio.gather(turn("thread-a", "alice"), turn("thread-b", "bob"))
+        logger.info("outside")
+
+    asyncio.run(scenario())
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        logger.exception("failed")
+    listener.stop()
+
+    lines = _lines(stream)
+    by_message = {line["message"]: line for line in lines}
+    assert by_message["turn of alice"]["thread_id"] == "thread-a"
+    assert by_message["turn of bob"]["user"] == "bob"
+    assert by_message["turn of bob"]["tool"] == "altitude"
+    assert "thread_id" not in by_message["outside"]
+    assert by_message["failed"]["level"] == "ERROR"
+    assert "ValueError: boom" in by_message["failed"]["exception"]
+
+
+def test_arguments_are_merged_when_the_record_is_queued() -> None:
+    logger, listener, stream = _logger("tests.logs.args")
+    state = {"messages": 1}
+
+    logger.info("state: %s", state)
+    state["messages"] = 2
+    listener.start()
+    listener.stop()
+
+    assert _lines(stream)[0]["message"] == "state: {'messages': 1}"
+
+
+def test_debug_records_are_sampled_per_call_site() -> None:
+    logger, listener, stream = _logger("tests.logs.sampling", DebugSamplingFilter(5))
+    listener.start()
+    for i in range(20):
+        logger.debug("event %s", i)
+        logger.info("kept %s", i)
+    listener.stop()
+
+    messages = [line["message"] for line in _lines(stream)]
+    assert [m for m in messages if m.startswith("event")] == ["event 0", "event 5", "event 10", "event 15"]
+    assert len([m for m in messages if m.startswith("kept")]) == 20
+
+
+def test_debug_sampling_keys_are_bounded_by_the_call_sites() -> None:
+    sampling = DebugSamplingFilter(5)
+    logger, listener, stream = _logger("tests.logs.sampling_keys", sampling)
+    listener.start()
+    for i in range(20):
+        # preformatted messages: one call site, whatever the message
+        logger.debug(f"event {i}")
+    listener.stop()
+
+    assert len(sampling.counts) == 1
+    assert [line["message"] for line in _lines(stream)] == ["event 0", "event 5", "event 10", "event 15"]
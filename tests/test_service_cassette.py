@@ -0,0 +1,128 @@
+"""Tests for app.services.cassette (record/replay of MCP tool calls)."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from pathlib import Path
+
+import pytest
+from langchain.agents.middleware import ToolCallRequest
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import ToolException, tool
+
+from app.services.cassette import Cassette, CassetteMiddleware
+
+
+@tool
+def gpf_wfs_get_features(typename: str) -> str:
+    """Récupère des objets WFS."""
+    return ""
+
+
+def _request(name: str, args: dict, call_id: str = "call-1") -> ToolCallRequest:
+    return ToolCallRequest(
+        tool_call={"name": name, "args": args, "id": call_id, "type": "tool_call"},
+        tool=None,
+        state={},
+        runtime=None,
+    )
+
+
+def _record(path: Path) -> None:
+    cassette = Cassette(str(path))
+    cassette.start_recording({"geocontext": [gpf_wfs_get_features]})
+    middleware = CassetteMiddleware(cassette, "record")
+
+    async def handler(request: ToolCallRequest) -> ToolMessage:
+        await asyncio.sleep(0.05)
+        return ToolMessage(
+            content=f"features of {request.tool_call['args']['typename']}",
+            tool_call_id=request.tool_call["id"],
+            name=request.tool_call["name"],
+        )
+
+    asyncio.run(middleware.awrap_tool_call(_request("gpf_wfs_get_features", {"typename": "a"}), handler))
+
+
+def test_replay_serves_recorded_result_without_calling_handler(tmp_path: Path) -> None:
+    path = tmp_path / "cassette.jsonl"
+    _record(path)
+
+    cassette = Cassette.load(str(path))
+    tools_by_server = cassette.replay_tools()
+    assert [t.name for t in tools_by_server["geocontext"]] == ["gpf_wfs_get_features"]
+    assert "typename" in tools_by_server["geocontext"][0].args
+
+    middleware = CassetteMiddleware(cassette, "replay")
+
+    async def handler(_request: ToolCallRequest) -> ToolMessage:
+        raise AssertionError("MCP server must not be called in replay mode")
+
+    result = asyncio.run(
+        middleware.awrap_tool_call(_request("gpf_wfs_get_features", {"typename": "a"}, "call-2"), handler)
+    )
+
+    assert result.content == "features of a"
+    assert result.tool_call_id == "call-2"
+    assert result.status == "success"
+
+
+def test_replay_unknown_call_raises_tool_exception(tmp_path: Path) -> None:
+    path = tmp_path / "cassette.jsonl"
+    _record(path)
+    middleware = CassetteMiddleware(Cassette.load(str(path)), "replay")
+
+    async def handler(_request: ToolCallRequest) -> ToolMessage:
+        raise AssertionError("unreachable")
+
+    with pytest.raises(ToolException, match="Aucun résultat enregistré"):
+        asyncio.run(middleware.awrap_tool_call(_request("gpf_wfs_get_features", {"typename": "b"}), handler))
+
+
+def test_replay_simulates_recorded_latency(tmp_path: Path) -> None:
+    path = tmp_path / "cassette.jsonl"
+    _record(path)
+    middleware = CassetteMiddleware(Cassette.load(str(path)), "replay", simulate_latency=True)
+
+    async def handler(_request: ToolCallRequest) -> ToolMessage:
+        raise AssertionError("unreachable")
+
+    start = time.perf_counter()
+    asyncio.run(middleware.awrap_tool_call(_request("gpf_wfs_get_features", {"typename": "a"}), handler))
+    assert time.perf_counter() - start >= 0.04
+
+
+def test_local_tools_are_not_recorded(tmp_path: Path) -> None:
+    cassette = Cassette(str(tmp_path / "cassette.jsonl"))
+    cassette.start_recording({"geocontext": [gpf_wfs_get_features]})
+    middleware = CassetteMiddleware(cassette, "record")
+
+    async def handler(request: ToolCallRequest) -> ToolMessage:
+        return ToolMessage(content="<ol-simple-map></ol-simple-map>", tool_call_id="call-1")
+
+    asyncio.run(middleware.awrap_tool_call(_request("create_map", {}), handler))
+    assert cassette.call_count == 0
+
+
+def test_tool_errors_are_recorded_and_replayed(tmp_path: Path) -> None:
+    path = tmp_path / "cassette.jsonl"
+    cassette = Cassette(str(path))
+    cassette.start_recording({"geocontext": [gpf_wfs_get_features]})
+    recorder = CassetteMiddleware(cassette, "record")
+
+    async def failing(request: ToolCallRequest) -> ToolMessage:
+        raise ToolException("typename inconnu")
+
+    with pytest.raises(ToolException, match="typename inconnu"):
+        asyncio.run(recorder.awrap_tool_call(_request("gpf_wfs_get_features", {"typename": "x"}), failing))
+
+    replayed = Cassette.load(str(path))
+    assert replayed.lookup("gpf_wfs_get_features", {"typename": "x"})["status"] == "error"
+    middleware = CassetteMiddleware(replayed, "replay")
+
+    async def handler(request: ToolCallRequest) -> ToolMessage:
+        raise AssertionError("handler must not be called in replay mode")
+
+    with pytest.raises(ToolException, match="typename inconnu"):
+        asyncio.run(middleware.awrap_tool_call(_request("gpf_wfs_get_features", {"typename": "x"}), handler))
@@ -0,0 +1,174 @@
+"""Tests for app.services.catalog (local WFS feature types index) and the search_feature_types tool."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+from app.services import catalog as catalog_module
+from app.services.catalog import (
+    FeatureCatalog, build_catalog, get_catalog, maintain_catalog, refresh_catalog, write_catalog,
+)
+from app.tools import search_feature_types
+
+CAPABILITIES = """<?xml version="1.0" encoding="UTF-8"?>
+<wfs:WFS_Capabilities version="2.0.0" xmlns:wfs="http://www.opengis.net/wfs/2.0" xmlns:ows="http://www.opengis.net/ows/1.1">
+  <wfs:FeatureTypeList>
+    <wfs:FeatureType>
+      <wfs:Name>ADMINEXPRESS-COG.LATEST:commune</wfs:Name>
+      <wfs:Title>Communes</wfs:Title>
+      <wfs:Abstract>Limites administratives des communes de France.</wfs:Abstract>
+      <ows:Keywords><ows:Keyword>Unités administratives</ows:Keyword></ows:Keywords>
+      <ows:WGS84BoundingBox><ows:LowerCorner>-63.15 -21.39</ows:LowerCorner><ows:UpperCorner>55.84 51.09</ows:UpperCorner></ows:WGS84BoundingBox>
+    </wfs:FeatureType>
+    <wfs:FeatureType>
+      <wfs:Name>ADMINEXPRESS-COG.LATEST:departement</wfs:Name>
+      <wfs:Title>Départements</wfs:Title>
+      <wfs:Abstract>Limites des départements.</wfs:Abstract>
+    </wfs:FeatureType>
+    <wfs:FeatureType>
+      <wfs:Name>BDTOPO_V3:batiment</wfs:Name>
+      <wfs:Title>Bâtiment</wfs:Title>
+      <wfs:Abstract>Bâtiments de la BD TOPO.</wfs:Abstract>
+    </wfs:FeatureType>
+  </wfs:FeatureTypeList>
+</wfs:WFS_Capabilities>""".encode("utf-8")
+
+SCHEMAS = {
+    "ADMINEXPRESS-COG.LATEST": {
+        "targetPrefix": "ADMINEXPRESS-COG.LATEST",
+        "featureTypes": [
+            {"typeName": "commune", "properties": [
+                {"name": "nom_officiel", "localType": "string"},
+                {"name": "code_insee", "localType": "string"},
+                {"name": "geometrie", "localType": "MultiPolygon"},
+            ]},
+            {"typeName": "departement", "properties": [{"name": "code_insee", "localType": "string"}]},
+        ],
+    },
+    "BDTOPO_V3": {
+        "targetPrefix": "BDTOPO_V3",
+        "featureTypes": [{"typeName": "batiment", "properties": [{"name": "hauteur", "localType": "number"}]}],
+    },
+}
+
+
+def _client(requests: list[str]) -> httpx.AsyncClient:
+    def handler(request: httpx.Request) -> httpx.Response:
+        params = request.url.params
+        requests.append(params["request"])
+        if params["request"] == "GetCapabilities":
+            return httpx.Response(200, content=CAPABILITIES)
+        prefixes = {name.split(":")[0] for name in params["typeNames"].split(",")}
+        assert len(prefixes) == 1
+        return httpx.Response(200, json=SCHEMAS[prefixes.pop()])
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def _snapshot() -> dict:
+    async def scenario():
+        async with _client([]) as client:
+            return await build_catalog("https://wfs.test/ows", client=client)
+
+    return asyncio.run(scenario())
+
+
+def test_build_catalog_describes_types_by_namespace() -> None:
+    requests: list[str] = []
+
+    async def scenario():
+        async with _client(requests) as client:
+            return await build_catalog("https://wfs.test/ows", batch_size=10, client=client)
+
+    snapshot = asyncio.run(scenario())
+
+    assert requests.count("DescribeFeatureType") == 2
+    types = {feature_type["name"]: feature_type for feature_type in snapshot["feature_types"]}
+    assert types["ADMINEXPRESS-COG.LATEST:commune"]["keywords"] == ["Unités administratives"]
+    assert types["ADMINEXPRESS-COG.LATEST:commune"]["bbox"] == [-63.15, -21.39, 55.84, 51.09]
+    assert types["BDTOPO_V3:batiment"]["bbox"] is None
+    assert {p["name"] for p in types["ADMINEXPRESS-COG.LATEST:commune"]["properties"]} == {"nom_officiel", "code_insee", "geometrie"}
+    assert types["BDTOPO_V3:batiment"]["properties"] == [{"name": "hauteur", "type": "number"}]
+
+
+def test_snapshot_is_searchable_after_a_round_trip(tmp_path) -> None:
+    path = str(tmp_path / "catalog.json.gz")
+    write_catalog(_snapshot(), path)
+
+    catalog = FeatureCatalog.load(path)
+
+    results = catalog.search("limites des communes", 2)
+    assert results[0]["typename"] == "ADMINEXPRESS-COG.LATEST:commune"
+    assert results[0]["properties"]["code_insee"] == "string"
+    assert catalog.search("hauteur des bâtiments", 1)[0]["typename"] == "BDTOPO_V3:batiment"
+    assert not catalog.is_stale(3600)
+
+
+def test_tool_falls_back_to_the_mcp_tools_when_stale(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(catalog_module, "_catalog", None)
+    assert "outils de la Géoplateforme" in search_feature_types.invoke({"query": "communes"})
+
+    snapshot = _snapshot()
+    path = str(tmp_path / "catalog.json")
+    write_catalog(snapshot, path)
+    asyncio.run(refresh_catalog(path))
+    results = json.loads(search_feature_types.invoke({"query": "départements", "limit": 1}))
+    assert results[0]["typename"] == "ADMINEXPRESS-COG.LATEST:departement"
+
+    # a replaced file is reloaded, here with an old snapshot
+    snapshot["created_at"] = (datetime.now(timezone.utc) - timedelta(days=30)).isoformat()
+    write_catalog(snapshot, path)
+    os.utime(path, (0, 0))
+    asyncio.run(refresh_catalog(path))
+    assert get_catalog().is_stale(7 * 86400)
+    assert "obsolète" in search_feature_types.invoke({"query": "communes"})
+    monkeypatch.setattr(catalog_module, "_catalog", None)
+
+
+def test_unreadable_snapshot_is_not_read_again(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(catalog_module, "_catalog", None)
+    monkeypatch.setattr(catalog_module, "_failed", None)
+    path = str(tmp_path / "catalog.json")
+    write_catalog(_snapshot(), path)
+    previous = asyncio.run(refresh_catalog(path))
+
+    with open(path, "w") as f:
+        f.write("{not json")
+    os.utime(path, (1, 1))
+    loads = []
+    load = FeatureCatalog.load
+    monkeypatch.setattr(FeatureCatalog, "load", lambda p: loads.append(p) or load(p))
+
+    # the previous snapshot is kept and the broken file is read once
+    assert asyncio.run(refresh_catalog(path)) is previous
+    assert asyncio.run(refresh_catalog(path)) is previous
+    assert loads == [path]
+
+
+def test_missing_snapshot_is_built_in_the_background(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(catalog_module, "_catalog", None)
+    monkeypatch.setattr(catalog_module, "_failed", None)
+    path = str(tmp_path / "catalog.json.gz")
+    snapshot, built = _snapshot(), []
+
+    async def fake_build(url):
+        built.append(url)
+        return snapshot
+
+    monkeypatch.setattr(catalog_module, "build_catalog", fake_build)
+
+    async def scenario():
+        task = asyncio.create_task(maintain_catalog(path, "https://wfs.test/ows", max_age_seconds=3600, interval=0.01))
+        await asyncio.sleep(0.1)
+        task.cancel()
+
+    asyncio.run(scenario())
+
+    # built once, then the fresh snapshot is only checked
+    assert built == ["https://wfs.test/ows"]
+    assert get_catalog().search("communes", 1)[0]["typename"] == "ADMINEXPRESS-COG.LATEST:commune"
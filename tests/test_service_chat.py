@@ -0,0 +1,131 @@
+"""Tests for app.services.chat and the /api/threads SSE endpoints."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain.agents import create_agent
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import InMemorySaver
+
+import app.services.db as db_service
+from app.services.chat import agent_events, agent_stream, format_sse, get_history_page
+
+
+class FakeToolModel(BaseChatModel):
+    """Non-streaming fake chat model (GenericFakeChatModel drops tool calls when streamed)."""
+
+    responses: list[AIMessage]
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-tool-model"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self.responses.pop(0))])
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+@tool
+def geocode(text: str) -> str:
+    """Géocode une adresse."""
+    return "2.35,48.85"
+
+
+def _graph():
+    model = FakeToolModel(responses=[
+        AIMessage(content="", tool_calls=[{"name": "geocode", "args": {"text": "Paris"}, "id": "call-1"}]),
+        AIMessage(content="Paris est à 2.35,48.85"),
+    ])
+    return create_agent(model=model, tools=[geocode], checkpointer=InMemorySaver())
+
+
+async def _collect(graph, thread_id: str, message: str) -> list[dict]:
+    return [event async for event in agent_events(agent_stream(graph, thread_id, message), thread_id)]
+
+
+def test_agent_events() -> None:
+    events = asyncio.run(_collect(_graph(), "thread-1", "Où est Paris ?"))
+
+    others = [event for event in events if event["event"] != "token"]
+    assert [event["event"] for event in others] == ["tool_call", "tool_result", "message", "done"]
+    assert others[0]["data"] == {"id": "call-1", "name": "geocode", "args": {"text": "Paris"}}
+    assert others[1]["data"]["content"] == "2.35,48.85"
+    assert others[2]["data"]["data"]["content"] == "Paris est à 2.35,48.85"
+    tokens = "".join(event["data"]["content"] for event in events if event["event"] == "token")
+    assert tokens == "Paris est à 2.35,48.85"
+
+
+def test_agent_events_reports_errors() -> None:
+    model = FakeToolModel(responses=[])
+    graph = create_agent(model=model, tools=[geocode], checkpointer=InMemorySaver())
+
+    events = asyncio.run(_collect(graph, "thread-1", "bonjour"))
+
+    assert [event["event"] for event in events] == ["error"]
+
+
+def test_format_sse() -> None:
+    assert format_sse({"event": "token", "data": {"content": "é"}}) == 'event: token\ndata: {"content": "é"}\n\n'
+
+
+def test_get_history_page() -> None:
+    graph = _graph()
+    asyncio.run(_collect(graph, "thread-1", "Où est Paris ?"))
+
+    first = asyncio.run(get_history_page(graph, "thread-1", limit=3))
+    second = asyncio.run(get_history_page(graph, "thread-1", offset=first["next_offset"], limit=3))
+
+    assert first["total"] == 4
+    assert [m["type"] for m in first["messages"]] == ["human", "ai", "tool"]
+    assert [m["type"] for m in second["messages"]] == ["ai"]
+    assert second["next_offset"] is None
+
+
+def test_api_streams_events_and_history(monkeypatch: pytest.MonkeyPatch) -> None:
+    import app.server as server
+
+    monkeypatch.setattr(server, "graph", _graph())
+    monkeypatch.setattr(db_service, "_current_database", db_service.InMemoryDatabase(checkpointer=None))
+    client = TestClient(server.app)
+
+    response = client.post("/api/threads/thread-1/messages", json={"content": "Où est Paris ?"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    frames = [frame for frame in response.text.split("\n\n") if frame]
+    assert frames[-1] == 'event: done\ndata: {"thread_id": "thread-1"}'
+
+    history = client.get("/api/threads/thread-1/messages", params={"limit": 2}).json()
+    assert history["total"] == 4
+    assert history["next_offset"] == 2
+    assert history["messages"][0]["data"]["content"] == "Où est Paris ?"
+
+    assert client.post("/api/threads/thread-1/messages", json={"content": " "}).status_code == 422
+
+
+def test_api_threads_are_restricted_to_their_users(monkeypatch: pytest.MonkeyPatch) -> None:
+    import app.server as server
+
+    monkeypatch.setattr(server, "graph", _graph())
+    client = TestClient(server.app)
+    alice = {"X-Forwarded-Email": "alice@example.org"}
+    bob = {"X-Forwarded-Email": "bob@example.org"}
+
+    with db_service.use_database(db_service.InMemoryDatabase(checkpointer=None)):
+        assert client.post("/api/threads/thread-1/messages", json={"content": "Où est Paris ?"}, headers=alice).status_code == 200
+        assert client.get("/api/threads/thread-1/messages", headers=alice).json()["total"] == 4
+
+        assert client.get("/api/threads/thread-1/messages", headers=bob).status_code == 404
+        assert client.get("/api/threads/thread-1/events", headers=bob).status_code == 404
+        assert client.post("/api/threads/thread-1/messages", json={"content": "suite"}, headers=bob).status_code == 404
+        # nor to the requests without authenticated user
+        assert client.get("/api/threads/thread-1/messages").status_code == 404
+        assert client.get("/api/threads/thread-2/messages", headers=bob).status_code == 404
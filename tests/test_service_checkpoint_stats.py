@@ -0,0 +1,88 @@
+"""Tests for app.services.checkpoint_stats (checkpoint size analyzer)."""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+
+import pytest
+from langchain_core.messages import AIMessage, ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import START, MessagesState, StateGraph
+
+import app.services.db as db_service
+from app.services.checkpoint_stats import SizeDistribution, analyze_checkpoints, format_report
+from app.services.db import InMemoryDatabase
+
+
+def _graph(checkpointer):
+    async def answer(state: MessagesState) -> dict:
+        question = state["messages"][-1].content
+        return {"messages": [
+            AIMessage(content="", tool_calls=[{"name": "gpf_wfs_get_features", "args": {}, "id": f"call-{question}"}]),
+            ToolMessage(content="x" * 5000, tool_call_id=f"call-{question}", name="gpf_wfs_get_features"),
+            AIMessage(content=f"réponse à {question}"),
+        ]}
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("answer", answer)
+    builder.add_edge(START, "answer")
+    return builder.compile(checkpointer=checkpointer)
+
+
+async def _fill(checkpointer) -> None:
+    graph = _graph(checkpointer)
+    for thread_id, turns in [("thread-a", 1), ("thread-b", 3), ("thread-c", 2)]:
+        for turn in range(turns):
+            await graph.ainvoke(
+                {"messages": [{"role": "user", "content": f"{thread_id}-{turn}"}]},
+                {"configurable": {"thread_id": thread_id}},
+            )
+
+
+def _check_report(report: dict) -> None:
+    assert report["threads"] == 3
+    assert [t["thread_id"] for t in report["heaviest_threads"]] == ["thread-b", "thread-c"]
+    assert report["heaviest_threads"][0]["messages"] == 12
+    assert report["message_types"]["tool"]["count"] == 6
+    assert report["message_types"]["human"]["count"] == 6
+    assert report["tool_outputs"]["gpf_wfs_get_features"]["total"] > 6 * 5000
+    assert report["checkpoints_per_thread"]["max"] == report["heaviest_threads"][0]["checkpoints"]
+    savings = report["savings"]
+    assert 0 < savings["prune_bytes"] < report["totals"]["stored_bytes"]
+    assert savings["compression_ratio"] < 0.5
+    assert savings["compression_bytes"] > 0
+    assert "Heaviest threads:" in format_report(report)
+
+
+def test_analyze_in_memory_checkpoints() -> None:
+    async def scenario():
+        db = InMemoryDatabase(checkpointer=InMemorySaver())
+        await _fill(db.checkpointer)
+        return await analyze_checkpoints(db, top=2)
+
+    _check_report(asyncio.run(scenario()))
+
+
+@pytest.mark.skipif(importlib.util.find_spec("langgraph.checkpoint.sqlite") is None, reason="langgraph-checkpoint-sqlite not installed")
+def test_analyze_sqlite_checkpoints(monkeypatch: pytest.MonkeyPatch, tmp_path) -> None:
+    monkeypatch.setattr(db_service, "DB_URI", f"sqlite:///{tmp_path}/checkpoints.db")
+
+    async def scenario():
+        async with db_service.get_database() as db:
+            await _fill(db.checkpointer)
+            return await analyze_checkpoints(db, top=2, batch_size=2)
+
+    _check_report(asyncio.run(scenario()))
+
+
+def test_size_distribution_percentiles_are_bounded() -> None:
+    distribution = SizeDistribution()
+    for size in [100] * 90 + [10_000] * 10:
+        distribution.add(size)
+
+    result = distribution.to_dict()
+
+    assert result["count"] == 100 and result["total"] == 109_000 and result["max"] == 10_000
+    assert 100 <= result["p50"] <= 200
+    assert result["p99"] == 10_000
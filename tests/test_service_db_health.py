@@ -60,3 +60,23 @@ def test_is_database_healthy_propagates_runtime_error(monkeypatch: pytest.Monkey
 
     with pytest.raises(RuntimeError, match="Invalid DB_URI"):
         asyncio.run(db_service.is_database_healthy())
+
+
+def test_health_uses_the_database_opened_at_startup(monkeypatch: pytest.MonkeyPatch) -> None:
+    class FakeDatabase:
+        async def is_healthy(self) -> bool:
+            return True
+
+        def get_stats(self) -> dict:
+            return {"threads": 3}
+
+    @asynccontextmanager
+    async def fake_get_database():
+        raise AssertionError("no new database context per probe")
+        yield
+
+    monkeypatch.setattr(db_service, "get_database", fake_get_database)
+
+    with db_service.use_database(FakeDatabase()):
+        assert asyncio.run(db_service.is_database_healthy()) is True
+        assert asyncio.run(db_service.get_database_stats()) == {"threads": 3}
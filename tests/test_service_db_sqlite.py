@@ -0,0 +1,80 @@
+"""Tests for the SQLite backend of app.services.db (DB_URI=sqlite:///...)."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage
+from langgraph.graph import START, MessagesState, StateGraph
+
+import app.services.db as db_service
+
+
+def _builder() -> StateGraph:
+    async def answer(state: MessagesState) -> dict:
+        return {"messages": [AIMessage(content=f"réponse à {state['messages'][-1].content}")]}
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("answer", answer)
+    builder.add_edge(START, "answer")
+    return builder
+
+
+@pytest.fixture
+def sqlite_uri(monkeypatch: pytest.MonkeyPatch, tmp_path) -> str:
+    uri = f"sqlite:///{tmp_path}/checkpoints.db"
+    monkeypatch.setattr(db_service, "DB_URI", uri)
+    return uri
+
+
+def test_threads_are_persisted_across_connections(sqlite_uri: str) -> None:
+    async def scenario():
+        async with db_service.get_database() as db:
+            assert isinstance(db, db_service.SqliteDatabase)
+            assert await db.is_healthy() is True
+            graph = _builder().compile(checkpointer=db.checkpointer)
+            for thread_id in ["thread-b", "thread-a", "thread-c"]:
+                await graph.ainvoke(
+                    {"messages": [{"role": "user", "content": f"question {thread_id}"}]},
+                    {"configurable": {"thread_id": thread_id}},
+                )
+
+        async with db_service.get_database() as db:
+            graph = _builder().compile(checkpointer=db.checkpointer)
+            state = await graph.aget_state({"configurable": {"thread_id": "thread-a"}})
+            return await db.list_thread_ids(), state.values["messages"]
+
+    thread_ids, messages = asyncio.run(scenario())
+
+    assert thread_ids == ["thread-a", "thread-b", "thread-c"]
+    assert [m.content for m in messages] == ["question thread-a", "réponse à question thread-a"]
+
+
+def test_iter_latest_threads_paginates(sqlite_uri: str) -> None:
+    async def scenario():
+        async with db_service.get_database() as db:
+            graph = _builder().compile(checkpointer=db.checkpointer)
+            for thread_id in ["thread-a", "thread-b", "thread-c"]:
+                for question in ["question 1", "question 2"]:
+                    await graph.ainvoke(
+                        {"messages": [{"role": "user", "content": question}]},
+                        {"configurable": {"thread_id": thread_id}},
+                    )
+            return [thread async for thread in db.iter_latest_threads(after="thread-a", batch_size=1)]
+
+    threads = asyncio.run(scenario())
+
+    assert [t["thread_id"] for t in threads] == ["thread-b", "thread-c"]
+    assert len(threads[0]["messages"]) == 4
+
+
+def test_invalid_db_uri(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(db_service, "DB_URI", "mysql://localhost/db")
+
+    async def scenario():
+        async with db_service.get_database():
+            pass
+
+    with pytest.raises(RuntimeError, match="Invalid DB_URI"):
+        asyncio.run(scenario())
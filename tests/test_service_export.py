@@ -0,0 +1,83 @@
+"""Tests for app.services.export (NDJSON export of conversations)."""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from langchain_core.messages import AIMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import START, MessagesState, StateGraph
+
+from app.models import User
+from app.services.auth import get_admin_user
+from app.services.db import InMemoryDatabase
+from app.services.export import export_threads_ndjson, parse_datetime
+
+
+def _database(thread_ids: list[str]) -> InMemoryDatabase:
+    def answer(state: MessagesState) -> dict:
+        return {"messages": [AIMessage(content=f"réponse à {state['messages'][-1].content}")]}
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("answer", answer)
+    builder.add_edge(START, "answer")
+    checkpointer = InMemorySaver()
+    graph = builder.compile(checkpointer=checkpointer)
+    for thread_id in thread_ids:
+        graph.invoke(
+            {"messages": [{"role": "user", "content": f"question {thread_id}"}]},
+            {"configurable": {"thread_id": thread_id}},
+        )
+    return InMemoryDatabase(checkpointer=checkpointer)
+
+
+async def _collect(db: InMemoryDatabase, **kwargs) -> bytes:
+    return b"".join([chunk async for chunk in export_threads_ndjson(db, **kwargs)])
+
+
+def test_export_one_line_per_thread_with_latest_messages() -> None:
+    db = _database(["thread-b", "thread-a"])
+
+    lines = asyncio.run(_collect(db)).decode("utf-8").splitlines()
+
+    threads = [json.loads(line) for line in lines]
+    assert [t["thread_id"] for t in threads] == ["thread-a", "thread-b"]
+    assert threads[0]["cursor"] == "thread-a"
+    assert [m["type"] for m in threads[0]["messages"]] == ["human", "ai"]
+    assert threads[0]["messages"][1]["data"]["content"] == "réponse à question thread-a"
+
+
+def test_export_resumes_after_cursor_and_compresses() -> None:
+    db = _database(["thread-a", "thread-b", "thread-c"])
+
+    data = asyncio.run(_collect(db, after="thread-a", compress=True))
+
+    threads = [json.loads(line) for line in gzip.decompress(data).decode("utf-8").splitlines()]
+    assert [t["thread_id"] for t in threads] == ["thread-b", "thread-c"]
+
+
+def test_export_filters_on_last_update_date() -> None:
+    db = _database(["thread-a"])
+    tomorrow = datetime.now(timezone.utc) + timedelta(days=1)
+
+    assert asyncio.run(_collect(db, since=tomorrow)) == b""
+    assert asyncio.run(_collect(db, until=tomorrow)) != b""
+
+
+def test_parse_datetime_defaults_to_utc() -> None:
+    assert parse_datetime("2026-01-01") == datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert parse_datetime(None) is None
+
+
+def test_get_admin_user_requires_admin_group() -> None:
+    admin = User(id="1", username="a", email="a@gpf.fr", groups=["admin"])
+    assert get_admin_user(admin) is admin
+
+    with pytest.raises(HTTPException) as exc_info:
+        get_admin_user(User(id="2", username="b", email="b@gpf.fr", groups=["viewers"]))
+    assert exc_info.value.status_code == 403
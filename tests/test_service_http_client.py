@@ -0,0 +1,111 @@
+"""Tests for app.services.http_client (shared keep-alive HTTP client pool)."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+import httpx
+from langchain_anthropic import ChatAnthropic
+
+from app.services.http_client import HttpClientPool, environment_proxies
+
+MESSAGE = {
+    "id": "msg_1",
+    "type": "message",
+    "role": "assistant",
+    "model": "claude-test",
+    "content": [{"type": "text", "text": "Bonjour"}],
+    "stop_reason": "end_turn",
+    "stop_sequence": None,
+    "usage": {"input_tokens": 1, "output_tokens": 1},
+}
+
+
+async def _serve(connections: list[int]) -> asyncio.Server:
+    """HTTP/1.1 keep-alive server answering every request with MESSAGE."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        connections.append(1)
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n") if not reader.at_eof() else b""
+            if not head:
+                break
+            length = 0
+            for line in head.decode().split("\r\n"):
+                if line.lower().startswith("content-length:"):
+                    length = int(line.split(":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            body = json.dumps(MESSAGE).encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode()
+                + (b"" if head.startswith(b"HEAD ") else body)
+            )
+            await writer.drain()
+        writer.close()
+
+    async def safe_handle(reader, writer):
+        try:
+            await handle(reader, writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    return await asyncio.start_server(safe_handle, "127.0.0.1", 0)
+
+
+def test_environment_proxies(monkeypatch) -> None:
+    for name in ("ALL_PROXY", "all_proxy", "http_proxy", "https_proxy", "no_proxy"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.setenv("HTTPS_PROXY", "proxy.example.org:3128")
+    monkeypatch.setenv("HTTP_PROXY", "http://proxy.example.org:3128")
+    monkeypatch.setenv("NO_PROXY", "localhost,127.0.0.1,.ign.fr")
+
+    assert environment_proxies() == {
+        "http://": "http://proxy.example.org:3128",
+        "https://": "http://proxy.example.org:3128",
+        "all://localhost": None,
+        "all://127.0.0.1": None,
+        "all://*ign.fr": None,
+    }
+
+    monkeypatch.setenv("NO_PROXY", "*")
+    assert environment_proxies() == {}
+
+
+def test_connections_are_reused_across_clients(monkeypatch) -> None:
+    monkeypatch.setenv("NO_PROXY", "*")
+
+    async def scenario():
+        connections: list[int] = []
+        server = await _serve(connections)
+        url = "http://127.0.0.1:%s/" % server.sockets[0].getsockname()[1]
+        async with server, HttpClientPool(http2=False) as pool:
+            for _ in range(3):
+                assert (await pool.client.get(url)).status_code == 200
+            # a provider SDK client built from client_kwargs() shares the same connections
+            async with httpx.AsyncClient(**pool.client_kwargs()) as other:
+                assert (await other.post(url, json={"q": 1})).status_code == 200
+            return len(connections), pool.stats()
+
+    connections, stats = asyncio.run(scenario())
+
+    assert connections == 1
+    assert stats["requests"] == 4
+    assert stats["connections_opened"] == 1
+    assert stats["reuse_ratio"] == 0.75
+    assert stats["http_versions"] == {"HTTP/1.1": 4}
+
+
+def test_anthropic_model_keeps_its_own_client() -> None:
+    async def scenario():
+        async with HttpClientPool(http2=False) as pool:
+            model = pool.bind(ChatAnthropic(model="claude-test", api_key="test", max_retries=0))
+            return model, pool.origins
+
+    model, origins = asyncio.run(scenario())
+
+    # no private attribute of the model is replaced (its proxy and timeout settings apply)
+    assert "_async_client" not in model.__dict__
+    assert origins == {}
\ No newline at end of file
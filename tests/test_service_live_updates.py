@@ -0,0 +1,111 @@
+"""Tests for app.services.live_updates (fan-out of the checkpoint notifications to the /discussion viewers)."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import re
+
+from langchain_core.messages import AIMessage, HumanMessage
+from psycopg import sql
+
+from app.services.live_updates import ThreadUpdates, thread_channel
+
+
+class FakeConnection:
+    def __init__(self):
+        self.queries: list[str] = []
+
+    async def execute(self, query, params=None):
+        self.queries.append(repr(query))
+
+
+class FakeThreads:
+    """Latest messages of each thread, slow to load."""
+
+    def __init__(self):
+        self.messages: dict[str, list] = {}
+        self.loads = 0
+
+    async def load(self, thread_id: str) -> list:
+        self.loads += 1
+        await asyncio.sleep(0.01)
+        return list(self.messages.get(thread_id, []))
+
+
+def repr_listen(channel: str) -> str:
+    return repr(sql.SQL("LISTEN {}").format(sql.Identifier(channel)))
+
+
+def repr_unlisten(channel: str) -> str:
+    return repr(sql.SQL("UNLISTEN {}").format(sql.Identifier(channel)))
+
+
+async def _next(iterator):
+    return await asyncio.wait_for(anext(iterator), 1)
+
+
+def test_thread_channel_matches_the_trigger() -> None:
+    channel = thread_channel("thread-" + "a" * 32)
+
+    assert re.fullmatch(r"thread_[0-9a-f]{24}", channel)
+    assert channel == "thread_" + hashlib.md5(("thread-" + "a" * 32).encode()).hexdigest()[:24]
+    assert thread_channel("thread-1") != thread_channel("thread-2")
+
+
+def test_viewers_receive_only_the_new_messages() -> None:
+    async def scenario():
+        threads = FakeThreads()
+        threads.messages["t1"] = [HumanMessage("Bonjour", id="m1")]
+        updates = ThreadUpdates("postgresql://unused", threads.load)
+        conn = FakeConnection()
+
+        first = updates.follow("t1", session_id="s1")
+        second = updates.follow("t1", session_id="s2")
+        pending = [asyncio.create_task(_next(first)), asyncio.create_task(_next(second))]
+        await asyncio.sleep(0)
+        # the listener connection LISTENs once for both viewers, then the history is loaded
+        await updates._sync_channels(conn)
+        assert conn.queries == [repr_listen(thread_channel("t1"))]
+        assert [[m.id for m in batch] for batch in await asyncio.gather(*pending)] == [["m1"], ["m1"]]
+        loads = threads.loads
+
+        # a checkpoint written by another replica: one load for the two viewers
+        threads.messages["t1"] += [AIMessage("Voici", id="m2")]
+        updates.notify("t1")
+        assert [m.id for m in await _next(first)] == ["m2"]
+        assert [m.id for m in await _next(second)] == ["m2"]
+        assert threads.loads == loads + 1
+
+        # notifications received while loading are coalesced into one more load
+        threads.messages["t1"] += [HumanMessage("Et ensuite ?", id="m3")]
+        updates.notify("t1")
+        await asyncio.sleep(0.001)
+        for _ in range(4):
+            updates.notify("t1")
+        assert [m.id for m in await _next(first)] == ["m3"]
+        await asyncio.sleep(0.05)
+        assert threads.loads == loads + 3
+
+        # closed page: the subscription ends, the LISTEN is dropped with the last viewer
+        updates.detach_session("s1")
+        assert [batch async for batch in first] == []
+        assert updates.stats()["subscribers"] == 1
+        await second.aclose()
+        assert updates.stats()["threads"] == 0
+        await updates._sync_channels(conn)
+        assert conn.queries[-1] == repr_unlisten(thread_channel("t1"))
+
+    asyncio.run(scenario())
+
+
+def test_notifications_of_threads_without_viewers_are_ignored() -> None:
+    async def scenario():
+        threads = FakeThreads()
+        updates = ThreadUpdates("postgresql://unused", threads.load)
+        updates.notify("t1")
+        await asyncio.sleep(0.02)
+        assert threads.loads == 0
+
+    asyncio.run(scenario())
+
@@ -0,0 +1,71 @@
+"""Tests for app.services.map_extent (server-side extent of the create_map layers)."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from app import tools
+from app.services import catalog as catalog_module
+from app.services.catalog import FeatureCatalog
+from app.services.map_extent import data_extent, extent_view
+from app.tools import create_map
+
+WFS_URL = (
+    "https://data.geopf.fr/wfs/ows?service=WFS&version=2.0.0&request=GetFeature"
+    "&typeNames=ADMINEXPRESS-COG.LATEST:commune&outputFormat=application/json&srsName=EPSG:4326"
+)
+
+
+def _catalog() -> FeatureCatalog:
+    return FeatureCatalog({
+        "created_at": "2026-01-01T00:00:00+00:00",
+        "feature_types": [
+            {"name": "ADMINEXPRESS-COG.LATEST:commune", "title": "Communes", "bbox": [1.5, 47.0, 3.25, 49.5]},
+            {"name": "BDTOPO_V3:batiment", "title": "Bâtiment", "bbox": None},
+        ],
+    })
+
+
+def test_extent_view_fits_the_map() -> None:
+    lon, lat, zoom = extent_view((1.5, 47.0, 3.25, 49.5))
+    assert lon == pytest.approx(2.375)
+    assert 47.0 < lat < 49.5
+    assert zoom == 7
+
+    assert extent_view((2.35, 48.85, 2.35, 48.85))[2] == 16
+    assert extent_view((-180, -85, 180, 85))[2] == 0
+
+
+def test_data_extent_is_read_from_the_catalog(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(catalog_module, "_catalog", None)
+    assert data_extent(WFS_URL) is None
+
+    monkeypatch.setattr(catalog_module, "_catalog", _catalog())
+    assert data_extent(WFS_URL) == (1.5, 47.0, 3.25, 49.5)
+    # filtered requests, types without extent and URLs outside the Géoplateforme WFS are not resolved
+    assert data_extent(WFS_URL + "&cql_filter=code_insee_du_departement%3D'75'") is None
+    assert data_extent(WFS_URL + "&count=10") is None
+    assert data_extent(WFS_URL.replace("ADMINEXPRESS-COG.LATEST:commune", "BDTOPO_V3:batiment")) is None
+    assert data_extent(WFS_URL.replace("https://data.geopf.fr", "https://data.geopf.fr.example.org")) is None
+    assert data_extent(WFS_URL.replace("https://", "http://")) is None
+    assert data_extent("http://169.254.169.254/latest/meta-data/") is None
+
+
+def test_create_map_emits_the_view_of_the_data(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(catalog_module, "_catalog", _catalog())
+    monkeypatch.setattr(tools, "MAP_EXTENT", True)
+
+    html = asyncio.run(create_map.ainvoke({"geojson_url": WFS_URL}))
+    assert 'zoom="7"' in html
+    assert 'extent="1.500000,47.000000,3.250000,49.500000"' in html
+    assert "fit-bounds" not in html
+
+    # the view given by the model wins
+    html = asyncio.run(create_map.ainvoke({"geojson_url": WFS_URL, "zoom": 10}))
+    assert 'zoom="10"' in html and "extent=" not in html
+
+    # not resolved: the browser fits the view once the data is loaded
+    html = asyncio.run(create_map.ainvoke({"geojson_url": "https://example.org/communes.geojson"}))
+    assert 'fit-bounds="true"' in html and "extent=" not in html
@@ -0,0 +1,215 @@
+"""Tests for app.services.mcp_supervisor (fake sessions and a real stdio server)."""
+
+from __future__ import annotations
+
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+from mcp.shared.exceptions import McpError
+from mcp.types import INVALID_PARAMS, CallToolResult, ErrorData, TextContent, Tool
+
+from app.services.mcp_supervisor import McpSupervisor
+from app.services.tool_timeout import hedged_request
+
+
+class FakeSession:
+    def __init__(self, index: int):
+        self.index = index
+        self.broken = False
+
+    async def initialize(self):
+        pass
+
+    async def send_ping(self):
+        if self.broken:
+            await asyncio.sleep(10)
+
+    async def list_tools(self, cursor=None):
+        tool = Tool(name="echo", description="Echo.", inputSchema={"type": "object", "properties": {"text": {"type": "string"}}})
+        return SimpleNamespace(tools=[tool], nextCursor=None)
+
+    async def call_tool(self, name, arguments):
+        if self.broken:
+            raise ConnectionError("broken pipe")
+        if "text" not in arguments:
+            raise McpError(ErrorData(code=INVALID_PARAMS, message="text is required"))
+        return CallToolResult(content=[TextContent(type="text", text=f"{self.index}:{arguments['text']}")])
+
+
+class FakeServer:
+    """Session factory recording the started and stopped sessions."""
+
+    def __init__(self, failures: int = 0):
+        self.sessions: list[FakeSession] = []
+        self.closed: list[int] = []
+        self.failures = failures
+
+    @asynccontextmanager
+    async def __call__(self, connection):
+        if self.failures:
+            self.failures -= 1
+            raise OSError("spawn failed")
+        session = FakeSession(len(self.sessions))
+        self.sessions.append(session)
+        try:
+            yield session
+        finally:
+            self.closed.append(session.index)
+
+
+def _supervisor(server: FakeServer, **kwargs) -> McpSupervisor:
+    kwargs.setdefault("health_interval", 0)
+    return McpSupervisor({"fake": {"transport": "stdio"}}, session_factory=server, backoff_initial=0.01, **kwargs)
+
+
+async def _echo(supervisor: McpSupervisor, text: str) -> str:
+    tools = await supervisor.get_tools()
+    content, _artifact = await tools["fake"][0].coroutine(text=text)
+    return content[0]["text"]
+
+
+def test_tools_share_one_persistent_session() -> None:
+    server = FakeServer()
+
+    async def scenario():
+        async with _supervisor(server) as supervisor:
+            return [await _echo(supervisor, text) for text in ("a", "b")], supervisor.status()["fake"]
+
+    results, status = asyncio.run(scenario())
+
+    assert results == ["0:a", "0:b"]
+    assert len(server.sessions) == 1 and server.closed == [0]
+    assert status["status"] == "ready" and status["calls"] == 2
+
+
+def test_failed_call_restarts_with_backoff() -> None:
+    server = FakeServer()
+
+    async def scenario():
+        async with _supervisor(server) as supervisor:
+            server.sessions[0].broken = True
+            server.failures = 2
+            with pytest.raises(ConnectionError):
+                await supervisor.call_tool("fake", "echo", {"text": "a"})
+            return await _echo(supervisor, "b"), supervisor.status()["fake"]
+
+    result, status = asyncio.run(scenario())
+
+    assert result == "1:b"
+    assert status["restarts"] == 1 and status["failures"] == 1
+    assert status["last_error"] == "spawn failed"
+
+
+def test_json_rpc_error_keeps_the_session() -> None:
+    server = FakeServer()
+
+    async def scenario():
+        async with _supervisor(server) as supervisor:
+            with pytest.raises(McpError):
+                await supervisor.call_tool("fake", "echo", {})
+            assert supervisor.servers["fake"].replacing is None
+            return await _echo(supervisor, "a"), supervisor.status()["fake"]
+
+    result, status = asyncio.run(scenario())
+
+    assert result == "0:a"
+    assert len(server.sessions) == 1 and status["failures"] == 0
+
+
+def test_hedged_request_is_sent_to_the_warm_spare() -> None:
+    server = FakeServer()
+
+    async def hedged(supervisor: McpSupervisor):
+        hedged_request.set(True)
+        result = await supervisor.call_tool("fake", "echo", {"text": "a"})
+        return result.content[0].text
+
+    async def scenario():
+        async with _supervisor(FakeServer()) as supervisor:
+            with pytest.raises(RuntimeError, match="no warm spare"):
+                await asyncio.create_task(hedged(supervisor))
+        async with _supervisor(server, warm_spare=True) as supervisor:
+            await asyncio.sleep(0.05)
+            return await asyncio.create_task(hedged(supervisor)), await _echo(supervisor, "b")
+
+    # the spare (session 1) answers the duplicate, the current process (session 0) the other calls
+    assert asyncio.run(scenario()) == ("1:a", "0:b")
+
+
+def test_warm_spare_takes_over_unhealthy_process() -> None:
+    server = FakeServer()
+
+    async def scenario():
+        async with _supervisor(server, warm_spare=True, health_timeout=0.05) as supervisor:
+            await asyncio.sleep(0.05)
+            assert supervisor.status()["fake"]["spare"] == "ready"
+            server.sessions[0].broken = True
+            state = supervisor.servers["fake"]
+            await supervisor.check(state)
+            await state.replacing
+            result = await _echo(supervisor, "a")
+            await asyncio.sleep(0.05)
+            return result, supervisor.status()["fake"]
+
+    result, status = asyncio.run(scenario())
+
+    # the spare (session 1) answers at once, a new spare (session 2) is started
+    assert result == "1:a"
+    assert len(server.sessions) == 3 and 0 in server.closed
+    assert status["spare"] == "ready" and status["failures"] == 1
+
+
+def test_process_is_recycled_after_max_calls() -> None:
+    server = FakeServer()
+
+    async def scenario():
+        async with _supervisor(server, max_calls=2) as supervisor:
+            results = [await _echo(supervisor, text) for text in ("a", "b")]
+            await supervisor.servers["fake"].replacing
+            results.append(await _echo(supervisor, "c"))
+            await asyncio.sleep(0.2)
+            return results, list(server.closed), supervisor.status()["fake"]
+
+    results, closed, status = asyncio.run(scenario())
+
+    assert results == ["0:a", "0:b", "1:c"]
+    assert closed == [0]
+    assert status["recycled"] == 1 and status["failures"] == 0
+
+
+SERVER_SCRIPT = '''
+from mcp.server.fastmcp import FastMCP
+
+mcp = FastMCP("echo")
+
+@mcp.tool()
+def echo(text: str) -> str:
+    """Echo the text."""
+    return text
+
+mcp.run()
+'''
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="RSS read from /proc")
+def test_real_stdio_server(tmp_path) -> None:
+    script = tmp_path / "server.py"
+    script.write_text(SERVER_SCRIPT)
+    connections = {"echo": {"transport": "stdio", "command": sys.executable, "args": [str(script)]}}
+
+    async def scenario():
+        async with McpSupervisor(connections, max_rss_mb=4096, health_interval=0, start_timeout=30) as supervisor:
+            tools = await supervisor.get_tools()
+            message = await tools["echo"][0].ainvoke(
+                {"type": "tool_call", "name": "echo", "args": {"text": "bonjour"}, "id": "call-1"}
+            )
+            return message, supervisor.status()["echo"]
+
+    message, status = asyncio.run(scenario())
+
+    assert message.text == "bonjour"
+    assert status["status"] == "ready" and len(status["pids"]) == 1
+    assert status["rss_mb"] > 0
@@ -0,0 +1,144 @@
+"""Tests for app.services.memory_saver.BoundedMemorySaver."""
+
+from __future__ import annotations
+
+import asyncio
+
+from langchain_core.messages import AIMessage
+from langgraph.graph import START, MessagesState, StateGraph
+
+from app.services.db import InMemoryDatabase
+from app.services.memory_saver import BoundedMemorySaver
+
+
+def _graph(checkpointer: BoundedMemorySaver):
+    def answer(state: MessagesState) -> dict:
+        return {"messages": [AIMessage(content=f"réponse à {state['messages'][-1].content}")]}
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("answer", answer)
+    builder.add_edge(START, "answer")
+    return builder.compile(checkpointer=checkpointer)
+
+
+def _ask(graph, thread_id: str, question: str = "bonjour") -> None:
+    graph.invoke({"messages": [{"role": "user", "content": question}]}, {"configurable": {"thread_id": thread_id}})
+
+
+def _config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def test_idle_threads_are_compacted_to_latest_checkpoint() -> None:
+    checkpointer = BoundedMemorySaver(idle_seconds=0)
+    graph = _graph(checkpointer)
+
+    _ask(graph, "thread-a", "question 1")
+    _ask(graph, "thread-a", "question 2")
+    _ask(graph, "thread-b")
+
+    assert len(list(checkpointer.list(_config("thread-a")))) == 1
+    messages = graph.get_state(_config("thread-a")).values["messages"]
+    assert [m.content for m in messages] == ["question 1", "réponse à question 1", "question 2", "réponse à question 2"]
+    assert checkpointer.stats()["compactions"] > 0
+
+
+def test_least_recently_used_threads_are_evicted() -> None:
+    checkpointer = BoundedMemorySaver(max_threads=2, idle_seconds=3600)
+    graph = _graph(checkpointer)
+
+    _ask(graph, "thread-a")
+    _ask(graph, "thread-b")
+    graph.get_state(_config("thread-a"))
+    _ask(graph, "thread-c")
+
+    assert checkpointer.thread_ids() == ["thread-a", "thread-c"]
+    assert graph.get_state(_config("thread-b")).values == {}
+    assert checkpointer.stats()["evictions"] == 1
+
+
+def test_evicted_threads_are_spilled_and_reloaded(tmp_path) -> None:
+    checkpointer = BoundedMemorySaver(max_threads=1, idle_seconds=3600, spill_dir=str(tmp_path))
+    graph = _graph(checkpointer)
+
+    _ask(graph, "thread-a", "question a")
+    _ask(graph, "thread-b", "question b")
+
+    assert checkpointer.stats()["spilled_threads"] == 1
+    assert checkpointer.thread_ids() == ["thread-a", "thread-b"]
+
+    messages = graph.get_state(_config("thread-a")).values["messages"]
+    assert [m.content for m in messages] == ["question a", "réponse à question a"]
+    _ask(graph, "thread-a", "suite")
+    assert len(graph.get_state(_config("thread-a")).values["messages"]) == 4
+
+    stats = checkpointer.stats()
+    assert stats["reloads"] == 1
+    assert stats["threads"] == 1
+    assert stats["spilled_threads"] == 1
+
+
+def test_max_bytes_keeps_the_active_thread() -> None:
+    checkpointer = BoundedMemorySaver(max_bytes=1, idle_seconds=3600)
+    graph = _graph(checkpointer)
+
+    _ask(graph, "thread-a")
+    _ask(graph, "thread-b")
+
+    assert checkpointer.thread_ids() == ["thread-b"]
+    assert checkpointer.stats()["bytes"] > 0
+
+
+def test_unknown_threads_are_not_tracked() -> None:
+    checkpointer = BoundedMemorySaver()
+
+    assert checkpointer.get_tuple(_config("unknown")) is None
+    assert checkpointer.thread_ids() == []
+    assert checkpointer.stats()["threads"] == 0
+
+
+def test_database_exposes_stats_and_spilled_threads(tmp_path) -> None:
+    checkpointer = BoundedMemorySaver(max_threads=1, idle_seconds=3600, spill_dir=str(tmp_path))
+    graph = _graph(checkpointer)
+    _ask(graph, "thread-a")
+    _ask(graph, "thread-b")
+    db = InMemoryDatabase(checkpointer=checkpointer)
+
+    async def collect() -> list[str]:
+        return [thread["thread_id"] async for thread in db.iter_latest_threads()]
+
+    assert asyncio.run(collect()) == ["thread-a", "thread-b"]
+    assert db.get_stats()["max_threads"] == 1
+
+
+def test_async_spill_and_listing_of_spilled_threads(tmp_path) -> None:
+    checkpointer = BoundedMemorySaver(max_threads=1, idle_seconds=3600, spill_dir=str(tmp_path))
+    graph = _graph(checkpointer)
+
+    async def scenario():
+        for thread_id in ("thread-a", "thread-b", "thread-c"):
+            await graph.ainvoke({"messages": [{"role": "user", "content": thread_id}]}, _config(thread_id))
+        assert checkpointer.stats()["spilled_threads"] == len(list(tmp_path.iterdir())) == 2
+        listed = {item.config["configurable"]["thread_id"] async for item in checkpointer.alist(None)}
+        state = await graph.aget_state(_config("thread-a"))
+        return listed, state
+
+    listed, state = asyncio.run(scenario())
+
+    assert listed == {"thread-a", "thread-b", "thread-c"}
+    assert {item.config["configurable"]["thread_id"] for item in checkpointer.list(None)} == listed
+    assert [m.content for m in state.values["messages"]] == ["thread-a", "réponse à thread-a"]
+    assert checkpointer.stats()["reloads"] == 1
+    assert len(list(tmp_path.iterdir())) == 2
+
+
+def test_evicted_threads_are_forgotten_by_the_user_lists() -> None:
+    forgotten: list[str] = []
+    checkpointer = BoundedMemorySaver(max_threads=1, idle_seconds=3600, on_forget=forgotten.append)
+    graph = _graph(checkpointer)
+
+    _ask(graph, "thread-a")
+    _ask(graph, "thread-b")
+    checkpointer.delete_thread("thread-b")
+
+    assert forgotten == ["thread-a", "thread-b"]
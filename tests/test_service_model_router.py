@@ -0,0 +1,114 @@
+"""Tests for app.services.model_router (fast/main model routing with fake models)."""
+
+from __future__ import annotations
+
+import asyncio
+
+from langchain.agents import create_agent
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import tool
+
+from app.services.model_router import (
+    FAST,
+    MAIN,
+    HeuristicClassifier,
+    ModelClassifier,
+    ModelRouterMiddleware,
+    invalid_tool_calls,
+)
+
+
+class FakeToolModel(GenericFakeChatModel):
+    """Fake chat model accepting bind_tools and recording its calls."""
+
+    calls: int = 0
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    async def _agenerate(self, *args, **kwargs):
+        self.calls += 1
+        return await super()._agenerate(*args, **kwargs)
+
+
+@tool
+def geocode(text: str) -> str:
+    """Géocode une adresse."""
+    return "2.35,48.85"
+
+
+def _model(*messages: AIMessage) -> FakeToolModel:
+    return FakeToolModel(messages=iter(messages))
+
+
+def _tool_call(args: dict) -> AIMessage:
+    return AIMessage(content="", tool_calls=[{"name": "geocode", "args": args, "id": "call-1"}])
+
+
+def _agent(main_model, fast_model, classifier=None):
+    async def route(messages):
+        return FAST if "simple" in messages[-1].text else MAIN
+
+    router = ModelRouterMiddleware(fast_model, classifier or route)
+    agent = create_agent(model=main_model, tools=[geocode], middleware=[router])
+    return agent, router
+
+
+def _ask(agent, question: str) -> list:
+    result = asyncio.run(agent.ainvoke({"messages": [HumanMessage(content=question)]}))
+    return result["messages"]
+
+
+def test_simple_turn_uses_fast_model() -> None:
+    main_model = _model(AIMessage(content="main"))
+    fast_model = _model(_tool_call({"text": "Paris"}), AIMessage(content="fast"))
+    agent, router = _agent(main_model, fast_model)
+
+    messages = _ask(agent, "question simple")
+
+    assert messages[-1].content == "fast"
+    assert (main_model.calls, fast_model.calls) == (0, 2)
+    assert router.decisions == {FAST: 1, MAIN: 0}
+
+
+def test_complex_turn_uses_main_model() -> None:
+    main_model = _model(AIMessage(content="main"))
+    fast_model = _model(AIMessage(content="fast"))
+    agent, router = _agent(main_model, fast_model)
+
+    assert _ask(agent, "question difficile")[-1].content == "main"
+    assert (main_model.calls, fast_model.calls) == (1, 0)
+
+
+def test_invalid_tool_calls_escalate_for_the_rest_of_the_turn() -> None:
+    main_model = _model(_tool_call({"text": "Paris"}), AIMessage(content="main"))
+    fast_model = _model(_tool_call({"adresse": "Paris"}))
+    agent, router = _agent(main_model, fast_model)
+
+    messages = _ask(agent, "question simple")
+
+    assert messages[-1].content == "main"
+    assert [m.type for m in messages] == ["human", "ai", "tool", "ai"]
+    assert (main_model.calls, fast_model.calls) == (2, 1)
+    assert router.escalations == 1
+
+
+def test_invalid_tool_calls_reasons() -> None:
+    assert invalid_tool_calls(_tool_call({"text": "Paris"}), [geocode]) == []
+    assert invalid_tool_calls(_tool_call({}), [geocode]) == ["geocode: 1 invalid argument(s)"]
+    unknown = AIMessage(content="", tool_calls=[{"name": "other", "args": {}, "id": "call-2"}])
+    assert invalid_tool_calls(unknown, [geocode]) == ["other: unknown tool"]
+
+
+def test_heuristic_classifier() -> None:
+    classifier = HeuristicClassifier(max_chars=50)
+
+    assert asyncio.run(classifier([HumanMessage(content="Quelle heure est-il ?")])) == FAST
+    assert asyncio.run(classifier([HumanMessage(content="Affiche une carte des communes")])) == MAIN
+    assert asyncio.run(classifier([HumanMessage(content="x" * 51)])) == MAIN
+
+
+def test_model_classifier_defaults_to_main_on_unexpected_answer() -> None:
+    assert asyncio.run(ModelClassifier(_model(AIMessage(content="FAST")))([HumanMessage(content="bonjour")])) == FAST
+    assert asyncio.run(ModelClassifier(_model(AIMessage(content="je ne sais pas")))([HumanMessage(content="bonjour")])) == MAIN
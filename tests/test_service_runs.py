@@ -0,0 +1,254 @@
+"""Tests for app.services.runs (per-thread run registry and cancellation)."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from langchain.agents import create_agent
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+from langgraph.checkpoint.memory import InMemorySaver
+
+from app.services.runs import RunRegistry, repair_dangling_tool_calls
+
+
+async def _events(name: str, count: int, log: list[str], delay: float = 0.01):
+    try:
+        for i in range(count):
+            await asyncio.sleep(delay)
+            yield f"{name}-{i}"
+    except asyncio.CancelledError:
+        log.append(f"{name} cancelled")
+        raise
+
+
+async def _consume(registry: RunRegistry, thread_id: str, events, **kwargs) -> list[str]:
+    run = await registry.start(thread_id, events, **kwargs)
+    return [item async for item in registry.subscribe(run, session_id=kwargs.get("session_id"))]
+
+
+def _idle(registry: RunRegistry) -> bool:
+    return registry.stats()["running"] == 0 and registry.stats()["queued"] == 0
+
+
+def test_stream_yields_items_and_counts_runs() -> None:
+    registry = RunRegistry()
+
+    items = asyncio.run(_consume(registry, "thread-1", _events("a", 3, [])))
+
+    assert items == ["a-0", "a-1", "a-2"]
+    assert registry.stats() == {
+        "running": 0,
+        "queued": 0,
+        "started": 1,
+        "completed": 1,
+        "failed": 0,
+        "attached": 0,
+        "cancelled": {"disconnect": 0, "reset": 0, "resubmit": 0},
+    }
+
+
+def test_new_submission_cancels_current_run() -> None:
+    registry = RunRegistry(policy="cancel")
+    log: list[str] = []
+
+    async def scenario():
+        first = asyncio.create_task(_consume(registry, "thread-1", _events("a", 100, log)))
+        await asyncio.sleep(0.05)
+        second = await _consume(registry, "thread-1", _events("b", 2, log))
+        return await first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert 0 < len(first) < 100
+    assert second == ["b-0", "b-1"]
+    assert log == ["a cancelled"]
+    assert registry.cancelled["resubmit"] == 1
+
+
+def test_queue_policy_waits_for_current_run() -> None:
+    registry = RunRegistry(policy="queue")
+
+    async def scenario():
+        first = asyncio.create_task(_consume(registry, "thread-1", _events("a", 5, [])))
+        await asyncio.sleep(0.01)
+        second = await _consume(registry, "thread-1", _events("b", 2, []))
+        return await first, second
+
+    first, second = asyncio.run(scenario())
+
+    assert len(first) == 5
+    assert second == ["b-0", "b-1"]
+    assert registry.cancelled["resubmit"] == 0
+
+
+def test_queued_run_does_not_hide_the_active_one() -> None:
+    registry = RunRegistry(policy="queue", detach_grace_seconds=10)
+    log: list[str] = []
+
+    async def scenario():
+        first = await registry.start("thread-1", _events("a", 100, log))
+        await asyncio.sleep(0.02)
+        second = await registry.start("thread-1", _events("b", 2, log))
+        await asyncio.sleep(0.02)
+        assert registry.attach("thread-1") is first
+        assert registry.stats()["running"] == 1 and registry.stats()["queued"] == 1
+
+        # reset: the active run and the queued one are cancelled
+        assert await registry.cancel("thread-1", "reset")
+        assert first.finished and second.finished
+        assert second.items == []
+        assert _idle(registry)
+
+    asyncio.run(scenario())
+
+    assert log == ["a cancelled"]
+    assert registry.cancelled["reset"] == 2
+
+
+def test_consumer_disconnect_cancels_run() -> None:
+    registry = RunRegistry()
+    log: list[str] = []
+
+    async def scenario():
+        stream = registry.subscribe(await registry.start("thread-1", _events("a", 100, log)))
+        assert await anext(stream) == "a-0"
+        await stream.aclose()
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+
+    assert log == ["a cancelled"]
+    assert registry.cancelled["disconnect"] == 1
+    assert _idle(registry)
+
+
+def test_detach_session_and_on_cancel() -> None:
+    registry = RunRegistry()
+    repaired: list[str] = []
+
+    async def on_cancel(thread_id: str) -> None:
+        repaired.append(thread_id)
+
+    async def scenario():
+        task = asyncio.create_task(_consume(
+            registry, "thread-1", _events("a", 100, []), session_id="session-1", on_cancel=on_cancel
+        ))
+        await asyncio.sleep(0.05)
+        await registry.detach_session("session-2")
+        assert registry.stats()["running"] == 1
+        await registry.detach_session("session-1")
+        return await task
+
+    items = asyncio.run(scenario())
+
+    assert len(items) < 100
+    assert repaired == ["thread-1"]
+    assert registry.cancelled["disconnect"] == 1
+
+
+def test_attach_replays_buffered_items_then_live_ones() -> None:
+    registry = RunRegistry(detach_grace_seconds=10)
+
+    async def scenario():
+        run = await registry.start("thread-1", _events("a", 6, []), metadata={"user_message": "question"})
+        stream = registry.subscribe(run)
+        assert await anext(stream) == "a-0"
+        assert await anext(stream) == "a-1"
+        # the page is reloaded: the first client goes away, the run goes on
+        await stream.aclose()
+        run = registry.attach("thread-1")
+        assert run is not None and run.metadata == {"user_message": "question"}
+        return [item async for item in registry.subscribe(run)]
+
+    items = asyncio.run(scenario())
+
+    assert items == [f"a-{i}" for i in range(6)]
+    assert registry.cancelled["disconnect"] == 0
+    assert registry.stats()["attached"] == 1
+    assert registry.attach("thread-1") is None
+
+
+def test_detached_run_is_cancelled_after_grace_delay() -> None:
+    registry = RunRegistry(detach_grace_seconds=0.05)
+    log: list[str] = []
+
+    async def scenario():
+        stream = registry.subscribe(await registry.start("thread-1", _events("a", 100, log)))
+        await anext(stream)
+        await stream.aclose()
+        assert registry.stats()["running"] == 1
+        await asyncio.sleep(0.2)
+
+    asyncio.run(scenario())
+
+    assert log == ["a cancelled"]
+    assert registry.cancelled["disconnect"] == 1
+    assert _idle(registry)
+
+
+def test_errors_are_raised_to_the_consumer() -> None:
+    registry = RunRegistry()
+
+    async def failing():
+        yield "a-0"
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        asyncio.run(_consume(registry, "thread-1", failing()))
+    assert registry.failed == 1
+
+
+class FakeToolModel(BaseChatModel):
+    responses: list[AIMessage]
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-tool-model"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self.responses.pop(0))])
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+@tool
+async def slow_query(typename: str) -> str:
+    """Requête WFS lente."""
+    await asyncio.sleep(10)
+    return "{}"
+
+
+def test_cancelled_run_leaves_a_usable_checkpoint() -> None:
+    model = FakeToolModel(responses=[
+        AIMessage(content="", tool_calls=[{"name": "slow_query", "args": {"typename": "commune"}, "id": "call-1"}]),
+        AIMessage(content="Réponse à la deuxième question"),
+    ])
+    graph = create_agent(model=model, tools=[slow_query], checkpointer=InMemorySaver())
+    registry = RunRegistry()
+    config = {"configurable": {"thread_id": "thread-1"}}
+
+    async def repair(thread_id: str) -> None:
+        await repair_dangling_tool_calls(graph, thread_id)
+
+    async def ask(question: str) -> list:
+        events = graph.astream({"messages": [{"role": "user", "content": question}]}, config=config)
+        return await _consume(registry, "thread-1", events, on_cancel=repair)
+
+    async def scenario():
+        first = asyncio.create_task(ask("question 1"))
+        await asyncio.sleep(0.2)
+        await ask("question 2")
+        await first
+        return (await graph.aget_state(config)).values["messages"]
+
+    messages = asyncio.run(scenario())
+
+    assert [m.type for m in messages] == ["human", "ai", "tool", "human", "ai"]
+    assert messages[2].status == "error"
+    assert messages[2].tool_call_id == "call-1"
+    assert messages[-1].content == "Réponse à la deuxième question"
@@ -0,0 +1,97 @@
+"""Tests for app.services.serializer.CompressedSerializer."""
+
+from __future__ import annotations
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.graph import START, MessagesState, StateGraph
+
+from app.services.serializer import CompressedSerializer
+
+
+def _messages() -> list:
+    features = [
+        {"type": "Feature", "properties": {"nom": f"commune {i}"}, "geometry": {"type": "Point", "coordinates": [2.123456789, 48.123456789]}}
+        for i in range(200)
+    ]
+    return [
+        HumanMessage(content="Quelles sont les communes ?"),
+        ToolMessage(content=str({"type": "FeatureCollection", "features": features}), tool_call_id="call-1"),
+        AIMessage(content="Voici les communes."),
+    ]
+
+
+def test_compresses_above_threshold_and_roundtrips() -> None:
+    serde = CompressedSerializer(codec="zlib", threshold=1024)
+    messages = _messages()
+
+    typ, data = serde.dumps_typed(messages)
+
+    assert typ == "msgpack+zlib"
+    assert len(data) < len(JsonPlusSerializer().dumps_typed(messages)[1])
+    assert serde.loads_typed((typ, data)) == messages
+
+
+def test_small_values_are_not_compressed() -> None:
+    serde = CompressedSerializer(codec="zlib", threshold=1024)
+    assert serde.dumps_typed({"step": 1})[0] == "msgpack"
+    assert serde.dumps_typed(None) == ("null", b"")
+
+
+def test_reads_values_written_without_compression() -> None:
+    legacy = JsonPlusSerializer().dumps_typed(_messages())
+
+    assert CompressedSerializer(codec="zlib").loads_typed(legacy) == _messages()
+
+
+def test_codec_none_still_reads_compressed_values() -> None:
+    compressed = CompressedSerializer(codec="zlib", threshold=0).dumps_typed(_messages())
+
+    serde = CompressedSerializer(codec="none")
+    assert serde.dumps_typed(_messages())[0] == "msgpack"
+    assert serde.loads_typed(compressed) == _messages()
+
+
+def test_zstd_roundtrip() -> None:
+    pytest.importorskip("zstandard")
+    serde = CompressedSerializer(codec="zstd", threshold=1024)
+
+    typ, data = serde.dumps_typed(_messages())
+
+    assert typ == "msgpack+zstd"
+    assert serde.loads_typed((typ, data)) == _messages()
+
+
+def test_invalid_codec() -> None:
+    with pytest.raises(ValueError, match="Invalid codec"):
+        CompressedSerializer(codec="lz4")
+
+
+def test_compression_level_per_codec() -> None:
+    assert CompressedSerializer(codec="zlib").level == 1
+    with pytest.raises(ValueError, match="Invalid zlib compression level"):
+        CompressedSerializer(codec="zlib", level=19)
+
+    pytest.importorskip("zstandard")
+    assert CompressedSerializer(codec="zstd").level == 3
+    fast, small = CompressedSerializer(codec="zstd", level=1), CompressedSerializer(codec="zstd", level=19)
+    assert len(small.dumps_typed(_messages())[1]) <= len(fast.dumps_typed(_messages())[1])
+
+
+def test_checkpointer_with_compressed_serializer() -> None:
+    def answer(state: MessagesState) -> dict:
+        return {"messages": [AIMessage(content="x" * 5000)]}
+
+    builder = StateGraph(MessagesState)
+    builder.add_node("answer", answer)
+    builder.add_edge(START, "answer")
+    checkpointer = InMemorySaver(serde=CompressedSerializer(codec="zlib", threshold=1024))
+    graph = builder.compile(checkpointer=checkpointer)
+    config = {"configurable": {"thread_id": "thread-1"}}
+
+    graph.invoke({"messages": [{"role": "user", "content": "bonjour"}]}, config)
+
+    assert "msgpack+zlib" in [typ for typ, _ in checkpointer.blobs.values()]
+    assert graph.get_state(config).values["messages"][-1].content == "x" * 5000
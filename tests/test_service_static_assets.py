@@ -0,0 +1,73 @@
+"""Tests for app.services.static_assets (hashed URLs, precompressed variants)."""
+
+from __future__ import annotations
+
+import gzip
+import os
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.services.static_assets import IMMUTABLE, REVALIDATE, HashedStaticFiles, precompress_directory
+
+SCRIPT = "console.log('demo-geocontext');\n" * 200
+
+
+def _client(tmp_path, precompress: bool = True) -> tuple[TestClient, HashedStaticFiles]:
+    (tmp_path / "app.min.js").write_text(SCRIPT)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" + b"\0" * 64)
+    files = HashedStaticFiles(directory=str(tmp_path), prefix="/front", precompress=precompress)
+    app = FastAPI()
+    app.mount("/front", files, name="front")
+    return TestClient(app), files
+
+
+def test_hashed_url_is_immutable_and_plain_name_is_revalidated(tmp_path) -> None:
+    client, files = _client(tmp_path, precompress=False)
+
+    url = files.url("app.min.js")
+    assert url.startswith("/front/app.min.") and url.endswith(".js") and url != "/front/app.min.js"
+
+    hashed = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert hashed.status_code == 200 and hashed.text == SCRIPT
+    assert hashed.headers["cache-control"] == IMMUTABLE
+    assert "content-encoding" not in hashed.headers
+
+    plain = client.get("/front/app.min.js")
+    assert plain.headers["cache-control"] == REVALIDATE
+
+    outdated = client.get("/front/app.min.0123456789.js")
+    assert outdated.status_code == 200 and outdated.headers["cache-control"] == REVALIDATE
+
+
+def test_precompressed_variants_are_negotiated(tmp_path) -> None:
+    client, files = _client(tmp_path)
+    url = files.url("app.min.js")
+
+    assert os.path.exists(tmp_path / "app.min.js.gz")
+    assert not os.path.exists(tmp_path / "logo.png.gz")
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith(("text/javascript", "application/javascript"))
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["cache-control"] == IMMUTABLE
+    assert response.text == SCRIPT  # decoded by the client
+
+    if os.path.exists(tmp_path / "app.min.js.br"):
+        assert client.get(url, headers={"Accept-Encoding": "gzip, br"}).headers["content-encoding"] == "br"
+
+    not_modified = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.headers["cache-control"] == IMMUTABLE
+
+    assert "content-encoding" not in client.get(files.url("logo.png"), headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_up_to_date_variants_are_not_rewritten(tmp_path) -> None:
+    (tmp_path / "style.css").write_text("body { margin: 0; }\n" * 100)
+
+    written = precompress_directory(str(tmp_path))
+    assert written >= 1
+    assert gzip.decompress((tmp_path / "style.css.gz").read_bytes()) == (tmp_path / "style.css").read_bytes()
+    assert precompress_directory(str(tmp_path)) == 0
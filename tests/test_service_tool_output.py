@@ -0,0 +1,103 @@
+"""Tests for app.services.tool_output (GeoJSON trimming of tool outputs)."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+
+from langchain.agents.middleware import ToolCallRequest
+from langchain_core.messages import ToolMessage
+
+from app.services.chat import events_from_update
+from app.services.tool_output import GeoJsonTrimMiddleware, untrimmed_content, wants_geometry
+
+
+def _collection(count: int) -> dict:
+    return {
+        "type": "FeatureCollection",
+        "numberReturned": count,
+        "crs": {"type": "name", "properties": {"name": "urn:ogc:def:crs:EPSG::4326"}},
+        "features": [
+            {
+                "type": "Feature",
+                "id": f"commune.{i}",
+                "properties": {"nom": f"Commune {i}", "code_insee": f"{i:05d}", "commentaire": None, "description": "x" * 500},
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": [[[2.123456789, 48.0], [2.223456789, 48.0], [2.223456789, 48.1], [2.123456789, 48.0]]],
+                },
+            }
+            for i in range(count)
+        ],
+    }
+
+
+def _request(args: dict | None = None, name: str = "gpf_wfs_get_features") -> ToolCallRequest:
+    return ToolCallRequest(
+        tool_call={"name": name, "args": args or {}, "id": "call-1", "type": "tool_call"},
+        tool=None,
+        state={},
+        runtime=None,
+    )
+
+
+def _call(middleware: GeoJsonTrimMiddleware, content: str, request: ToolCallRequest | None = None) -> ToolMessage:
+    async def handler(_request: ToolCallRequest) -> ToolMessage:
+        return ToolMessage(content=content, tool_call_id="call-1", name="gpf_wfs_get_features")
+
+    return asyncio.run(middleware.awrap_tool_call(request or _request(), handler))
+
+
+def test_feature_collection_is_trimmed_for_the_model() -> None:
+    middleware = GeoJsonTrimMiddleware({"gpf_wfs_get_features"}, max_features=2, precision=3)
+    raw = json.dumps(_collection(5))
+
+    message = _call(middleware, raw)
+    trimmed = json.loads(message.content)
+
+    assert len(trimmed["features"]) == 2
+    assert trimmed["trimmed"]["features_returned"] == 5
+    assert "crs" not in trimmed and trimmed["numberReturned"] == 5
+    feature = trimmed["features"][0]
+    assert feature["properties"] == {"nom": "Commune 0", "code_insee": "00000", "description": "x" * 200 + "…"}
+    assert feature["geometry"] is None
+    assert feature["geometry_summary"] == {
+        "type": "Polygon", "vertices": 4, "bbox": [2.123, 48.0, 2.223, 48.1], "centroid": [2.173, 48.025],
+    }
+    assert trimmed["bbox"] == [2.123, 48.0, 2.223, 48.1]
+    assert untrimmed_content(message) == raw
+    assert middleware.chars_after < middleware.chars_before
+
+
+def test_geometry_is_kept_when_the_call_names_it() -> None:
+    middleware = GeoJsonTrimMiddleware({"gpf_wfs_get_features"}, properties=["nom"], precision=2)
+
+    message = _call(middleware, json.dumps(_collection(1)), _request({"property_names": "nom,geometrie"}))
+    feature = json.loads(message.content)["features"][0]
+
+    assert feature["properties"] == {"nom": "Commune 0"}
+    assert feature["geometry"]["coordinates"][0][0] == [2.12, 48.0]
+    assert wants_geometry({"select": ["nom", "the_geom"]})
+    assert not wants_geometry({"typename": "ADMINEXPRESS-COG.LATEST:commune", "count": 10})
+
+
+def test_other_outputs_are_left_untouched() -> None:
+    middleware = GeoJsonTrimMiddleware({"gpf_wfs_get_features"})
+
+    request_output = json.dumps({"url": "https://data.geopf.fr/wfs?service=WFS", "method": "GET"})
+    assert _call(middleware, request_output).content == request_output
+    assert _call(middleware, "not json").content == "not json"
+    other = _call(middleware, json.dumps(_collection(50)), _request(name="other_tool"))
+    assert len(json.loads(other.content)["features"]) == 50
+    assert untrimmed_content(other) is None
+    assert middleware.trimmed == 0
+
+
+def test_ui_events_use_the_untrimmed_output() -> None:
+    middleware = GeoJsonTrimMiddleware({"gpf_wfs_get_features"}, max_features=1)
+    raw = json.dumps(_collection(3))
+    message = _call(middleware, raw)
+
+    events = events_from_update({"tools": {"messages": [message]}})
+
+    assert events[0]["data"]["content"] == raw
@@ -0,0 +1,104 @@
+"""Tests for app.services.tool_selector (per-turn tool subset selection)."""
+
+from __future__ import annotations
+
+import asyncio
+
+from langchain.agents import create_agent
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import tool
+
+from app.services.tool_selector import ToolIndex, ToolSelectorMiddleware, get_tool_selection_stats, tokenize
+
+
+@tool
+def gpf_wfs_get_features(typename: str, cql_filter: str = "") -> str:
+    """Récupère les objets (features) d'une couche WFS de la Géoplateforme, par exemple les communes ou les bâtiments."""
+    return "{}"
+
+
+@tool
+def adminexpress(lon: float, lat: float) -> str:
+    """Renvoie les unités administratives (commune, département, région) contenant un point."""
+    return "{}"
+
+
+@tool
+def altitude(lon: float, lat: float) -> str:
+    """Renvoie l'altitude d'une position."""
+    return "{}"
+
+
+@tool
+def get_current_time(timezone: str) -> str:
+    """Get the current time in a specific timezone."""
+    return "12:00"
+
+
+@tool
+def create_map(geojson_url: str = "") -> str:
+    """Crée une carte."""
+    return "<ol-simple-map></ol-simple-map>"
+
+
+TOOLS = [gpf_wfs_get_features, adminexpress, altitude, get_current_time, create_map]
+
+
+class RecordingModel(BaseChatModel):
+    """Non-streaming fake chat model recording the tools bound at each call."""
+
+    responses: list[AIMessage]
+    bound: list[list[str]] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "recording-model"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=self.responses.pop(0))])
+
+    def bind_tools(self, tools, **kwargs):
+        self.bound.append(sorted(tool.name for tool in tools))
+        return self
+
+
+def test_tokenize_removes_accents_and_stop_words() -> None:
+    assert tokenize("Quelle est l'altitude de la Mairie ?") == ["altitude", "mairie"]
+    assert tokenize("gpf_wfs_get_features") == ["gpf", "wfs", "features"]
+
+
+def test_index_ranks_tools_by_relevance() -> None:
+    index = ToolIndex(TOOLS)
+
+    assert index.search("Quelle est l'altitude du Mont Blanc ?", 2)[0] == "altitude"
+    assert index.search("Liste des bâtiments de la commune", 1) == ["gpf_wfs_get_features"]
+    assert index.search("bonjour", 3) == []
+
+
+def test_selection_keeps_core_tools_and_tools_called_in_the_turn() -> None:
+    middleware = ToolSelectorMiddleware(TOOLS, top_k=1, core_tools={"create_map"})
+    names = [t.name for t in TOOLS]
+    messages = [
+        HumanMessage(content="Quelle heure est-il à Paris ? Donne aussi l'altitude."),
+        AIMessage(content="", tool_calls=[{"name": "get_current_time", "args": {}, "id": "call-1"}]),
+    ]
+
+    assert middleware.select(messages, names) == {"altitude", "create_map", "get_current_time"}
+    assert middleware.select([HumanMessage(content="bonjour")], names) is None
+
+
+def test_agent_binds_the_selected_tools_and_reports_prompt_sizes() -> None:
+    model = RecordingModel(responses=[AIMessage(content="1 042 m")], bound=[])
+    selector = ToolSelectorMiddleware(TOOLS, top_k=1, core_tools={"create_map"})
+    agent = create_agent(model=model, tools=TOOLS, middleware=[selector])
+
+    asyncio.run(agent.ainvoke({"messages": [HumanMessage(content="Altitude du Puy de Dôme ?")]}))
+
+    assert model.bound[-1] == ["altitude", "create_map"]
+    stats = selector.stats()
+    assert stats["model_calls"] == 1 and stats["tools"] == len(TOOLS)
+    assert 0 < stats["prompt_chars_with_selection"] < stats["prompt_chars_without_selection"]
+    # exposed on /health/tools
+    assert get_tool_selection_stats() == stats
@@ -0,0 +1,143 @@
+"""Tests for app.services.tool_timeout.ToolTimeoutMiddleware."""
+
+from __future__ import annotations
+
+import asyncio
+
+from langchain.agents.middleware import ToolCallRequest, ToolRetryMiddleware
+from langchain_core.messages import ToolMessage
+from langchain_core.tools import ToolException, tool
+
+from app.services.agent import format_tool_error
+from app.services.tool_timeout import (
+    LatencyTracker,
+    ToolTimeoutMiddleware,
+    hedged_request,
+    is_idempotent_read_only,
+)
+
+
+def _request(name: str = "gpf_wfs_get_features") -> ToolCallRequest:
+    return ToolCallRequest(
+        tool_call={"name": name, "args": {}, "id": "call-1", "type": "tool_call"},
+        tool=None,
+        state={},
+        runtime=None,
+    )
+
+
+def _ok(content: str = "ok") -> ToolMessage:
+    return ToolMessage(content=content, tool_call_id="call-1", name="gpf_wfs_get_features")
+
+
+def test_get_timeout_prefers_tool_then_server_then_default() -> None:
+    middleware = ToolTimeoutMiddleware(
+        default_timeout=120,
+        server_timeouts={"geocontext": 60},
+        tool_timeouts={"gpf_wfs_get_features": 30},
+        tool_servers={"gpf_wfs_get_features": "geocontext", "adminexpress": "geocontext"},
+    )
+    assert middleware.get_timeout("gpf_wfs_get_features") == 30
+    assert middleware.get_timeout("adminexpress") == 60
+    assert middleware.get_timeout("get_current_time") == 120
+
+
+def test_timeout_cancels_call_and_returns_recoverable_error_message() -> None:
+    cancelled = []
+
+    async def handler(_request: ToolCallRequest) -> ToolMessage:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return _ok()
+
+    retry = ToolRetryMiddleware(max_retries=0, retry_on=(ToolException,), on_failure=format_tool_error)
+    timeout = ToolTimeoutMiddleware(default_timeout=0.05)
+
+    async def run() -> ToolMessage:
+        return await retry.awrap_tool_call(
+            _request(), lambda request: timeout.awrap_tool_call(request, handler)
+        )
+
+    result = asyncio.run(run())
+
+    assert cancelled == [True]
+    assert isinstance(result, ToolMessage)
+    assert result.status == "error"
+    assert "délai imparti" in result.content
+    assert "Corrige les arguments" in result.content
+
+
+def test_hedged_call_returns_first_answer_and_cancels_the_other() -> None:
+    latencies = LatencyTracker()
+    for _ in range(5):
+        latencies.record("gpf_wfs_get_features", 0.01)
+    middleware = ToolTimeoutMiddleware(
+        default_timeout=5,
+        hedged_tools={"gpf_wfs_get_features"},
+        hedge_min_samples=5,
+        latencies=latencies,
+    )
+    calls: list[int] = []
+    cancelled: list[int] = []
+
+    async def handler(_request: ToolCallRequest) -> ToolMessage:
+        attempt = len(calls)
+        calls.append(attempt)
+        # the duplicate is flagged (sent to the warm spare by the MCP supervisor)
+        assert hedged_request.get() is (attempt == 1)
+        try:
+            # the first attempt is stuck, the hedged one answers quickly
+            await asyncio.sleep(10 if attempt == 0 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(attempt)
+            raise
+        return _ok(f"attempt-{attempt}")
+
+    result = asyncio.run(middleware.awrap_tool_call(_request(), handler))
+
+    assert result.content == "attempt-1"
+    assert calls == [0, 1]
+    assert cancelled == [0]
+
+
+def test_no_hedging_without_enough_samples() -> None:
+    middleware = ToolTimeoutMiddleware(
+        hedged_tools={"gpf_wfs_get_features"}, hedge_min_samples=20
+    )
+    middleware.latencies.record("gpf_wfs_get_features", 0.01)
+    assert middleware.get_hedge_delay("gpf_wfs_get_features") is None
+    assert middleware.get_hedge_delay("other") is None
+
+
+def test_latency_tracker_percentile() -> None:
+    latencies = LatencyTracker()
+    for value in range(1, 101):
+        latencies.record("t", float(value))
+    assert latencies.percentile("t", 95) == 95.0
+    assert latencies.percentile("unknown", 95) is None
+
+
+def test_from_config_hedges_read_only_idempotent_tools() -> None:
+    @tool
+    def read_tool() -> str:
+        """Read."""
+        return ""
+
+    @tool
+    def write_tool() -> str:
+        """Write."""
+        return ""
+
+    read_tool.metadata = {"readOnlyHint": True, "idempotentHint": True}
+    write_tool.metadata = {"readOnlyHint": False}
+    assert is_idempotent_read_only(read_tool)
+
+    middleware = ToolTimeoutMiddleware.from_config(
+        {"default": 120, "servers": {"geocontext": 60}, "hedging": {"enabled": True}},
+        {"geocontext": [read_tool, write_tool]},
+    )
+    assert middleware.hedged_tools == {"read_tool"}
+    assert middleware.get_timeout("write_tool") == 60
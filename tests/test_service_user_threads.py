@@ -0,0 +1,81 @@
+"""Tests for the threads of each user in app.services.db (memory and SQLite backends)."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+import app.services.db as db_service
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def database_uri(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch, tmp_path) -> str:
+    if request.param == "sqlite":
+        uri = f"sqlite:///{tmp_path}/checkpoints.db"
+    else:
+        uri = ""
+        monkeypatch.setattr(db_service, "_memory_user_threads", {})
+    monkeypatch.setattr(db_service, "DB_URI", uri)
+    return uri
+
+
+def test_user_threads_are_listed_by_last_activity(database_uri: str) -> None:
+    async def scenario():
+        async with db_service.get_database() as db:
+            await db.setup()
+            for thread_id in ["thread-a", "thread-b", "thread-c", "thread-d"]:
+                await db.touch_user_thread("alice@example.org", thread_id, f"question {thread_id}")
+            await db.touch_user_thread("bob@example.org", "thread-e", "question thread-e")
+            # a new turn on the oldest thread, the title of the first turn is kept
+            await db.touch_user_thread("alice@example.org", "thread-a", "suite")
+
+        # a new connection (persisted with SQLite)
+        async with db_service.get_database() as db:
+            first = await db.list_user_threads("alice@example.org", limit=3)
+            cursor = (first[-1]["updated_at"], first[-1]["thread_id"])
+            second = await db.list_user_threads("alice@example.org", before=cursor, limit=3)
+            assert await db.get_thread_users("thread-e") == ["bob@example.org"]
+            assert await db.get_thread_users("thread-z") == []
+            return first, second, await db.list_user_threads("nobody@example.org")
+
+    first, second, empty = asyncio.run(scenario())
+
+    assert [thread["thread_id"] for thread in first] == ["thread-a", "thread-d", "thread-c"]
+    assert first[0]["title"] == "question thread-a"
+    assert first[0]["updated_at"] > first[0]["created_at"]
+    assert [thread["thread_id"] for thread in second] == ["thread-b"]
+    assert empty == []
+
+
+def test_thread_title_is_the_first_question_on_one_line() -> None:
+    assert db_service.thread_title("  Quelles sont\nles communes ?  ") == "Quelles sont les communes ?"
+    title = db_service.thread_title("mot " * 50)
+    assert len(title) == db_service.TITLE_MAX_CHARS
+    assert title.endswith("…")
+
+
+def test_use_database_sets_the_current_database() -> None:
+    db = db_service.InMemoryDatabase(checkpointer=None)
+
+    with db_service.use_database(db):
+        assert db_service.get_current_database() is db
+    assert db_service.get_current_database() is None
+
+
+def test_anonymous_visitors_have_no_discussions(monkeypatch: pytest.MonkeyPatch) -> None:
+    import app.server as server
+
+    monkeypatch.setattr(db_service, "_memory_user_threads", {})
+    db = db_service.InMemoryDatabase(checkpointer=None, user_threads=db_service._memory_user_threads)
+
+    async def scenario():
+        await server.record_user_turn("anonymous@gpf.fr", "thread-a", "question")
+        await server.record_user_turn("alice@example.org", "thread-b", "question")
+        return await db.list_user_threads("anonymous@gpf.fr"), await db.list_user_threads("alice@example.org")
+
+    with db_service.use_database(db):
+        anonymous, alice = asyncio.run(scenario())
+
+    assert anonymous == []
+    assert [thread["thread_id"] for thread in alice] == ["thread-b"]